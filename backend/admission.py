@@ -0,0 +1,256 @@
+"""请求准入控制：按客户端IP限流，数据库过载时限制并发
+
+- 限流：每个 (客户端IP, 路由类别) 一个令牌桶，超出预算返回 429 和 Retry-After
+- 过载保护：数据库调用的平均等待时间（线程池排队 + 连接池借出）超过阈值时，同时处理的请求数达到上限后返回 503
+- 拒绝计数：按路由类别和原因（rate_limited / overloaded）计数，在 /metrics 和 /api/admission/stats 输出
+
+状态只在事件循环线程中读写（ASGI 中间件），不加锁；数据库等待由 wait_probe 每隔 window 秒读取一次。
+"""
+import functools
+import ipaddress
+import json
+import math
+import time
+
+RATE_LIMITED = 'rate_limited'
+OVERLOADED = 'overloaded'
+
+
+def parse_networks(value):
+    """把逗号分隔的IP地址/网段（如 "127.0.0.1,10.0.0.0/8"）解析为受信任代理的网段元组"""
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(',') if item.strip())
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_trusted(address, trusted_proxies):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_ip(scope, trusted_proxies=()):
+    """客户端IP
+
+    只有连接的对端地址属于 trusted_proxies 时才读取转发请求头：从 X-Forwarded-For 的最右侧开始跳过受信任的代理，
+    取第一个不受信任的地址（客户端自己写入的值在左侧，无法冒充）；没有 X-Forwarded-For 时取 X-Real-IP。
+    否则使用连接的对端地址，客户端不能通过改写请求头换用新的令牌桶。
+    """
+    client = scope.get('client')
+    peer = client[0] if client else '127.0.0.1'
+    if not trusted_proxies or not _is_trusted(peer, trusted_proxies):
+        return peer
+    forwarded, real_ip = [], None
+    for name, value in scope['headers']:
+        if name == b'x-forwarded-for':
+            forwarded.extend(item.strip() for item in value.decode('latin-1').split(','))
+        elif name == b'x-real-ip':
+            real_ip = value.decode('latin-1').strip()
+    for address in reversed(forwarded):
+        if address and not _is_trusted(address, trusted_proxies):
+            return address
+    # 整条链都是受信任的代理：取最左侧的地址
+    if forwarded and forwarded[0]:
+        return forwarded[0]
+    return real_ip or peer
+
+
+class TokenBuckets:
+    """按 (键, 路由类别) 的令牌桶
+
+    budgets 为 {路由类别: (每秒补充的令牌数, 桶容量)}；每个桶只保存 [令牌数, 上次更新时间]，
+    取令牌时按经过的时间补充。桶数超过 max_keys 时先删除已回满的桶（与没有记录等价），
+    仍然过多时删除最久未使用的一半，内存有上限。
+    """
+
+    def __init__(self, budgets, max_keys=100000):
+        self.budgets = budgets
+        self.max_keys = max_keys
+        self._buckets = {}
+        self.evicted = 0
+
+    def take(self, key, route_class, now):
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        rate, burst = self.budgets[route_class]
+        bucket_key = (key, route_class)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            self._buckets[bucket_key] = [burst - 1.0, now]
+            return 0.0
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > burst:
+            tokens = burst
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate if rate > 0 else math.inf
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        before = len(self._buckets)
+        budgets = self.budgets
+        self._buckets = {
+            bucket_key: bucket for bucket_key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * budgets[bucket_key[1]][0] < budgets[bucket_key[1]][1]
+        }
+        if len(self._buckets) >= self.max_keys:
+            recent = sorted(self._buckets.items(), key=lambda item: item[1][1])[len(self._buckets) // 2:]
+            self._buckets = dict(recent)
+        self.evicted += before - len(self._buckets)
+
+
+class AdmissionController:
+    """请求准入控制
+
+    admit() 依次检查令牌桶和过载状态，允许时返回 None（处理结束后须调用 release()），
+    拒绝时返回 (状态码, Retry-After 秒数)。wait_probe 返回累计的 (数据库调用次数, 等待秒数)，
+    每隔 window 秒计算这段时间内每次调用的平均等待，超过 wait_threshold 时进入过载状态，
+    此时同时处理的请求数达到 max_concurrency 后新请求返回 503；等待回落到阈值以下后恢复。
+    """
+
+    def __init__(self, budgets, wait_probe=None, enabled=True, max_concurrency=64, wait_threshold=0.05,
+                 window=1.0, max_keys=100000):
+        self.enabled = enabled
+        self.wait_probe = wait_probe
+        self.max_concurrency = max_concurrency
+        self.wait_threshold = wait_threshold
+        self.window = window
+        self.buckets = TokenBuckets(budgets, max_keys)
+        self.in_flight = 0
+        self.overloaded = False
+        self._recent_wait = 0.0
+        self._checked_at = time.monotonic()
+        self._probe_totals = None
+        self._probe_failing = False
+        self._admitted = 0
+        # (路由类别, 原因) -> 拒绝次数
+        self._rejected = {}
+
+    def admit(self, key, route_class, now=None):
+        now = time.monotonic() if now is None else now
+        retry_after = self.buckets.take(key, route_class, now)
+        if retry_after:
+            return self._reject(route_class, RATE_LIMITED, 429, retry_after)
+        if now - self._checked_at >= self.window:
+            self._check_pressure(now)
+        if self.overloaded and self.in_flight >= self.max_concurrency:
+            return self._reject(route_class, OVERLOADED, 503, self.window)
+        self.in_flight += 1
+        self._admitted += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self):
+        rejected = {}
+        for (route_class, reason), count in sorted(self._rejected.items()):
+            rejected.setdefault(route_class, {})[reason] = count
+        return {
+            'enabled': self.enabled,
+            'admitted': self._admitted,
+            'rejected': rejected,
+            'in_flight': self.in_flight,
+            'overloaded': self.overloaded,
+            'recent_wait_avg': self._recent_wait,
+            'wait_threshold': self.wait_threshold,
+            'max_concurrency': self.max_concurrency,
+            'buckets': len(self.buckets),
+            'buckets_evicted': self.buckets.evicted,
+            'budgets': {route_class: {'rate': rate, 'burst': burst}
+                        for route_class, (rate, burst) in self.buckets.budgets.items()},
+        }
+
+    def collect(self):
+        """指标集合的采集函数：拒绝次数、处理中的请求数和过载状态"""
+        return [
+            ('http_requests_rejected_total', 'counter', "Requests rejected by admission control",
+             [({'class': route_class, 'reason': reason}, count)
+              for (route_class, reason), count in sorted(self._rejected.items())]),
+            ('http_requests_in_flight', 'gauge', "Requests currently admitted", [({}, self.in_flight)]),
+            ('http_admission_overloaded', 'gauge', "1 while load shedding is active", [({}, int(self.overloaded))]),
+        ]
+
+    def _reject(self, route_class, reason, status, retry_after):
+        key = (route_class, reason)
+        self._rejected[key] = self._rejected.get(key, 0) + 1
+        return status, retry_after
+
+    def _check_pressure(self, now):
+        self._checked_at = now
+        if self.wait_probe is None:
+            return
+        try:
+            totals = self.wait_probe()
+        except Exception as e:
+            # 与其他后台任务一样输出错误，但只在连续失败的第一次输出；读不到等待时间时不做过载保护，
+            # 避免停留在失败前的过载状态
+            if not self._probe_failing:
+                print(f"Admission wait probe error: {e}")
+            self._probe_failing = True
+            self._probe_totals = None
+            self.overloaded = False
+            return
+        self._probe_failing = False
+        previous, self._probe_totals = self._probe_totals, totals
+        if previous is None:
+            return
+        calls, wait_time = totals[0] - previous[0], totals[1] - previous[1]
+        self._recent_wait = wait_time / calls if calls > 0 else 0.0
+        self.overloaded = self._recent_wait > self.wait_threshold
+
+
+class AdmissionMiddleware:
+    """ASGI 中间件：classify(method, path) 返回路由类别，None 表示不做准入控制（长连接推送、运行状态接口）
+
+    客户端IP见 client_ip，trusted_proxies 为 parse_networks 的结果。
+    被拒绝的请求直接返回 {"detail": ...}（与 HTTPException 的格式一致）和 Retry-After（整数秒，至少 1）
+    """
+
+    MESSAGES = {429: "Too many requests", 503: "Server is overloaded, please retry later"}
+
+    def __init__(self, app, controller, classify, trusted_proxies=()):
+        self.app = app
+        self.controller = controller
+        self.classify = classify
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope['type'] != 'http' or not controller.enabled:
+            await self.app(scope, receive, send)
+            return
+        route_class = self.classify(scope['method'], scope['path'])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = controller.admit(client_ip(scope, self.trusted_proxies), route_class)
+        if rejection is not None:
+            await self._reject(send, *rejection)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    async def _reject(self, send, status, retry_after):
+        body = json.dumps({"detail": self.MESSAGES[status]}).encode()
+        retry_after = str(max(1, math.ceil(min(retry_after, 3600))))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', retry_after.encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
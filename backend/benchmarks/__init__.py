@@ -0,0 +1 @@
+"""Mirror Notes 后端性能压测脚本"""
@@ -0,0 +1,84 @@
+"""准入控制自身的开销：每个请求经过 AdmissionMiddleware 增加的耗时，以及令牌桶判断本身的耗时（进程内，不需要数据库）
+
+请求部分对比一个空 ASGI 应用有无中间件的每次调用耗时，请求经由 127.0.0.1 的受信任代理、来自 --ips 个不同的 X-Forwarded-For 地址，预算足够大不会拒绝；
+令牌桶部分直接调用 AdmissionController.admit / release，并给出 --ips 个桶占用的内存。
+
+    python -m benchmarks.admission_overhead --requests 200000 --ips 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from admission import AdmissionController, AdmissionMiddleware, parse_networks
+
+BUDGETS = {'read': (1e9, 1e9)}
+
+
+def bench_requests(count, ips):
+    async def endpoint(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def noop_send(message):
+        pass
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    scopes = [{
+        'type': 'http', 'method': 'GET', 'path': '/api/notes', 'client': ('127.0.0.1', 0),
+        'headers': [(b'host', b'bench'), (b'accept', b'application/json'), (b'x-forwarded-for', ip.encode())],
+    } for ip in ips]
+
+    async def run(app):
+        start = time.perf_counter()
+        for index in range(count):
+            await app(scopes[index % len(scopes)], receive, noop_send)
+        return (time.perf_counter() - start) / count
+
+    controller = AdmissionController(BUDGETS, wait_probe=lambda: (0, 0.0))
+    middleware = AdmissionMiddleware(endpoint, controller, lambda method, path: 'read',
+                                     trusted_proxies=parse_networks('127.0.0.1'))
+    baseline = asyncio.run(run(endpoint))
+    observed = asyncio.run(run(middleware))
+    return baseline, observed
+
+
+def bench_admit(count, ips):
+    controller = AdmissionController(BUDGETS, wait_probe=lambda: (0, 0.0))
+    admit, release = controller.admit, controller.release
+    start = time.perf_counter()
+    for index in range(count):
+        admit(ips[index % len(ips)], 'read')
+        release()
+    return (time.perf_counter() - start) / count
+
+
+def bucket_memory(ips):
+    tracemalloc.start()
+    controller = AdmissionController(BUDGETS, max_keys=len(ips) + 1)
+    for ip in ips:
+        controller.admit(ip, 'read')
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control overhead per request")
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--ips', type=int, default=10000)
+    args = parser.parse_args()
+    ips = [f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}" for index in range(args.ips)]
+
+    baseline, observed = bench_requests(args.requests, ips)
+    print(f"request  without middleware {baseline * 1e6:6.2f} us  with middleware {observed * 1e6:6.2f} us  "
+          f"overhead {(observed - baseline) * 1e6:5.2f} us")
+    print(f"admit()+release() {bench_admit(args.requests, ips) * 1e6:.2f} us  ({args.ips} distinct IPs)")
+    memory = bucket_memory(ips)
+    print(f"buckets memory {memory / 1024 / 1024:.1f} MB ({memory / args.ips:.0f} bytes per bucket, traced)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""对比两次 benchmarks.load 的结果文件，按并发级别和路由列出吞吐量与延迟的变化
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+延迟增加或吞吐量下降超过 threshold（百分比）的行标记为 REGRESSION，存在这样的行时退出码为 1
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def regressed(metric, percent, threshold):
+    if percent is None:
+        return False
+    # 吞吐量越高越好，延迟越低越好
+    return percent < -threshold if metric == 'rps' else percent > threshold
+
+
+def compare(before, after, threshold):
+    """返回 [(并发数, 路由, {指标: (之前, 之后, 变化百分比)}, 是否退化)]"""
+    rows = []
+    for level in sorted(set(before['levels']) & set(after['levels']), key=int):
+        old_level, new_level = before['levels'][level], after['levels'][level]
+        routes = [('TOTAL', old_level['total'], new_level['total'])]
+        routes += [
+            (route, old_level['routes'][route], new_level['routes'][route])
+            for route in sorted(set(old_level['routes']) & set(new_level['routes']))
+        ]
+        for route, old, new in routes:
+            metrics = {metric: (old[metric], new[metric], change(old[metric], new[metric])) for metric in METRICS}
+            worse = any(regressed(metric, values[2], threshold) for metric, values in metrics.items())
+            rows.append((level, route, metrics, worse))
+    return rows
+
+
+def _format(values):
+    before, after, percent = values
+    if after is None:
+        return f"{'-':>18}"
+    text = f"{after:.1f}"
+    if percent is not None:
+        text += f" ({percent:+.0f}%)"
+    return f"{text:>18}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmarks.load result files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help="判定为退化的变化百分比")
+    args = parser.parse_args()
+
+    with open(args.before, encoding='utf-8') as file:
+        before = json.load(file)
+    with open(args.after, encoding='utf-8') as file:
+        after = json.load(file)
+
+    print(f"before: {before['meta'].get('commit')} {before['meta'].get('started_at')}")
+    print(f"after:  {after['meta'].get('commit')} {after['meta'].get('started_at')}")
+    rows = compare(before, after, args.threshold)
+    current_level = None
+    for level, route, metrics, worse in rows:
+        if level != current_level:
+            current_level = level
+            print(f"\nconcurrency {level}")
+            print(f"{'route':<52}" + ''.join(f"{metric:>18}" for metric in METRICS))
+        print(f"{route:<52}" + ''.join(_format(metrics[metric]) for metric in METRICS)
+              + ("  REGRESSION" if worse else ""))
+
+    if any(worse for *_, worse in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""并发压测：测量接口在不同并发数下的吞吐量（requests/sec）
+
+两种模式：
+
+1. 压测运行中的服务（分别在改动前后的代码上启动服务各跑一次）::
+
+    python -m benchmarks.concurrency --url http://127.0.0.1:8000/api/notes --concurrency 1,8,32
+
+2. 不依赖数据库的进程内模拟，对比“在事件循环里直接阻塞查询”与“放到有界线程池执行”::
+
+    python -m benchmarks.concurrency --simulate --query-ms 20 --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _fetch(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def bench_url(url, concurrency, requests, timeout=10.0):
+    """用 concurrency 个线程向 url 发送 requests 个 GET 请求"""
+    errors = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_fetch, url, timeout) for _ in range(requests)]
+        for future in futures:
+            try:
+                if future.result() != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    return {'requests': requests, 'errors': errors, 'seconds': elapsed, 'rps': requests / elapsed}
+
+
+def bench_simulated(concurrency, requests, query_seconds, workers):
+    """进程内模拟：handler 内部执行一次耗时 query_seconds 的阻塞查询"""
+
+    def blocking_query():
+        time.sleep(query_seconds)
+        return [{'id': 1}]
+
+    async def blocking_handler():
+        return blocking_query()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def executor_handler():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, blocking_query)
+
+    async def drive(handler):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await handler()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+    try:
+        before = asyncio.run(drive(blocking_handler))
+        after = asyncio.run(drive(executor_handler))
+    finally:
+        executor.shutdown(wait=True)
+    return {'blocking_rps': before, 'executor_rps': after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror Notes API concurrency benchmark")
+    parser.add_argument('--url', help="要压测的接口地址")
+    parser.add_argument('--simulate', action='store_true', help="进程内模拟，不需要启动服务")
+    parser.add_argument('--concurrency', default='1,8,32', help="逗号分隔的并发数列表")
+    parser.add_argument('--requests', type=int, default=400, help="每个并发级别的请求总数")
+    parser.add_argument('--query-ms', type=float, default=20.0, help="模拟模式下单次查询耗时（毫秒）")
+    parser.add_argument('--workers', type=int, default=10, help="模拟模式下线程池大小")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    if args.simulate:
+        print(f"{'concurrency':>11} {'blocking rps':>13} {'executor rps':>13}")
+        for level in levels:
+            result = bench_simulated(level, args.requests, args.query_ms / 1000, args.workers)
+            print(f"{level:>11} {result['blocking_rps']:>13.1f} {result['executor_rps']:>13.1f}")
+    elif args.url:
+        print(f"{'concurrency':>11} {'rps':>10} {'errors':>7}")
+        for level in levels:
+            result = bench_url(args.url, level, args.requests)
+            print(f"{level:>11} {result['rps']:>10.1f} {result['errors']:>7}")
+    else:
+        parser.error("either --url or --simulate is required")
+
+
+if __name__ == '__main__':
+    main()
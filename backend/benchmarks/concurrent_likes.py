@@ -0,0 +1,86 @@
+"""并发点赞一致性检查
+
+对运行中的服务，用 users 个不同的 X-Forwarded-For 地址并发点赞同一笔记，每个地址重复 repeat 次，
+校验笔记 like_count 的增量恰好等于 users，且每个地址只有一次点赞成功；最后全部取消点赞，
+校验计数恢复原值。任何一项不符合都以非零状态退出。
+
+    python -m benchmarks.concurrent_likes --base-url http://127.0.0.1:8000 --note-id 1 --users 200 --repeat 3
+
+不需要运行中服务的进程内版本（含反应计数）见 tests/test_concurrent_counters.py。
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def request(base_url, method, path, ip=None):
+    req = urllib.request.Request(f"{base_url}{path}", method=method)
+    if ip:
+        req.add_header('X-Forwarded-For', ip)
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def like_count(base_url, note_id):
+    # 单条笔记可能命中本进程缓存，写操作会使其失效，因此读到的是最新计数
+    return request(base_url, 'GET', f"/api/notes/{note_id}")['data']['like_count']
+
+
+def hammer(base_url, method, note_id, ips, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(request, base_url, method, f"/api/notes/{note_id}/like", ip) for ip in ips]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent like consistency check")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--note-id', type=int, required=True)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help="每个地址重复点赞的次数")
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    run_id = random.randint(0, 250)
+    ips = [f"10.{run_id}.{index // 250}.{index % 250 + 1}" for index in range(args.users)]
+    attempts = ips * args.repeat
+    random.shuffle(attempts)
+
+    before = like_count(args.base_url, args.note_id)
+    start = time.perf_counter()
+    results = hammer(args.base_url, 'POST', args.note_id, attempts, args.concurrency)
+    elapsed = time.perf_counter() - start
+    after_like = like_count(args.base_url, args.note_id)
+
+    successes = sum(1 for result in results if result['success'])
+    print(f"{len(attempts)} like requests in {elapsed:.2f}s ({len(attempts) / elapsed:.0f} req/s)")
+    print(f"like_count {before} -> {after_like}, successful likes {successes}")
+
+    failures = []
+    if after_like - before != args.users:
+        failures.append(f"like_count grew by {after_like - before}, expected {args.users}")
+    if successes != args.users:
+        failures.append(f"{successes} likes reported success, expected {args.users}")
+
+    unlike_results = hammer(args.base_url, 'DELETE', args.note_id, attempts, args.concurrency)
+    after_unlike = like_count(args.base_url, args.note_id)
+    unlike_successes = sum(1 for result in unlike_results if result['success'])
+    print(f"like_count after unlike {after_unlike}, successful unlikes {unlike_successes}")
+    if after_unlike != before:
+        failures.append(f"like_count is {after_unlike} after unlike, expected {before}")
+    if unlike_successes != args.users:
+        failures.append(f"{unlike_successes} unlikes reported success, expected {args.users}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""全接口混合读写压测，按路由输出吞吐量和 p50/p95/p99 延迟到 JSON 文件，便于前后两次运行对比
+
+默认在进程内以 ASGI 方式直接调用应用（不经过网络），应用使用 .env 中配置的数据库
+（DB_BACKEND=sqlite 时为嵌入式数据库，不需要外部服务）；
+也可以用 --url 压测运行中的服务。--seed 会先向数据库写入合成数据（仅限测试库）::
+
+    python -m benchmarks.load --seed --notes 5000 --stickers 5000 --concurrency 1,8,32 --duration 10 --output before.json
+    # 修改代码后
+    python -m benchmarks.load --concurrency 1,8,32 --duration 10 --output after.json
+    python -m benchmarks.compare before.json after.json
+
+读写比例见 PROFILE；写操作使用随机的 X-Forwarded-For 地址模拟不同用户，删除只针对压测自己创建的便签。
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+# 不纳入混合压测的路由：文档页面和长连接推送（见 benchmarks.stream_subscribers）
+EXCLUDED_ROUTES = {
+    'GET /docs', 'GET /docs/oauth2-redirect', 'GET /redoc', 'GET /openapi.json',
+    'GET /api/wall/stream',
+}
+
+
+class BenchState:
+    """压测过程中已知的笔记/便签ID，以及压测创建的便签"""
+
+    def __init__(self, rng, users):
+        self.rng = rng
+        self.note_ids = []
+        self.sticker_ids = []
+        self.created_stickers = []
+        self.ips = [f"10.{200 + index // 65536 % 50}.{index // 256 % 256}.{index % 256}" for index in range(users)]
+        self.lock = threading.Lock()
+
+    def ip(self):
+        return self.rng.choice(self.ips)
+
+    def note_id(self):
+        return self.rng.choice(self.note_ids) if self.note_ids else 1
+
+    def sticker_id(self):
+        return self.rng.choice(self.sticker_ids) if self.sticker_ids else 1
+
+    def sticker_ids_sample(self, count):
+        if not self.sticker_ids:
+            return [1]
+        return self.rng.sample(self.sticker_ids, min(count, len(self.sticker_ids)))
+
+    def add_stickers(self, ids):
+        with self.lock:
+            self.sticker_ids.extend(ids)
+            self.created_stickers.extend(ids)
+
+    def take_created_sticker(self):
+        with self.lock:
+            if not self.created_stickers:
+                return None
+            sticker_id = self.created_stickers.pop(self.rng.randrange(len(self.created_stickers)))
+            if sticker_id in self.sticker_ids:
+                self.sticker_ids.remove(sticker_id)
+            return sticker_id
+
+
+def _sticker_body(rng):
+    return {
+        "text": f"benchmark sticker {rng.randrange(1000000)}",
+        "type": rng.choice(["anxiety", "support"]),
+        "category": rng.choice(["skin", "hair", "nose", "eyes", ""]),
+        "body_part": "benchmark",
+        "intensity": rng.randint(1, 5),
+        "position_x": round(rng.uniform(0, 95), 2),
+        "position_y": round(rng.uniform(0, 90), 2),
+        "rotation": round(rng.uniform(-5, 5), 2),
+    }
+
+
+def _position(state):
+    rng = state.rng
+    return {
+        "id": state.sticker_id(),
+        "position_x": round(rng.uniform(0, 95), 2),
+        "position_y": round(rng.uniform(0, 90), 2),
+        "rotation": rng.choice([None, round(rng.uniform(-5, 5), 2)]),
+    }
+
+
+def _created_ids(result):
+    data = result.get('data') or {}
+    if 'ids' in data:
+        return data['ids']
+    return [data['id']] if 'id' in data else []
+
+
+# 每项为 (路由, 权重, 生成请求的函数)；函数返回 (method, path, query, body, ip, 处理响应的回调或 None)
+PROFILE = [
+    # 笔记
+    ('GET /api/notes', 10, lambda s: ('GET', '/api/notes', {'limit': 20}, None, None, None)),
+    ('GET /api/notes/bootstrap', 5, lambda s: ('GET', '/api/notes/bootstrap', {'limit': 20}, None, s.ip(), None)),
+    ('GET /api/notes/trending', 4, lambda s: ('GET', '/api/notes/trending', {'limit': 20}, None, None, None)),
+    ('GET /api/notes/{note_id}', 5, lambda s: ('GET', f'/api/notes/{s.note_id()}', None, None, None, None)),
+    ('GET /api/notes/{note_id}/liked', 3, lambda s: ('GET', f'/api/notes/{s.note_id()}/liked', None, None, s.ip(), None)),
+    ('GET /api/user/likes', 2, lambda s: ('GET', '/api/user/likes', None, None, s.ip(), None)),
+    ('POST /api/notes', 1, lambda s: ('POST', '/api/notes', None, {
+        "content": f"benchmark note {s.rng.randrange(1000000)}", "author_type": "anonymous"}, None, None)),
+    ('POST /api/notes/{note_id}/like', 3, lambda s: ('POST', f'/api/notes/{s.note_id()}/like', None, None, s.ip(), None)),
+    ('DELETE /api/notes/{note_id}/like', 1, lambda s: ('DELETE', f'/api/notes/{s.note_id()}/like', None, None, s.ip(), None)),
+
+    # 便签
+    ('GET /api/wall/stickers', 10, lambda s: ('GET', '/api/wall/stickers', {'limit': 20}, None, None, None)),
+    ('GET /api/wall/stickers/random', 10, lambda s: ('GET', '/api/wall/stickers/random', {'limit': 6}, None, None, None)),
+    ('GET /api/wall/stickers/viewport', 6, lambda s: (
+        lambda x, y, size: ('GET', '/api/wall/stickers/viewport', {
+            'x0': x, 'y0': y, 'x1': x + size, 'y1': y + size}, None, None, None))(
+        round(s.rng.uniform(0, 80), 1), round(s.rng.uniform(0, 80), 1), s.rng.choice([10, 20, 40]))),
+    ('GET /api/wall/bootstrap', 8, lambda s: ('GET', '/api/wall/bootstrap', {'limit': 20}, None, s.ip(), None)),
+    ('GET /api/wall/stickers/{sticker_id}', 5, lambda s: ('GET', f'/api/wall/stickers/{s.sticker_id()}', None, None, None, None)),
+    ('GET /api/wall/stickers/filter', 4, lambda s: ('GET', '/api/wall/stickers/filter', {
+        'category': s.rng.choice(['all', 'skin', 'hair,skin', 'support', 'eyes,nose,support']),
+        'intensity': s.rng.choice(['all', '3', '4,5']), 'limit': 20}, None, None, None)),
+    ('GET /api/wall/stats', 2, lambda s: ('GET', '/api/wall/stats', None, None, None, None)),
+    ('POST /api/wall/stickers', 1, lambda s: ('POST', '/api/wall/stickers', None, _sticker_body(s.rng), None,
+                                              lambda result: s.add_stickers(_created_ids(result)))),
+    ('POST /api/wall/stickers/batch', 0.3, lambda s: ('POST', '/api/wall/stickers/batch', None, {
+        "stickers": [_sticker_body(s.rng) for _ in range(10)]}, None, lambda result: s.add_stickers(_created_ids(result)))),
+    ('PUT /api/wall/stickers/{sticker_id}/position', 3, lambda s: (
+        lambda position: ('PUT', f"/api/wall/stickers/{position['id']}/position", None, position, None, None))(_position(s))),
+    ('PUT /api/wall/stickers/positions', 1, lambda s: ('PUT', '/api/wall/stickers/positions', None, {
+        "positions": [_position(s) for _ in range(10)]}, None, None)),
+    ('DELETE /api/wall/stickers/{sticker_id}', 0.5, lambda s: (
+        lambda sticker_id: ('DELETE', f'/api/wall/stickers/{sticker_id}', None, None, None, None)
+        if sticker_id is not None else None)(s.take_created_sticker())),
+
+    # 反应
+    ('GET /api/wall/stickers/{sticker_id}/reactions', 4, lambda s: (
+        'GET', f'/api/wall/stickers/{s.sticker_id()}/reactions', None, None, None, None)),
+    ('GET /api/wall/reactions', 4, lambda s: ('GET', '/api/wall/reactions', {
+        'ids': ','.join(str(id) for id in s.sticker_ids_sample(50))}, None, None, None)),
+    ('POST /api/wall/reactions', 1, lambda s: ('POST', '/api/wall/reactions', None, {"ids": s.sticker_ids_sample(200)}, None, None)),
+    ('GET /api/wall/user/reactions', 2, lambda s: ('GET', '/api/wall/user/reactions', None, None, s.ip(), None)),
+    ('POST /api/wall/stickers/{sticker_id}/reactions', 3, lambda s: (
+        'POST', f'/api/wall/stickers/{s.sticker_id()}/reactions', None,
+        {"reaction_type": s.rng.choice(["same", "great"])}, s.ip(), None)),
+    ('DELETE /api/wall/stickers/{sticker_id}/reactions', 1, lambda s: (
+        'DELETE', f'/api/wall/stickers/{s.sticker_id()}/reactions', None,
+        {"reaction_type": s.rng.choice(["same", "great"])}, s.ip(), None)),
+
+    # 检索与导出
+    ('GET /api/search', 4, lambda s: ('GET', '/api/search', {
+        'q': s.rng.choice(["镜子", "牙齿", "confidence", "hair", "自己", "benchmark"])}, None, None, None)),
+    ('GET /api/export/{kind}', 0.2, lambda s: ('GET', f"/api/export/{s.rng.choice(['notes', 'stickers', 'reactions'])}", {
+        'since': (datetime.now() - timedelta(minutes=1)).isoformat(timespec='seconds')}, None, None, None)),
+
+    # 运行状态
+    ('GET /', 0.2, lambda s: ('GET', '/', None, None, None, None)),
+    ('GET /api/db/pool', 0.2, lambda s: ('GET', '/api/db/pool', None, None, None, None)),
+    ('GET /api/admission/stats', 0.2, lambda s: ('GET', '/api/admission/stats', None, None, None, None)),
+    ('GET /api/cache/stats', 0.2, lambda s: ('GET', '/api/cache/stats', None, None, None, None)),
+    ('GET /api/wall/positions/buffer', 0.2, lambda s: ('GET', '/api/wall/positions/buffer', None, None, None, None)),
+    ('GET /api/wall/reactions/buffer', 0.2, lambda s: ('GET', '/api/wall/reactions/buffer', None, None, None, None)),
+    ('GET /api/search/stats', 0.2, lambda s: ('GET', '/api/search/stats', None, None, None, None)),
+    ('GET /api/notes/trending/stats', 0.2, lambda s: ('GET', '/api/notes/trending/stats', None, None, None, None)),
+    ('GET /api/wall/grid/stats', 0.2, lambda s: ('GET', '/api/wall/grid/stats', None, None, None, None)),
+    ('GET /api/wall/stream/stats', 0.2, lambda s: ('GET', '/api/wall/stream/stats', None, None, None, None)),
+    ('GET /metrics', 0.2, lambda s: ('GET', '/metrics', None, None, None, None)),
+]
+
+
+class AsgiClient:
+    """进程内以 ASGI 方式调用应用，不经过网络"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, query=None, body=None, ip=None):
+        query_string = urlencode(query or {}).encode()
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [(b'host', b'bench'), (b'content-type', b'application/json'),
+                   (b'content-length', str(len(payload)).encode())]
+        if ip:
+            headers.append((b'x-forwarded-for', ip.encode()))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query_string, 'root_path': '', 'headers': headers,
+            'client': (ip or '127.0.0.1', 0), 'server': ('bench', 80),
+        }
+        response = {'status': None, 'body': []}
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            await asyncio.sleep(3600)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return response['status'], b''.join(response['body'])
+
+
+class HttpClient:
+    """压测运行中的服务：每个工作线程复用一个 HTTP 长连接"""
+
+    def __init__(self, base_url, concurrency):
+        from concurrent.futures import ThreadPoolExecutor
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.local = threading.local()
+
+    def _request(self, method, path, query, body, ip):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        url = f"{path}?{urlencode(query)}" if query else path
+        headers = {'Content-Type': 'application/json'}
+        if ip:
+            headers['X-Forwarded-For'] = ip
+        try:
+            connection.request(method, url, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+
+    async def request(self, method, path, query=None, body=None, ip=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._request, method, path, query, body, ip)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, seconds):
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'errors': errors,
+        'rps': round(count / seconds, 2) if seconds else None,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3) if values else None,
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3) if values else None,
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3) if values else None,
+    }
+
+
+async def load_known_ids(client, state):
+    """从列表接口读取已有的笔记/便签ID；没有数据时先创建少量便签和笔记"""
+    _, body = await client.request('GET', '/api/notes', {'limit': 100})
+    state.note_ids = [note['id'] for note in json.loads(body).get('data', [])]
+    _, body = await client.request('GET', '/api/wall/stickers', {'limit': 100})
+    state.sticker_ids = [sticker['id'] for sticker in json.loads(body).get('data', [])]
+    if not state.note_ids:
+        for index in range(10):
+            _, body = await client.request('POST', '/api/notes', body={"content": f"benchmark note {index}"})
+            state.note_ids.extend(_created_ids(json.loads(body)))
+    if not state.sticker_ids:
+        _, body = await client.request('POST', '/api/wall/stickers/batch', body={
+            "stickers": [_sticker_body(state.rng) for _ in range(20)]})
+        state.add_stickers(_created_ids(json.loads(body)))
+    if not state.note_ids or not state.sticker_ids:
+        raise RuntimeError("Failed to read or create notes/stickers; check the database connection")
+
+
+async def run_level(client, state, concurrency, duration, profile):
+    routes = [entry[0] for entry in profile]
+    weights = [entry[1] for entry in profile]
+    builders = {entry[0]: entry[2] for entry in profile}
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            route = state.rng.choices(routes, weights)[0]
+            request = builders[route](state)
+            if request is None:
+                continue
+            method, path, query, body, ip, on_success = request
+            start = time.perf_counter()
+            try:
+                status, content = await client.request(method, path, query, body, ip)
+            except Exception:
+                errors[route] += 1
+                continue
+            latencies[route].append(time.perf_counter() - start)
+            # 业务上的失败（如重复点赞返回 success=false）不计为错误，只统计 5xx 和请求异常
+            if status >= 500:
+                errors[route] += 1
+            elif on_success is not None and status == 200:
+                on_success(json.loads(content))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'seconds': round(seconds, 3),
+        'total': summarize(all_latencies, sum(errors.values()), seconds),
+        'routes': {route: summarize(latencies[route], errors[route], seconds) for route in sorted(routes)},
+    }
+
+
+def app_routes(app):
+    routes = set()
+    for route in app.routes:
+        for method in getattr(route, 'methods', None) or ():
+            if method != 'HEAD':
+                routes.add(f"{method} {route.path}")
+    return routes
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args):
+    state = BenchState(random.Random(args.random_seed), args.users)
+    uncovered = []
+    if args.url:
+        client = HttpClient(args.url, max(args.concurrency_levels))
+        app = None
+    else:
+        from main import app
+        client = AsgiClient(app)
+        uncovered = sorted(app_routes(app) - {entry[0] for entry in PROFILE} - EXCLUDED_ROUTES)
+        await app.router.startup()
+
+    try:
+        await load_known_ids(client, state)
+        levels = {}
+        for concurrency in args.concurrency_levels:
+            if args.warmup:
+                await run_level(client, state, concurrency, args.warmup, PROFILE)
+            levels[str(concurrency)] = await run_level(client, state, concurrency, args.duration, PROFILE)
+            total = levels[str(concurrency)]['total']
+            print(f"concurrency {concurrency:>4}: {total['rps']:>9.1f} req/s  p50 {total['p50_ms']} ms  "
+                  f"p95 {total['p95_ms']} ms  p99 {total['p99_ms']} ms  errors {total['errors']}")
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'target': args.url or 'in-process',
+            'duration': args.duration,
+            'concurrency': args.concurrency_levels,
+            'random_seed': args.random_seed,
+            'users': args.users,
+            'profile': {entry[0]: entry[1] for entry in PROFILE},
+            'uncovered_routes': uncovered,
+        },
+        'levels': levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write load test for every API route")
+    parser.add_argument('--url', help="运行中服务的地址；不指定时在进程内调用应用")
+    parser.add_argument('--concurrency', default='1,8,32', help="逗号分隔的并发数")
+    parser.add_argument('--duration', type=float, default=10.0, help="每个并发级别的压测秒数")
+    parser.add_argument('--warmup', type=float, default=2.0, help="每个并发级别正式计时前的预热秒数")
+    parser.add_argument('--users', type=int, default=500, help="模拟的不同用户IP数")
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--seed', action='store_true', help="压测前写入合成数据（仅限测试库）")
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument('--stickers', type=int, default=5000)
+    parser.add_argument('--reactions', type=int, default=20000)
+    parser.add_argument('--likes', type=int, default=20000)
+    args = parser.parse_args()
+    args.concurrency_levels = [int(value) for value in args.concurrency.split(',')]
+
+    if args.seed:
+        from benchmarks.seed import seed
+        print(f"Seeded {seed(args.notes, args.stickers, args.reactions, args.likes)}")
+
+    result = asyncio.run(run(args))
+    if result['meta']['uncovered_routes']:
+        print(f"Routes not covered by PROFILE: {', '.join(result['meta']['uncovered_routes'])}")
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(result, output, indent=2, sort_keys=True, ensure_ascii=False)
+        output.write('\n')
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
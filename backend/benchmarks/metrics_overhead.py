@@ -0,0 +1,88 @@
+"""指标自身的开销：每条语句经过 QueryMetrics 监听器、每个请求经过 RequestMetricsMiddleware 增加的耗时（进程内，不需要数据库）
+
+语句部分在内存 SQLite 上执行 SELECT 1，对比有无监听器的每条耗时；请求部分对比一个空 ASGI 应用有无中间件的每次调用耗时。
+
+    python -m benchmarks.metrics_overhead --statements 200000 --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from database import _statement_listeners
+from metrics import MetricsRegistry, QueryMetrics, RequestMetricsMiddleware
+from sqlite_database import SQLiteConnection
+
+
+def run_statements(cursor, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        cursor.execute("SELECT 1")
+    return (time.perf_counter() - start) / count
+
+
+def bench_statements(count):
+    connection = SQLiteConnection(':memory:', readonly=True)
+    cursor = connection.cursor()
+    listener = QueryMetrics(MetricsRegistry(), slow_query_seconds=float('inf'))
+
+    run_statements(cursor, count // 10)
+    baseline = run_statements(cursor, count)
+    _statement_listeners.append(listener)
+    try:
+        run_statements(cursor, count // 10)
+        observed = run_statements(cursor, count)
+    finally:
+        _statement_listeners.remove(listener)
+
+    # 只测监听器本身：调用栈深度与真实调用相近
+    def service_method():
+        start = time.perf_counter()
+        for _ in range(count):
+            listener(cursor, "SELECT 1", None, 0.0001, None)
+        return (time.perf_counter() - start) / count
+    return baseline, observed, service_method()
+
+
+def bench_requests(count):
+    async def endpoint(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    class App:
+        routes = []
+
+    async def noop_send(message):
+        pass
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def run(app):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/', 'app': App()}
+        start = time.perf_counter()
+        for _ in range(count):
+            await app(dict(scope), receive, noop_send)
+        return (time.perf_counter() - start) / count
+
+    middleware = RequestMetricsMiddleware(endpoint, MetricsRegistry())
+    baseline = asyncio.run(run(endpoint))
+    observed = asyncio.run(run(middleware))
+    return baseline, observed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead per statement and per request")
+    parser.add_argument('--statements', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=200000)
+    args = parser.parse_args()
+
+    baseline, observed, listener = bench_statements(args.statements)
+    print(f"statement  without listener {baseline * 1e6:6.2f} us  with listener {observed * 1e6:6.2f} us  "
+          f"overhead {(observed - baseline) * 1e6:5.2f} us  (listener call alone {listener * 1e6:.2f} us)")
+    baseline, observed = bench_requests(args.requests)
+    print(f"request    without middleware {baseline * 1e6:6.2f} us  with middleware {observed * 1e6:6.2f} us  "
+          f"overhead {(observed - baseline) * 1e6:5.2f} us")
+
+
+if __name__ == '__main__':
+    main()
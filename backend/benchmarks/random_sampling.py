@@ -0,0 +1,74 @@
+"""随机抽样基准：内存ID索引抽样延迟随表规模的变化
+
+    python -m benchmarks.random_sampling --sizes 1000,100000,1000000 --with-sql
+
+--with-sql 额外用内嵌 SQLite 测量 ORDER BY RANDOM() LIMIT k 作为对照（规模较大时较慢）。
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from sampling import StickerSampler
+
+TYPES = ('anxiety', 'support')
+CATEGORIES = ('nose', 'skin', 'hair', 'mouth', 'body', 'eyes', 'other', '')
+
+
+def synthetic_rows(size, seed=7):
+    rng = random.Random(seed)
+    return [(id, rng.choice(TYPES), rng.choice(CATEGORIES)) for id in range(1, size + 1)]
+
+
+def time_per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_sampler(rows, k, repeat):
+    sampler = StickerSampler(lambda: rows, refresh_interval=float('inf'))
+    start = time.perf_counter()
+    sampler.reload()
+    load_seconds = time.perf_counter() - start
+    return {
+        'load_ms': load_seconds * 1000,
+        'sample_us': time_per_call(lambda: sampler.sample(k), repeat) * 1e6,
+        'filtered_sample_us': time_per_call(lambda: sampler.sample(k, 'anxiety', 'skin'), repeat) * 1e6,
+    }
+
+
+def bench_sql(rows, k, repeat):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE wall_stickers (id INTEGER PRIMARY KEY, type TEXT, category TEXT)")
+    conn.executemany("INSERT INTO wall_stickers VALUES (?, ?, ?)", rows)
+    query = "SELECT id FROM wall_stickers ORDER BY RANDOM() LIMIT ?"
+    seconds = time_per_call(lambda: conn.execute(query, (k,)).fetchall(), repeat)
+    conn.close()
+    return seconds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random sticker sampling benchmark")
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--k', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--with-sql', action='store_true')
+    args = parser.parse_args()
+
+    header = f"{'rows':>9} {'load ms':>9} {'sample us':>10} {'filtered us':>12}"
+    if args.with_sql:
+        header += f" {'ORDER BY RANDOM() us':>21}"
+    print(header)
+    for size in (int(size) for size in args.sizes.split(',')):
+        rows = synthetic_rows(size)
+        result = bench_sampler(rows, args.k, args.repeat)
+        line = f"{size:>9} {result['load_ms']:>9.1f} {result['sample_us']:>10.2f} {result['filtered_sample_us']:>12.2f}"
+        if args.with_sql:
+            line += f" {bench_sql(rows, args.k, max(1, args.repeat // 200)):>21.1f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""便签反应写入：直接写入 vs 写回缓冲（可选本地日志）的吞吐量和延迟（进程内，使用当前配置的数据库）
+
+    python -m benchmarks.reaction_ingest --reactions 20000 --concurrency 8
+
+每种模式用新的一组用户IP对随机便签添加/移除反应（约 30% 为移除刚添加的反应），
+结束后写入缓冲中剩余的反应，校验涉及便签的 same_count/great_count 与 sticker_reactions 一致，不一致时以非零状态退出。
+会写入反应数据，请只对测试库执行（先用 benchmarks.seed 写入便签）。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db
+from services import StickerReactionService, reaction_buffer
+
+MODES = ('direct', 'buffered', 'journal')
+
+
+def sticker_ids(limit):
+    result = db.execute_query("SELECT id FROM wall_stickers ORDER BY id LIMIT %s", (limit,))
+    return [row['id'] for row in result or []]
+
+
+def operations(ids, count, prefix, random_seed):
+    """[(sticker_id, reaction_type, user_ip, 是否添加)]"""
+    rng = random.Random(random_seed)
+    result = []
+    for index in range(count):
+        ip = f"{prefix}.{index // 250 % 250}.{index % 250 + 1}"
+        sticker_id, reaction_type = rng.choice(ids), rng.choice(('same', 'great'))
+        result.append((sticker_id, reaction_type, ip, True))
+        if rng.random() < 0.3:
+            result.append((sticker_id, reaction_type, ip, False))
+    return result
+
+
+def run(ops, concurrency):
+    def call(op):
+        sticker_id, reaction_type, ip, add = op
+        start = time.perf_counter()
+        if add:
+            StickerReactionService.add_reaction(sticker_id, reaction_type, ip)
+        else:
+            StickerReactionService.remove_reaction(sticker_id, reaction_type, ip)
+        return time.perf_counter() - start
+
+    # 同一用户的添加和移除按顺序执行，不同用户之间并发
+    by_ip = {}
+    for op in ops:
+        by_ip.setdefault(op[2], []).append(op)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [latency for batch in pool.map(lambda batch: [call(op) for op in batch], by_ip.values())
+                     for latency in batch]
+    return latencies, time.perf_counter() - start
+
+
+def mismatched(ids):
+    placeholders = ", ".join(["%s"] * len(ids))
+    result = db.execute_query(f"""
+    SELECT id FROM wall_stickers
+    WHERE id IN ({placeholders}) AND (
+        same_count <> (SELECT COUNT(*) FROM sticker_reactions sr
+                       WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'same')
+        OR great_count <> (SELECT COUNT(*) FROM sticker_reactions sr
+                           WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'great'))
+    """, ids)
+    return [row['id'] for row in result or []]
+
+
+def percentile_ms(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reaction ingestion benchmark: direct vs write-behind")
+    parser.add_argument('--reactions', type=int, default=20000, help="每种模式添加的反应数")
+    parser.add_argument('--stickers', type=int, default=1000, help="反应分布在前多少个便签上")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--modes', default=','.join(MODES), help=f"逗号分隔：{', '.join(MODES)}")
+    parser.add_argument('--no-fsync', action='store_true', help="journal 模式不 fsync")
+    args = parser.parse_args()
+
+    db.connect()
+    ids = sticker_ids(args.stickers)
+    if not ids:
+        sys.exit("no stickers in the database; run benchmarks.seed first")
+
+    failed = False
+    journal_dir = tempfile.mkdtemp(prefix='reaction-journal-')
+    run_id = random.randint(0, 250)
+    for index, mode in enumerate(args.modes.split(',')):
+        ops = operations(ids, args.reactions, f"10.{run_id}.{index}", random_seed=index)
+        reaction_buffer.enabled = mode != 'direct'
+        reaction_buffer.journal_path = os.path.join(journal_dir, 'reactions.journal') if mode == 'journal' else ''
+        reaction_buffer.sync = not args.no_fsync
+        before = reaction_buffer.stats()
+        reaction_buffer.start()
+        latencies, elapsed = run(ops, args.concurrency)
+        start = time.perf_counter()
+        reaction_buffer.stop()
+        drain = time.perf_counter() - start
+        stats = reaction_buffer.stats()
+        bad = mismatched(sorted({op[0] for op in ops}))
+        failed = failed or bool(bad)
+        print(f"{mode:>8}: {len(ops) / elapsed:8.0f} ops/s  p50 {percentile_ms(latencies, 0.5):7.3f} ms  "
+              f"p99 {percentile_ms(latencies, 0.99):7.3f} ms  final flush {drain * 1000:6.1f} ms  "
+              f"flushes {stats['flushes'] - before['flushes']}  rows {stats['rows_written'] - before['rows_written']}  "
+              f"mismatched counts {len(bad)}")
+    reaction_buffer.enabled = False
+    db.disconnect()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
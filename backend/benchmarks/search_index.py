@@ -0,0 +1,88 @@
+"""全文检索索引：构建耗时、内存占用和查询延迟随文档数的变化（进程内，不需要数据库）
+
+    python -m benchmarks.search_index --sizes 10000,100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks.seed import NOTE_TEXTS, STICKER_TEXTS
+from search import SearchIndex
+
+QUERIES = ["镜子", "牙齿", "身材比例", "confidence", "hair", "自己 smile", "不孤单"]
+
+
+def synthetic_documents(count, random_seed=42):
+    """生成 [(kind, id, 文本, 热度)]：模板句子 + 随机英文词 + 随机中文词组
+
+    中文词组从 3000 个常用字组成的 20000 个两三字词中抽取，相邻词拼接产生的二字组
+    使词表随规模增长，接近真实文本的分布
+    """
+    rng = random.Random(random_seed)
+    english = [f"w{index}" for index in range(5000)]
+    chinese = [
+        "".join(chr(0x4e00 + rng.randrange(3000)) for _ in range(rng.randint(2, 3)))
+        for _ in range(20000)
+    ]
+    texts = NOTE_TEXTS + [text for text, _, _, _ in STICKER_TEXTS]
+    documents = []
+    for index in range(count):
+        phrase = "".join(rng.sample(chinese, rng.randint(2, 5)))
+        text = f"{rng.choice(texts)} {' '.join(rng.sample(english, 3))} {phrase}"
+        kind = 'note' if index % 2 else 'sticker'
+        documents.append((kind, index, text, rng.randrange(50)))
+    return documents
+
+
+def bench(size, queries_per_term):
+    documents = synthetic_documents(size)
+    index = SearchIndex(lambda: documents)
+
+    start = time.perf_counter()
+    index.reload()
+    build_seconds = time.perf_counter() - start
+
+    # 单独构建一次统计内存，tracemalloc 会拖慢构建
+    index = SearchIndex(lambda: documents)
+    tracemalloc.start()
+    index.reload()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    latencies = []
+    for query in QUERIES:
+        for _ in range(queries_per_term):
+            start = time.perf_counter()
+            index.search(query, limit=20)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    stats = index.stats()
+    return {
+        'documents': size,
+        'terms': stats['terms'],
+        'build_seconds': build_seconds,
+        'index_mb': memory / 1024 / 1024,
+        'mb_per_100k_documents': memory / 1024 / 1024 * 100000 / size,
+        'query_ms_p50': latencies[len(latencies) // 2] * 1000,
+        'query_ms_p95': latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory search index build/memory/query benchmark")
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--queries', type=int, default=20, help="每个查询词重复的次数")
+    args = parser.parse_args()
+
+    print(f"{'documents':>10} {'terms':>9} {'build s':>8} {'MB':>8} {'MB/100k':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in [int(value) for value in args.sizes.split(',')]:
+        result = bench(size, args.queries)
+        print(f"{result['documents']:>10} {result['terms']:>9} {result['build_seconds']:>8.2f} "
+              f"{result['index_mb']:>8.1f} {result['mb_per_100k_documents']:>8.1f} "
+              f"{result['query_ms_p50']:>8.2f} {result['query_ms_p95']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
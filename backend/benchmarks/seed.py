@@ -0,0 +1,135 @@
+"""向当前配置的数据库写入合成数据（笔记、便签、反应、点赞），用于压测和查询计划检查
+
+    python -m benchmarks.seed --notes 5000 --stickers 5000 --reactions 20000 --likes 20000
+
+请只对测试库执行。
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import db
+from services import SolutionService, StickerReactionService, response_cache, bump_version
+
+NOTE_TEXTS = [
+    "I quit filters and watched more vlogs by ordinary people.",
+    "Look at yourself smiling more often.",
+    "Practice self-compassion and positive self-talk.",
+    "每天对着镜子说一句鼓励自己的话。",
+    "少刷修图后的照片，多和真实的朋友见面。",
+    "把注意力放在自己能做好的事情上。",
+]
+STICKER_TEXTS = [
+    ("It feels too large and affects my confidence", 'anxiety', 'nose', 'My nose'),
+    ("The scars on my face make me feel self-conscious", 'anxiety', 'skin', 'Acne scars'),
+    ("My hair never looks the way I want it to", 'anxiety', 'hair', 'Frizzy hair'),
+    ("You're beautiful just the way you are", 'support', '', ''),
+    ("我的牙齿不整齐，笑的时候总会不自在", 'anxiety', 'mouth', '牙齿'),
+    ("我总觉得自己的身材比例不好", 'anxiety', 'body', '身材'),
+    ("我们每个人都有不安，你并不孤单", 'support', '', ''),
+    ("两只眼睛看起来不一样大", 'anxiety', 'eyes', '眼睛'),
+]
+
+
+def _created_at(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def _insert_batches(query, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        with db.transaction() as cursor:
+            cursor.executemany(query, rows[start:start + batch_size])
+
+
+def _id_range(table):
+    result = db.execute_query(f"SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM {table}")
+    if not result or result[0]['min_id'] is None:
+        return None
+    return result[0]['min_id'], result[0]['max_id']
+
+
+def _random_ip(rng, users):
+    index = rng.randrange(users)
+    return f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+
+
+def seed(notes=1000, stickers=1000, reactions=5000, likes=5000, users=2000, days=365,
+         batch_size=1000, random_seed=42):
+    """写入合成数据，返回各表写入（尝试）的行数"""
+    rng = random.Random(random_seed)
+    now = datetime.now().replace(microsecond=0)
+
+    note_rows = []
+    for index in range(notes):
+        signed = rng.random() < 0.4
+        note_rows.append((
+            f"{rng.choice(NOTE_TEXTS)} #{index}",
+            f"User {rng.randrange(users)}" if signed else 'Anonymous',
+            'signature' if signed else 'anonymous',
+            _created_at(rng, now, days),
+        ))
+    _insert_batches("""
+    INSERT INTO solution_notes (content, author_name, author_type, created_at)
+    VALUES (%s, %s, %s, %s)
+    """, note_rows, batch_size)
+
+    sticker_rows = []
+    for index in range(stickers):
+        text, type, category, body_part = rng.choice(STICKER_TEXTS)
+        sticker_rows.append((
+            f"{text} #{index}", type, category, body_part, rng.randint(1, 5),
+            round(rng.uniform(0, 95), 2), round(rng.uniform(0, 90), 2), round(rng.uniform(-5, 5), 2),
+            _created_at(rng, now, days),
+        ))
+    _insert_batches("""
+    INSERT INTO wall_stickers (text, type, category, body_part, intensity, position_x, position_y, rotation, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, sticker_rows, batch_size)
+
+    sticker_range = _id_range('wall_stickers')
+    if sticker_range and reactions:
+        reaction_rows = [
+            (rng.randint(*sticker_range), rng.choice(('same', 'great')), _random_ip(rng, users))
+            for _ in range(reactions)
+        ]
+        _insert_batches("""
+        INSERT IGNORE INTO sticker_reactions (sticker_id, reaction_type, user_ip) VALUES (%s, %s, %s)
+        """, reaction_rows, batch_size)
+        StickerReactionService.reconcile_reaction_counts()
+
+    note_range = _id_range('solution_notes')
+    if note_range and likes:
+        like_rows = [(_random_ip(rng, users), rng.randint(*note_range)) for _ in range(likes)]
+        _insert_batches("INSERT IGNORE INTO user_likes (user_ip, note_id) VALUES (%s, %s)", like_rows, batch_size)
+        db.execute_update("""
+        UPDATE solution_notes SET
+            like_count = (SELECT COUNT(*) FROM user_likes ul WHERE ul.note_id = solution_notes.id),
+            helped_count = (SELECT COUNT(*) FROM user_likes ul WHERE ul.note_id = solution_notes.id)
+        """)
+    if note_range:
+        SolutionService.rebuild_hot_scores()
+
+    response_cache.clear()
+    bump_version('notes')
+    bump_version('stickers')
+    return {'notes': notes, 'stickers': stickers, 'reactions': reactions, 'likes': likes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the configured database with synthetic data")
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--stickers', type=int, default=1000)
+    parser.add_argument('--reactions', type=int, default=5000)
+    parser.add_argument('--likes', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=2000, help="模拟的不同用户IP数")
+    parser.add_argument('--seed', type=int, default=42, help="随机数种子")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed(args.notes, args.stickers, args.reactions, args.likes, args.users, random_seed=args.seed)
+    print(f"Seeded {counts} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""列表响应序列化：对比通用路径与 FastJSONResponse 序列化 N 个便签的耗时和内存分配（进程内，不需要数据库）
+
+通用路径：to_dict() -> jsonable_encoder -> JSONResponse
+快速路径：FastJSONResponse 直接调用模型的 to_json 拼接
+
+    python -m benchmarks.serialization --stickers 10000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from models import WallSticker
+from responses import FastJSONResponse
+
+
+def synthetic_stickers(count):
+    """模拟 DictCursor 读出的行：DECIMAL 列为 Decimal，时间列为 datetime"""
+    now = datetime(2025, 1, 1)
+    return [
+        WallSticker.from_dict({
+            'id': index, 'text': f"我的牙齿不整齐，笑的时候总会不自在 #{index}", 'type': 'anxiety',
+            'category': 'mouth', 'body_part': '牙齿', 'intensity': index % 5 + 1,
+            'position_x': Decimal('12.34'), 'position_y': Decimal('56.70'), 'rotation': Decimal('-1.50'),
+            'created_at': now - timedelta(minutes=index), 'updated_at': now,
+            'same_count': index % 7, 'great_count': index % 3,
+        })
+        for index in range(count)
+    ]
+
+
+def generic_path(stickers):
+    content = {"success": True, "data": [sticker.to_dict() for sticker in stickers], "count": len(stickers)}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(stickers):
+    return FastJSONResponse({"success": True, "data": stickers, "count": len(stickers)}).body
+
+
+def measure(func, stickers, repeat):
+    func(stickers)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func(stickers)
+    seconds = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(stickers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ms': seconds * 1000, 'peak_mb': peak / 1024 / 1024, 'bytes': len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List response serialization benchmark")
+    parser.add_argument('--stickers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    stickers = synthetic_stickers(args.stickers)
+    assert generic_path(stickers) == fast_path(stickers), "fast path output differs from JSONResponse"
+
+    tracemalloc.start()
+    sample = synthetic_stickers(1000)
+    per_sticker = tracemalloc.get_traced_memory()[0] / len(sample)
+    tracemalloc.stop()
+    del sample
+    print(f"WallSticker with row values: {per_sticker:.0f} bytes per object")
+
+    print(f"{'path':<10} {'ms':>9} {'peak MB':>9} {'response KB':>12}")
+    for name, func in (('generic', generic_path), ('fast', fast_path)):
+        result = measure(func, stickers, args.repeat)
+        print(f"{name:<10} {result['ms']:>9.1f} {result['peak_mb']:>9.1f} {result['bytes'] / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""实时推送压测：大量空闲 SSE 订阅者的每连接内存和广播延迟
+
+两种模式：
+
+1. 进程内（默认，不需要数据库和网络）：直接以 ASGI 调用 /api/wall/stream 建立 N 个空闲订阅，
+   用 tracemalloc 统计每个订阅的 Python 内存，再从线程池发布事件，测量送达全部订阅者的耗时::
+
+    python -m benchmarks.stream_subscribers --subscribers 1000,5000 --events 20
+
+2. 对运行中的服务建立 N 个真实连接，保持空闲 hold 秒；指定 --pid 时读取服务进程的 RSS 变化::
+
+    python -m benchmarks.stream_subscribers --url http://127.0.0.1:8000 --subscribers 5000 --pid 12345
+
+系统的文件描述符上限（ulimit -n）需要大于订阅者数。
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+import urllib.request
+from urllib.parse import urlsplit
+
+
+def _rss_bytes(pid='self'):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class _Progress:
+    """统计一次广播送达的订阅者数，全部送达时触发 done"""
+
+    def __init__(self):
+        self.remaining = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count):
+        self.remaining = count
+        self.done.clear()
+
+    def received(self):
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.done.set()
+
+
+class _IdleConnection:
+    """以 ASGI 方式调用应用的一个 SSE 连接，统计收到的事件数"""
+
+    def __init__(self, app, progress):
+        self.app = app
+        self.progress = progress
+        self.started = asyncio.Event()
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            self.started.set()
+            if message.get('body', b'').startswith(b'id:'):
+                self.progress.received()
+
+    def run(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/wall/stream', 'raw_path': b'/api/wall/stream',
+            'query_string': b'', 'root_path': '', 'headers': [(b'host', b'bench')],
+            'client': ('127.0.0.1', 0), 'server': ('bench', 80),
+        }
+        return asyncio.ensure_future(self.app(scope, self.receive, self.send))
+
+
+async def bench_in_process(count, events):
+    from main import app
+    from services import wall_events
+
+    gc.collect()
+    tracemalloc.start()
+    before_traced = tracemalloc.get_traced_memory()[0]
+    before_rss = _rss_bytes()
+
+    progress = _Progress()
+    connections = [_IdleConnection(app, progress) for _ in range(count)]
+    tasks = [connection.run() for connection in connections]
+    await asyncio.gather(*(connection.started.wait() for connection in connections))
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - before_traced
+    rss = _rss_bytes()
+    tracemalloc.stop()
+
+    # 从线程池发布，和服务层的调用方式一致
+    loop = asyncio.get_running_loop()
+    latencies = []
+    for index in range(events):
+        progress.expect(count)
+        start = time.perf_counter()
+        await loop.run_in_executor(None, wall_events.publish, 'moved', {
+            'id': index, 'position_x': 10.0, 'position_y': 20.0, 'rotation': None,
+        })
+        await progress.done.wait()
+        latencies.append(time.perf_counter() - start)
+
+    stats = wall_events.stats()
+    for connection in connections:
+        connection.disconnected.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    return {
+        'subscribers': count,
+        'traced_bytes_per_subscriber': traced / count,
+        'rss_bytes_per_subscriber': (rss - before_rss) / count if rss and before_rss else None,
+        'fanout_ms_p50': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'fanout_ms_max': latencies[-1] * 1000 if latencies else None,
+        'delivered': stats['delivered'],
+        'overflows': stats['overflows'],
+        'subscribers_after_close': wall_events.stats()['subscribers'],
+    }
+
+
+async def _open_stream(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    return writer, status_line.split(b' ')[1:2] == [b'200']
+
+
+async def bench_url(base_url, count, hold, pid):
+    parts = urlsplit(base_url)
+    before_rss = _rss_bytes(pid) if pid else None
+
+    results = await asyncio.gather(
+        *(_open_stream(parts.hostname, parts.port or 80, '/api/wall/stream') for _ in range(count)),
+        return_exceptions=True
+    )
+    writers = [result[0] for result in results if not isinstance(result, BaseException)]
+    accepted = sum(1 for result in results if not isinstance(result, BaseException) and result[1])
+    await asyncio.sleep(hold)
+    after_rss = _rss_bytes(pid) if pid else None
+
+    with urllib.request.urlopen(f"{base_url}/api/wall/stream/stats", timeout=10) as response:
+        stats = json.loads(response.read())['data']
+    for writer in writers:
+        writer.close()
+
+    return {
+        'subscribers': count,
+        'accepted': accepted,
+        'server_subscribers': stats['subscribers'],
+        'rss_bytes_per_subscriber': (after_rss - before_rss) / max(accepted, 1) if before_rss and after_rss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle SSE subscriber memory and fan-out benchmark")
+    parser.add_argument('--subscribers', default='1000,5000', help="逗号分隔的订阅者数")
+    parser.add_argument('--events', type=int, default=20, help="进程内模式下发布的事件数")
+    parser.add_argument('--url', help="运行中服务的地址，如 http://127.0.0.1:8000")
+    parser.add_argument('--hold', type=float, default=5.0, help="真实连接保持空闲的秒数")
+    parser.add_argument('--pid', type=int, help="服务进程ID，用于读取 RSS")
+    args = parser.parse_args()
+
+    for count in [int(value) for value in args.subscribers.split(',')]:
+        if args.url:
+            result = asyncio.run(bench_url(args.url.rstrip('/'), count, args.hold, args.pid))
+        else:
+            result = asyncio.run(bench_in_process(count, args.events))
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
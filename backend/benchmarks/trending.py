@@ -0,0 +1,118 @@
+"""笔记热度排行：点赞更新和取前 k 名的延迟（进程内，SQL 对照使用内嵌 SQLite）
+
+    python -m benchmarks.trending --notes 1000000 --with-sql
+
+合成数据：笔记的创建时间均匀分布在最近 --days 天内，点赞数服从长尾分布，点赞时间在创建之后。
+更新延迟为 record()（一次点赞）的耗时，点赞集中在较新的热门笔记上；
+SQL 对照为 ORDER BY hot_score DESC LIMIT k（有索引）和现有做法 ORDER BY like_count DESC LIMIT k（无索引，需要排序全表）。
+"""
+import argparse
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from trending import TrendingRanker, log2_add
+
+
+def synthetic_scores(count, days, half_life, random_seed=42):
+    """返回 [(id, hot_score, like_count)]"""
+    rng = random.Random(random_seed)
+    ranker = TrendingRanker(None, None, half_life=half_life)
+    now = time.time()
+    rows = []
+    for id in range(1, count + 1):
+        created = now - rng.uniform(0, days * 86400)
+        hot_score = ranker.weight(created)
+        likes = int(rng.paretovariate(1.2)) - 1
+        for _ in range(min(likes, 200)):
+            hot_score = log2_add(hot_score, ranker.weight(rng.uniform(created, now)))
+        rows.append((id, hot_score, likes))
+    return rows
+
+
+def percentile_us(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e6
+
+
+def bench_updates(ranker, ids, count):
+    latencies = []
+    for id in ids[:count]:
+        start = time.perf_counter()
+        ranker.record(id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_top(ranker, k, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ranker.top(k)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_sql(conn, query, k, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query, (k,)).fetchall()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trending ranking benchmark: update and top-k latency")
+    parser.add_argument('--notes', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--half-life-hours', type=float, default=24)
+    parser.add_argument('--updates', type=int, default=200000)
+    parser.add_argument('--with-sql', action='store_true')
+    args = parser.parse_args()
+    half_life = args.half_life_hours * 3600
+
+    start = time.perf_counter()
+    rows = synthetic_scores(args.notes, args.days, half_life)
+    print(f"generated {args.notes} notes in {time.perf_counter() - start:.1f}s")
+
+    tracemalloc.start()
+    ranker = TrendingRanker(lambda: [(id, hot_score) for id, hot_score, _ in rows], lambda changes: {},
+                            half_life=half_life, refresh_interval=float('inf'))
+    start = time.perf_counter()
+    ranker.reload()
+    load_seconds = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"ranker load {load_seconds:.2f}s, memory {memory / 1024 / 1024:.1f} MB "
+          f"({memory / args.notes:.0f} bytes per note, traced)")
+
+    # 点赞集中在较新的笔记上：按热度排名的长尾分布抽取
+    rng = random.Random(7)
+    by_rank = [id for id, _ in ranker.top(args.notes)]
+    ids = [by_rank[min(len(by_rank) - 1, int(rng.paretovariate(0.8)) - 1)] for _ in range(args.updates)]
+    latencies = bench_updates(ranker, ids, args.updates)
+    print(f"record()  p50 {percentile_us(latencies, 0.5):6.2f} us  p95 {percentile_us(latencies, 0.95):6.2f} us  "
+          f"p99 {percentile_us(latencies, 0.99):6.2f} us  ({len(latencies)} likes)")
+
+    conn = None
+    if args.with_sql:
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE solution_notes (id INTEGER PRIMARY KEY, hot_score REAL, like_count INTEGER)")
+        conn.executemany("INSERT INTO solution_notes VALUES (?, ?, ?)", rows)
+        conn.execute("CREATE INDEX idx_hot_score ON solution_notes (hot_score)")
+
+    for k in (10, 20, 100):
+        latencies = bench_top(ranker, k, 2000)
+        line = f"top({k:>3})  p50 {percentile_us(latencies, 0.5):8.2f} us  p95 {percentile_us(latencies, 0.95):8.2f} us"
+        if conn is not None:
+            indexed = bench_sql(conn, "SELECT id FROM solution_notes ORDER BY hot_score DESC LIMIT ?", k, 200)
+            sorted_scan = bench_sql(conn, "SELECT id FROM solution_notes ORDER BY like_count DESC LIMIT ?", k, 5)
+            line += (f"  | SQL hot_score index p50 {percentile_us(indexed, 0.5):8.2f} us"
+                     f"  | SQL ORDER BY like_count p50 {percentile_us(sorted_scan, 0.5) / 1000:8.1f} ms")
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
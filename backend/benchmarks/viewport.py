@@ -0,0 +1,118 @@
+"""可视区域查询：网格索引与 SQL 坐标范围查询的延迟对比（进程内，SQL 对照使用内嵌 SQLite）
+
+    python -m benchmarks.viewport --stickers 1000000 --with-sql
+
+区域为墙面边长的 5% / 20% / 50% / 100% 的正方形，位置随机；limit 为返回便签数上限（超过时按密度抽样）。
+SQL 对照在 (position_x, position_y) 上建索引，执行 COUNT(*) 和 LIMIT 查询，与网格返回同样的总数和便签数。
+"""
+import argparse
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from spatial import StickerGrid
+
+
+def synthetic_positions(count, random_seed=42):
+    """一半均匀分布，一半聚集在几个热点附近，模拟便签扎堆的区域"""
+    rng = random.Random(random_seed)
+    hotspots = [(rng.uniform(10, 90), rng.uniform(10, 90)) for _ in range(8)]
+    rows = []
+    for id in range(1, count + 1):
+        if id % 2:
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+        else:
+            cx, cy = rng.choice(hotspots)
+            x = min(100.0, max(0.0, rng.gauss(cx, 3)))
+            y = min(100.0, max(0.0, rng.gauss(cy, 3)))
+        rows.append((id, round(x, 2), round(y, 2)))
+    return rows
+
+
+def viewports(size, count, random_seed=7):
+    rng = random.Random(random_seed)
+    return [(x, y, x + size, y + size) for x, y in
+            ((rng.uniform(0, 100 - size), rng.uniform(0, 100 - size)) for _ in range(count))]
+
+
+def percentile_ms(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+def bench_grid(grid, boxes, limit):
+    latencies = []
+    for box in boxes:
+        start = time.perf_counter()
+        grid.query(*box, limit)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_sql(conn, boxes, limit):
+    latencies = []
+    for x0, y0, x1, y1 in boxes:
+        start = time.perf_counter()
+        params = (x0, x1, y0, y1)
+        conn.execute("""
+        SELECT COUNT(*) FROM wall_stickers
+        WHERE position_x BETWEEN ? AND ? AND position_y BETWEEN ? AND ?
+        """, params).fetchone()
+        conn.execute("""
+        SELECT id FROM wall_stickers
+        WHERE position_x BETWEEN ? AND ? AND position_y BETWEEN ? AND ?
+        LIMIT ?
+        """, params + (limit,)).fetchall()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Viewport query benchmark: grid index vs SQL range filter")
+    parser.add_argument('--stickers', type=int, default=1000000)
+    parser.add_argument('--cells', type=int, default=64)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200, help="每种区域大小的查询次数")
+    parser.add_argument('--with-sql', action='store_true')
+    args = parser.parse_args()
+
+    rows = synthetic_positions(args.stickers)
+    grid = StickerGrid(lambda: rows, cells=args.cells, refresh_interval=float('inf'))
+    start = time.perf_counter()
+    grid.reload()
+    print(f"grid load {time.perf_counter() - start:.2f}s for {args.stickers} stickers")
+
+    tracemalloc.start()
+    measured = StickerGrid(lambda: rows, cells=args.cells)
+    measured.reload()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print(f"grid memory {memory / 1024 / 1024:.1f} MB ({memory / args.stickers:.0f} bytes per sticker)")
+
+    conn = None
+    if args.with_sql:
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE wall_stickers (id INTEGER PRIMARY KEY, position_x REAL, position_y REAL)")
+        conn.executemany("INSERT INTO wall_stickers VALUES (?, ?, ?)", rows)
+        conn.execute("CREATE INDEX idx_position ON wall_stickers (position_x, position_y)")
+
+    header = f"{'viewport':>9} {'avg total':>10} {'grid p50 ms':>12} {'grid p95 ms':>12}"
+    if conn is not None:
+        header += f" {'SQL p50 ms':>11} {'SQL p95 ms':>11}"
+    print(header)
+    for size in (5, 20, 50, 100):
+        boxes = viewports(size, args.queries)
+        totals = [grid.query(*box, args.limit)[1] for box in boxes[:20]]
+        latencies = bench_grid(grid, boxes, args.limit)
+        line = (f"{size:>8}% {sum(totals) / len(totals):>10.0f} {percentile_ms(latencies, 0.5):>12.3f} "
+                f"{percentile_ms(latencies, 0.95):>12.3f}")
+        if conn is not None:
+            sql_latencies = bench_sql(conn, boxes[:max(5, args.queries // 10)], args.limit)
+            line += f" {percentile_ms(sql_latencies, 0.5):>11.2f} {percentile_ms(sql_latencies, 0.95):>11.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
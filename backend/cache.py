@@ -0,0 +1,180 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """线程安全的进程内缓存：TTL 过期 + LRU 淘汰 + 按标签精确失效
+
+    每个缓存项可以带若干标签（如 'notes'、'sticker:12'），写操作通过
+    invalidate(标签) 让相关缓存项失效。加载期间若标签被失效，加载结果不会写入缓存，
+    避免并发写入后缓存旧数据。
+    """
+
+    def __init__(self, max_entries=2048, ttl=30.0, enabled=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, tags)
+        self._entries = OrderedDict()
+        self._tag_index = {}
+        self._generations = {}
+        # 标签版本表过大或 clear() 时整体清空并递增纪元，进行中的加载随之作废
+        self._epoch = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key):
+        """返回 (是否命中, 值)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def set(self, key, value, tags=(), generations=None):
+        """写入缓存；generations 为加载前的标签版本，版本已变化则放弃写入"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generations is not None and generations != self._tag_generations(tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tuple(tags))
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            self._stats['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *tags):
+        """让带有任一标签的缓存项失效"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                keys = self._tag_index.pop(tag, None)
+                if not keys:
+                    continue
+                for key in keys:
+                    if key in self._entries:
+                        self._remove(key)
+                        self._stats['invalidations'] += 1
+            if len(self._generations) > 4 * self.max_entries:
+                self._generations.clear()
+                self._epoch += 1
+
+    def generation(self, tag):
+        """标签当前的版本，每次失效都会变化"""
+        with self._lock:
+            return self._epoch, self._generations.get(tag, 0)
+
+    def clear(self):
+        """清空全部缓存项，清空前开始的加载结果不再写入"""
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+    def stats(self):
+        """缓存命中/未命中/淘汰等计数"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'enabled': self.enabled,
+            })
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        return snapshot
+
+    def cached(self, namespace, tags, cache_if=bool):
+        """缓存函数结果的装饰器
+
+        namespace: 缓存键前缀
+        tags: 根据函数参数返回标签元组的函数
+        cache_if: 判断结果是否值得缓存（默认不缓存空结果，避免把查询失败缓存下来）
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                key = (namespace, args, tuple(sorted(kwargs.items())))
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                entry_tags = tags(*args, **kwargs)
+                with self._lock:
+                    generations = self._tag_generations(entry_tags)
+                value = func(*args, **kwargs)
+                if cache_if(value):
+                    self.set(key, value, entry_tags, generations)
+                return value
+            return wrapper
+        return decorator
+
+    def get_many(self, namespace, ids, load, tags):
+        """批量读取按单个ID缓存的结果
+
+        键与 cached 装饰器包装的单参数函数 f(id) 相同，两者共享缓存项。
+        未命中的ID一次性交给 load(missing_ids) 加载，其返回 {id: 值}（加载失败返回 None），
+        加载到的值逐个写入缓存；tags 根据ID返回标签元组。
+        返回按 ids 顺序排列的 {id: 值}，load 未返回的ID不在结果中；加载失败返回 None
+        """
+        ids = list(dict.fromkeys(ids))
+        results = {}
+        missing = []
+        for id in ids:
+            if self.enabled:
+                hit, value = self.get((namespace, (id,), ()))
+                if hit:
+                    results[id] = value
+                    continue
+            missing.append(id)
+        if not missing:
+            return results
+
+        with self._lock:
+            generations = {id: self._tag_generations(tags(id)) for id in missing}
+        loaded = load(missing)
+        if loaded is None:
+            return None
+        for id, value in loaded.items():
+            results[id] = value
+            self.set((namespace, (id,), ()), value, tags(id), generations[id])
+        return {id: results[id] for id in ids if id in results}
+
+    def _tag_generations(self, tags):
+        return self._epoch, tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
@@ -0,0 +1,41 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+# 条件请求（ETag / If-None-Match、Last-Modified / If-Modified-Since）辅助函数
+
+
+def make_etag(version, request):
+    """由集合版本和请求参数生成弱 ETag，同一集合不同分页参数对应不同 ETag"""
+    raw = f"{request.url.path}?{request.url.query}|{sorted(version.items())}"
+    return 'W/"' + hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def validator_headers(etag, last_modified=None):
+    """响应中携带的校验头；no-cache 让浏览器每次带上校验头重新验证"""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        # 数据库返回的是不带时区的时间，这里按 UTC 编码，If-Modified-Since 解析时再按同样方式还原
+        headers['Last-Modified'] = format_datetime(
+            last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """判断条件 GET 是否可以返回 304"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # 弱比较：忽略 W/ 前缀
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in candidates or etag.removeprefix('W/') in candidates
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        since = since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# 存储后端：mysql，或单机部署/测试使用的嵌入式 sqlite
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+
 # Database configuration
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
@@ -12,3 +15,120 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME', 'mirror-notes-db'),
     'charset': 'utf8mb4'
 }
+
+# Connection pool configuration
+DB_POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    # 借出连接时等待空闲连接的最长时间（秒）
+    'wait_timeout': float(os.getenv('DB_POOL_WAIT_TIMEOUT', 5)),
+    # 空闲超过该时间（秒）的连接会被回收（保留 min_size 个）
+    'max_idle_time': float(os.getenv('DB_POOL_MAX_IDLE_TIME', 300)),
+    # 连接空闲超过该时间（秒）后，借出前先 ping 校验
+    'ping_interval': float(os.getenv('DB_POOL_PING_INTERVAL', 30)),
+}
+
+# 阻塞数据库调用所用线程池的大小，默认与连接池上限一致
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', DB_POOL_CONFIG['max_size']))
+
+# SQLite 后端配置（DB_BACKEND=sqlite）：WAL 模式，一个写连接加一组只读连接
+SQLITE_CONFIG = {
+    'path': os.getenv('SQLITE_PATH', 'mirror-notes.db'),
+    # 只读连接数，默认与数据库线程池大小一致
+    'readers': int(os.getenv('SQLITE_READERS', DB_EXECUTOR_WORKERS)),
+    # 数据库被其他进程锁定时的等待时间（秒）
+    'busy_timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 5)),
+    # 每个连接的页缓存和内存映射大小（MB）
+    'cache_size_mb': int(os.getenv('SQLITE_CACHE_SIZE_MB', 64)),
+    'mmap_size_mb': int(os.getenv('SQLITE_MMAP_SIZE_MB', 256)),
+    # WAL 模式下 NORMAL 只在检查点时 fsync，掉电可能丢失最近提交的事务但不会损坏数据库
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper(),
+    # 首次连接时自动执行未执行的迁移
+    'auto_migrate': os.getenv('SQLITE_AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+# 随机抽样索引的全量重新加载间隔（秒），用于纳入其他进程写入的便签
+SAMPLER_REFRESH_INTERVAL = float(os.getenv('SAMPLER_REFRESH_INTERVAL', 300))
+
+# 消息墙统计（按 type/category/intensity 的便签数和反应数）的全量重新加载间隔（秒）
+WALL_STATS_REFRESH_INTERVAL = float(os.getenv('WALL_STATS_REFRESH_INTERVAL', 300))
+
+# 便签位置网格索引（可视区域查询）：墙面划分为 cells x cells 个格子；全量重新加载间隔（秒）
+SPATIAL_GRID_CONFIG = {
+    'cells': int(os.getenv('SPATIAL_GRID_CELLS', 64)),
+    'refresh_interval': float(os.getenv('SPATIAL_REFRESH_INTERVAL', 300)),
+}
+
+# 笔记热度排行：热度半衰期（小时）、全量重新加载间隔（秒）、点赞变化合并到数据库的间隔（秒）
+# 修改半衰期后需执行 python manage.py rebuild-trending 重新计算已保存的分数
+TRENDING_CONFIG = {
+    'half_life': float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24)) * 3600,
+    'refresh_interval': float(os.getenv('TRENDING_REFRESH_INTERVAL', 600)),
+    'flush_interval': float(os.getenv('TRENDING_FLUSH_INTERVAL', 5)),
+}
+
+# 读接口缓存配置
+CACHE_CONFIG = {
+    'enabled': os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'max_entries': int(os.getenv('CACHE_MAX_ENTRIES', 2048)),
+    # 缓存项存活时间（秒），同时限定多进程部署下其他进程写入后的最大延迟
+    'ttl': float(os.getenv('CACHE_TTL', 30)),
+}
+
+# 便签位置写回缓冲：启用后位置更新先合并在内存中，按间隔（秒）批量落库
+WRITE_BEHIND_CONFIG = {
+    'enabled': os.getenv('POSITION_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes'),
+    'interval': float(os.getenv('POSITION_FLUSH_INTERVAL', 1.0)),
+}
+
+# 便签反应写回（默认关闭）：反应先记录在内存中（按便签/反应类型/IP 去重），每隔 interval 秒或未落库的反应达到
+# max_pending 条时批量落库；journal_path 不为空时先追加写入本地日志（sync 为 true 时每条 fsync），重启时重放
+REACTION_WRITE_BEHIND_CONFIG = {
+    'enabled': os.getenv('REACTION_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes'),
+    'interval': float(os.getenv('REACTION_FLUSH_INTERVAL', 0.2)),
+    'max_pending': int(os.getenv('REACTION_FLUSH_EVENTS', 500)),
+    'journal_path': os.getenv('REACTION_JOURNAL_PATH', ''),
+    'sync': os.getenv('REACTION_JOURNAL_FSYNC', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+# 消息墙实时推送（SSE）：每个订阅者的队列长度、订阅者上限、空闲心跳间隔（秒）
+STREAM_CONFIG = {
+    'queue_size': int(os.getenv('STREAM_QUEUE_SIZE', 256)),
+    'max_subscribers': int(os.getenv('STREAM_MAX_SUBSCRIBERS', 10000)),
+    'heartbeat': float(os.getenv('STREAM_HEARTBEAT', 15)),
+}
+
+# 指标（/metrics）：关闭后不记录语句和请求指标；执行超过 slow_query_seconds（秒）的语句打印慢查询日志
+METRICS_CONFIG = {
+    'enabled': os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'slow_query_seconds': float(os.getenv('SLOW_QUERY_SECONDS', 0.5)),
+}
+
+def _rate_budget(name, default):
+    """限流预算：环境变量格式为 "每秒令牌数,桶容量"，返回 (每秒令牌数, 桶容量)"""
+    rate, burst = os.getenv(name, default).split(',')
+    return float(rate), float(burst)
+
+# 请求准入控制（默认关闭）：按 (客户端IP, 路由类别) 的令牌桶限流，预算格式为 "每秒令牌数,桶容量"；
+# 数据库调用的平均等待（线程池排队 + 连接池借出）在 window 秒内超过 wait_threshold 秒时，
+# 同时处理的请求数限制为 max_concurrency，超出的返回 503；max_keys 为令牌桶数量上限
+ADMISSION_CONFIG = {
+    'enabled': os.getenv('ADMISSION_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'budgets': {
+        'read': _rate_budget('RATE_LIMIT_READ', '50,200'),
+        'react': _rate_budget('RATE_LIMIT_REACT', '5,30'),
+        'move': _rate_budget('RATE_LIMIT_MOVE', '20,100'),
+        'write': _rate_budget('RATE_LIMIT_WRITE', '0.5,10'),
+        'export': _rate_budget('RATE_LIMIT_EXPORT', '0.1,3'),
+    },
+    'max_concurrency': int(os.getenv('ADMISSION_MAX_CONCURRENCY', 64)),
+    'wait_threshold': float(os.getenv('ADMISSION_WAIT_THRESHOLD', 0.05)),
+    'window': float(os.getenv('ADMISSION_WINDOW', 1.0)),
+    'max_keys': int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000)),
+}
+
+# 受信任的反向代理（逗号分隔的IP地址/网段）：只有来自这些地址的连接才使用 X-Forwarded-For / X-Real-IP 识别客户端IP
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '127.0.0.1,::1')
+
+# 全文检索索引的全量重建间隔（秒），用于纳入其他进程写入的数据
+SEARCH_REFRESH_INTERVAL = float(os.getenv('SEARCH_REFRESH_INTERVAL', 600))
@@ -1,55 +1,465 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from datetime import datetime
+
 import pymysql
-from config import DB_CONFIG
+from config import DB_BACKEND, DB_CONFIG, DB_POOL_CONFIG, DB_EXECUTOR_WORKERS, SQLITE_CONFIG
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class ConnectionPool:
+    """线程安全的数据库连接池，默认创建 pymysql 连接（connect 可替换为其他连接工厂）
+
+    - 每次请求借出独立连接，用完归还
+    - 借出前对空闲较久的连接执行 ping 校验，失效连接直接丢弃重建
+    - 后台线程回收空闲过久的连接（保留 min_size 个）
+    - 记录借出等待次数、等待时间等指标
+    """
+
+    def __init__(self, db_config, min_size=2, max_size=10, wait_timeout=5.0,
+                 max_idle_time=300.0, ping_interval=30.0, connect=None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.db_config = db_config
+        self.connect = connect or pymysql.connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.max_idle_time = max_idle_time
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # 空闲连接栈: [(connection, last_used_at)]，后进先出，让冷连接自然变老被回收
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._reaper = None
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'ping_failures': 0,
+        }
+
+    def open(self):
+        """预热 min_size 个连接并启动空闲回收线程"""
+        with self._lock:
+            self._closed = False
+        for _ in range(self.min_size):
+            try:
+                conn = self._create_connection()
+            except Exception as e:
+                print(f"Database connection error: {e}")
+                break
+            with self._lock:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+        if self._reaper is None and self.max_idle_time > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name="db-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def close(self):
+        """关闭所有空闲连接，借出中的连接在归还时关闭"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._available.notify_all()
+        for conn, _ in idle:
+            self._close_connection(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，退出上下文时自动归还"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # 出错的连接状态不可信，直接丢弃
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        """借出连接，必要时新建或等待"""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = self.wait_timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.wait_timeout}s waiting for a database connection"
+                        )
+                    waited = True
+                    self._available.wait(remaining)
+
+                self._stats['checkouts'] += 1
+                if waited:
+                    wait_time = time.monotonic() - start
+                    self._stats['waits'] += 1
+                    self._stats['wait_time_total'] += wait_time
+                    self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+            if conn is None:
+                try:
+                    return self._create_connection()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._available.notify()
+                    raise
+
+            if self._validate(conn, last_used):
+                return conn
+
+            # 校验失败：丢弃后重新进入借出流程
+            with self._lock:
+                self._stats['ping_failures'] += 1
+                self._size -= 1
+                self._available.notify()
+            self._close_connection(conn)
+
+    def release(self, conn, discard=False):
+        """归还连接"""
+        with self._lock:
+            if discard or self._closed or not conn.open:
+                self._size -= 1
+                close_it = True
+            else:
+                self._idle.append((conn, time.monotonic()))
+                close_it = False
+            self._available.notify()
+        if close_it:
+            self._close_connection(conn)
+
+    def stats(self):
+        """连接池指标快照"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        waits = snapshot['waits']
+        snapshot['wait_time_avg'] = snapshot['wait_time_total'] / waits if waits else 0.0
+        return snapshot
+
+    def reap_idle(self):
+        """回收空闲超过 max_idle_time 的连接，保留 min_size 个"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            keep = []
+            # 栈底的连接最久未使用，优先回收
+            for conn, last_used in self._idle:
+                if (now - last_used > self.max_idle_time
+                        and self._size - len(expired) > self.min_size):
+                    expired.append(conn)
+                else:
+                    keep.append((conn, last_used))
+            self._idle = keep
+            self._size -= len(expired)
+        for conn in expired:
+            self._close_connection(conn)
+        return len(expired)
+
+    def _reap_loop(self):
+        interval = max(1.0, self.max_idle_time / 2)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._closed:
+                    self._reaper = None
+                    return
+            self.reap_idle()
+
+    def _validate(self, conn, last_used):
+        if not conn.open:
+            return False
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _create_connection(self):
+        conn = self.connect(**self.db_config)
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    def _close_connection(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats['closed'] += 1
+
+
+# 语句监听器：每条语句执行后以 (cursor, query, args, elapsed, error) 调用
+_statement_listeners = []
+
+
+class _ObservedCursorMixin:
+    """执行语句时通知已注册的监听器（executemany 也会逐条经过 execute）"""
+
+    def execute(self, query, args=None):
+        listeners = _statement_listeners
+        if not listeners:
+            return super().execute(query, args)
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().execute(query, args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            for listener in listeners:
+                try:
+                    listener(self, query, args, elapsed, error)
+                except Exception as listener_error:
+                    print(f"Statement listener error: {listener_error}")
+
+
+class ObservedCursor(_ObservedCursorMixin, pymysql.cursors.Cursor):
+    pass
+
+
+class ObservedDictCursor(_ObservedCursorMixin, pymysql.cursors.DictCursor):
+    pass
+
+
+class ObservedSSDictCursor(_ObservedCursorMixin, pymysql.cursors.SSDictCursor):
+    pass
+
+
+def as_datetime(value):
+    """把数据库返回的时间值转为 datetime；SQLite 中聚合结果（如 MAX(updated_at)）为字符串"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
 
 class Database:
-    def __init__(self):
-        self.connection = None
-    
+    """MySQL 存储后端
+
+    服务层只使用这里的接口（execute_query / execute_update / execute_insert / transaction /
+    stream_query），语句使用 %s 占位符；其他后端（见 sqlite_database.py）实现相同接口
+    """
+
+    dialect = 'mysql'
+
+    def __init__(self, pool=None):
+        self.pool = pool or ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+        # 写操作使用的连接池，MySQL 读写共用同一个池
+        self.write_pool = self.pool
+        self._opened = False
+        self._open_lock = threading.Lock()
+
     def connect(self):
-        """建立数据库连接"""
+        """初始化连接池"""
         try:
-            self.connection = pymysql.connect(**DB_CONFIG)
+            with self._open_lock:
+                if not self._opened:
+                    self.pool.open()
+                    self._opened = True
             return True
         except Exception as e:
             print(f"Database connection error: {e}")
             return False
-    
+
     def disconnect(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-    
+        """关闭连接池"""
+        with self._open_lock:
+            self.pool.close()
+            self._opened = False
+
     def execute_query(self, query, params=None):
         """执行查询并返回结果"""
         try:
-            if not self.connection:
-                if not self.connect():
-                    return None
-            
-            with self.connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute(query, params)
-                result = cursor.fetchall()
-                self.connection.commit()
-                return result
+            if not self._opened and not self.connect():
+                return None
+
+            with self.pool.connection() as connection:
+                with connection.cursor(ObservedDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    result = cursor.fetchall()
+                    connection.commit()
+                    return result
         except Exception as e:
             print(f"Query execution error: {e}")
             return None
-    
+
     def execute_update(self, query, params=None):
         """执行更新操作并返回影响行数"""
         try:
-            if not self.connection:
-                if not self.connect():
-                    return 0
-            
-            with self.connection.cursor() as cursor:
-                affected_rows = cursor.execute(query, params)
-                self.connection.commit()
-                return affected_rows
+            if not self._opened and not self.connect():
+                return 0
+
+            with self.write_pool.connection() as connection:
+                with connection.cursor(ObservedCursor) as cursor:
+                    affected_rows = cursor.execute(query, params)
+                    connection.commit()
+                    return affected_rows
         except Exception as e:
             print(f"Update execution error: {e}")
             return 0
 
+    def execute_insert(self, query, params=None):
+        """执行插入操作并返回新记录的自增ID，失败返回 None"""
+        try:
+            if not self._opened and not self.connect():
+                return None
+
+            with self.write_pool.connection() as connection:
+                with connection.cursor(ObservedCursor) as cursor:
+                    cursor.execute(query, params)
+                    connection.commit()
+                    return cursor.lastrowid
+        except Exception as e:
+            print(f"Insert execution error: {e}")
+            return None
+
+    @contextmanager
+    def transaction(self):
+        """在同一连接上执行多条语句：全部成功后提交，出错回滚并抛出异常"""
+        if not self._opened and not self.connect():
+            raise RuntimeError("Database is not available")
+
+        with self.write_pool.connection() as connection:
+            try:
+                with connection.cursor(ObservedDictCursor) as cursor:
+                    yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+    def stream_query(self, query, params=None, batch_size=1000, net_write_timeout=600):
+        """用服务端游标（SSDictCursor）逐批读取查询结果，每次产出至多 batch_size 行
+
+        结果不在客户端整体缓存，内存占用与表大小无关。使用不属于连接池的独立连接，
+        长时间导出不占用接口的连接；调用方提前关闭生成器时直接断开连接，不读完剩余结果。
+        net_write_timeout 放宽服务端等待客户端读取的时间，避免慢速下载被服务端中断。
+        """
+        connection = pymysql.connect(**self.pool.db_config)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET SESSION net_write_timeout = %s", (net_write_timeout,))
+            cursor = connection.cursor(ObservedSSDictCursor)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def pool_stats(self):
+        """连接池指标"""
+        return self.pool.stats()
+
+    @staticmethod
+    def add_statement_listener(listener):
+        """注册语句监听器"""
+        _statement_listeners.append(listener)
+
+    @staticmethod
+    def remove_statement_listener(listener):
+        """移除语句监听器"""
+        if listener in _statement_listeners:
+            _statement_listeners.remove(listener)
+
+def create_database():
+    """按 DB_BACKEND 创建存储后端"""
+    if DB_BACKEND == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(SQLITE_CONFIG)
+    if DB_BACKEND != 'mysql':
+        raise ValueError(f"Unknown DB_BACKEND '{DB_BACKEND}' (expected 'mysql' or 'sqlite')")
+    return Database()
+
 # 创建数据库实例
-db = Database()
+db = create_database()
+
+# 执行阻塞数据库调用的有界线程池，避免阻塞事件循环
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db-worker")
+
+# 线程池排队指标：调用提交后等待空闲线程的时间
+_executor_stats = {'calls': 0, 'wait_time_total': 0.0, 'wait_time_max': 0.0}
+_executor_stats_lock = threading.Lock()
+
+def _run_queued(call, submitted_at):
+    waited = time.monotonic() - submitted_at
+    with _executor_stats_lock:
+        _executor_stats['calls'] += 1
+        _executor_stats['wait_time_total'] += waited
+        if waited > _executor_stats['wait_time_max']:
+            _executor_stats['wait_time_max'] = waited
+    return call()
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """在数据库线程池中执行同步函数并等待结果，记录排队时间"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        db_executor, _run_queued, functools.partial(func, *args, **kwargs), time.monotonic()
+    )
+
+def executor_stats():
+    """数据库线程池指标：调用次数、排队等待时间和当前排队的调用数"""
+    with _executor_stats_lock:
+        snapshot = dict(_executor_stats)
+    calls = snapshot['calls']
+    snapshot['wait_time_avg'] = snapshot['wait_time_total'] / calls if calls else 0.0
+    snapshot['queued'] = db_executor._work_queue.qsize()
+    snapshot['workers'] = DB_EXECUTOR_WORKERS
+    return snapshot
+
+def wait_totals(database=None):
+    """(数据库调用次数, 累计等待秒数)：线程池排队时间加上连接池（及 SQLite 写连接）的借出等待时间"""
+    database = database or db
+    pool = database.pool_stats()
+    wait_time = pool['wait_time_total']
+    if isinstance(pool.get('writer'), dict):
+        wait_time += pool['writer']['wait_time_total']
+    with _executor_stats_lock:
+        return _executor_stats['calls'], _executor_stats['wait_time_total'] + wait_time
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+import json
+
+
+class _Subscriber:
+    __slots__ = ('queue',)
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+
+# 订阅者被关闭（服务停止）的标记
+_CLOSE = object()
+
+# 心跳注释行，保持空闲连接不被代理断开
+PING_MESSAGE = b": ping\n\n"
+
+# 队列积压满时发送给订阅者的最后一条消息，客户端收到后应重新拉取全量数据
+RESYNC_MESSAGE = b"event: resync\ndata: {}\n\n"
+
+
+class EventHub:
+    """进程内事件广播
+
+    服务层在数据库线程池中调用 publish，事件编码一次后通过 call_soon_threadsafe
+    交给事件循环，分发到每个订阅者的有界队列。某个订阅者的队列积压满时不阻塞发布方，
+    而是清空其队列、发送 resync 并断开，由客户端重连后重新拉取数据。
+    只有订阅了本进程的客户端能收到本进程写操作产生的事件。
+    """
+
+    def __init__(self, queue_size=256, max_subscribers=10000, heartbeat=15.0):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._loop = None
+        self._heartbeat_handle = None
+        self._ids = itertools.count(1)
+        self._stats = {
+            'published': 0,
+            'delivered': 0,
+            'overflows': 0,
+            'subscribed': 0,
+            'rejected': 0,
+        }
+
+    def subscribe(self):
+        """在事件循环中注册订阅者，超过订阅上限返回 None"""
+        if len(self._subscribers) >= self.max_subscribers:
+            self._stats['rejected'] += 1
+            return None
+        self._loop = asyncio.get_running_loop()
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        self._stats['subscribed'] += 1
+        if self._heartbeat_handle is None:
+            self._heartbeat_handle = self._loop.call_later(self.heartbeat, self._send_heartbeat)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """发布事件，可在任意线程调用；没有订阅者时直接返回"""
+        loop = self._loop
+        if not self._subscribers or loop is None or loop.is_closed():
+            return
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+        message = f"id: {next(self._ids)}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8')
+        try:
+            loop.call_soon_threadsafe(self._dispatch, message)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    async def stream(self, subscriber):
+        """订阅者的 SSE 消息流"""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                message = await subscriber.queue.get()
+                if message is _CLOSE:
+                    return
+                yield message
+                if message is RESYNC_MESSAGE:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        """通知所有订阅者结束消息流（在事件循环中调用）"""
+        for subscriber in list(self._subscribers):
+            self._replace_queue(subscriber, _CLOSE)
+        self._subscribers.clear()
+        if self._heartbeat_handle is not None:
+            self._heartbeat_handle.cancel()
+            self._heartbeat_handle = None
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        snapshot.update({
+            'subscribers': len(self._subscribers),
+            'queue_size': self.queue_size,
+            'max_subscribers': self.max_subscribers,
+        })
+        return snapshot
+
+    def _send_heartbeat(self):
+        # 所有订阅者共用一个定时器，空闲连接不各自持有计时器
+        for subscriber in self._subscribers:
+            if subscriber.queue.empty():
+                subscriber.queue.put_nowait(PING_MESSAGE)
+        if self._subscribers:
+            self._heartbeat_handle = self._loop.call_later(self.heartbeat, self._send_heartbeat)
+        else:
+            self._heartbeat_handle = None
+
+    def _dispatch(self, message):
+        self._stats['published'] += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+                self._stats['delivered'] += 1
+            except asyncio.QueueFull:
+                # 慢速客户端：不再为其缓存事件，通知重新同步后断开
+                self._stats['overflows'] += 1
+                self._subscribers.discard(subscriber)
+                self._replace_queue(subscriber, RESYNC_MESSAGE)
+
+    @staticmethod
+    def _replace_queue(subscriber, message):
+        queue = subscriber.queue
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(message)
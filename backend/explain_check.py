@@ -0,0 +1,302 @@
+"""查询计划检查
+
+依次调用 SolutionService、WallStickerService、StickerReactionService 的每个公开方法，
+记录其执行的每条 SELECT/UPDATE/DELETE 语句，对其执行 EXPLAIN，
+出现全表扫描（type=ALL，或无 LIMIT 的全索引扫描 type=index）即判定失败。
+需要在有一定数据量的测试库上运行，数据太少时优化器会倾向于直接扫表：
+
+    python manage.py explain-check --database mirror-notes-test --seed
+
+检查会调用写方法：--database 必须与配置的库名一致才会执行；结束后删除检查创建的笔记和便签，
+恢复被修改的便签位置和笔记热度（点赞和反应在检查中先加后撤，对账只把计数修正为反应表中的实际数量）。
+"""
+import inspect
+import os
+import sys
+
+import pymysql
+
+from config import DB_CONFIG
+from database import db
+from pagination import decode_cursor
+from services import (
+    SolutionService, WallStickerService, StickerReactionService, response_cache, position_buffer,
+    reaction_buffer, invalidate_notes, invalidate_stickers
+)
+
+SERVICES = (SolutionService, WallStickerService, StickerReactionService)
+TABLES = {'solution_notes', 'user_likes', 'wall_stickers', 'sticker_reactions', 'collection_versions'}
+
+# 按设计需要读取整张表的方法
+FULL_SCAN_ALLOWED = {
+    'SolutionService.get_all_notes': "全量读取，仅用于导出和构建内存索引",
+    'WallStickerService.get_all_stickers': "全量读取，仅用于导出和构建内存索引",
+    'WallStickerService.get_sampling_keys': "构建随机抽样索引，定期全量加载",
+    'WallStickerService.get_spatial_keys': "构建位置网格索引，定期全量加载",
+    'WallStickerService.get_stats_cells': "构建消息墙统计，按 type/category/intensity 分组定期全量加载",
+    'SolutionService.get_hot_scores': "构建热度排行索引，定期全量加载",
+    'recompute_hot_scores': "迁移和 rebuild-trending 命令，根据全部点赞记录重新计算热度",
+    'StickerReactionService.reconcile_reaction_counts': "对账命令，重建所有便签的计数",
+}
+
+SERVICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services.py')
+
+
+def _caller_label():
+    """返回调用栈中最近的 services.py 中的方法名，如 'SolutionService.like_note'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename == SERVICES_FILE and code.co_name != 'wrapper':
+            return getattr(code, 'co_qualname', code.co_name)
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class StatementRecorder:
+    """记录服务方法执行的语句（已代入参数），按 SQL 去重"""
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, cursor, query, args, elapsed, error):
+        if error is not None:
+            return
+        sql = cursor.mogrify(query, args) if args is not None else query
+        verb = sql.lstrip().split(None, 1)[0].upper()
+        if verb not in ('SELECT', 'UPDATE', 'DELETE'):
+            return
+        if 'information_schema' in sql or 'schema_migrations' in sql:
+            return
+        self.statements.setdefault(sql, _caller_label())
+
+
+def _sample_context():
+    """从库中取出检查用的笔记ID、便签ID和用户IP"""
+    note = db.execute_query("SELECT id FROM solution_notes ORDER BY id DESC LIMIT 1")
+    sticker = db.execute_query("SELECT id FROM wall_stickers ORDER BY id DESC LIMIT 1")
+    like = db.execute_query("SELECT user_ip FROM user_likes ORDER BY id DESC LIMIT 1")
+    if not note or not sticker:
+        raise RuntimeError("explain-check needs seeded solution_notes and wall_stickers (use --seed)")
+    return {
+        'note_id': note[0]['id'],
+        'sticker_id': sticker[0]['id'],
+        'user_ip': like[0]['user_ip'] if like else '10.0.0.1',
+        'created_notes': [],
+    }
+
+
+def _snapshot(ctx):
+    """记录检查会修改的数据：所有笔记的热度、检查用便签的位置"""
+    position = db.execute_query(
+        "SELECT position_x, position_y, rotation, updated_at FROM wall_stickers WHERE id = %s", (ctx['sticker_id'],)
+    )
+    hot_scores = SolutionService.get_hot_scores()
+    if not position or hot_scores is None:
+        raise RuntimeError("explain-check could not snapshot the rows it modifies")
+    return {'position': position[0], 'hot_scores': hot_scores}
+
+
+def _restore(ctx, snapshot):
+    """删除检查创建的笔记，恢复便签位置和笔记热度"""
+    position = snapshot['position']
+    with db.transaction() as cursor:
+        created = ctx['created_notes']
+        if created:
+            cursor.execute(f"DELETE FROM solution_notes WHERE id IN ({', '.join(['%s'] * len(created))})", created)
+        cursor.execute(
+            "UPDATE wall_stickers SET position_x = %s, position_y = %s, rotation = %s, updated_at = %s WHERE id = %s",
+            (position['position_x'], position['position_y'], position['rotation'], position['updated_at'],
+             ctx['sticker_id'])
+        )
+        cursor.executemany(
+            "UPDATE solution_notes SET hot_score = %s, updated_at = updated_at WHERE id = %s",
+            [(hot_score, id) for id, hot_score in snapshot['hot_scores']]
+        )
+    invalidate_notes()
+    invalidate_stickers(ctx['sticker_id'])
+
+
+def _exercise(ctx):
+    """调用每个公开服务方法一次或多次，返回已调用的方法名集合"""
+    note_id, sticker_id, ip = ctx['note_id'], ctx['sticker_id'], ctx['user_ip']
+    probe_ip = '192.0.2.1'
+
+    def page_cursor(page):
+        return decode_cursor(page[1]) if page[1] else None
+
+    plan = {
+        'SolutionService.get_all_notes': lambda: SolutionService.get_all_notes(),
+        'SolutionService.get_notes_page': lambda: SolutionService.get_notes_page(
+            20, page_cursor(SolutionService.get_notes_page(20))),
+        'SolutionService.get_notes_version': lambda: SolutionService.get_notes_version(),
+        'SolutionService.get_note_by_id': lambda: SolutionService.get_note_by_id(note_id),
+        'SolutionService.get_notes_by_ids': lambda: SolutionService.get_notes_by_ids([note_id, note_id - 1]),
+        'SolutionService.create_note': lambda: ctx['created_notes'].append(
+            SolutionService.create_note("explain-check note")),
+        'SolutionService.like_note': lambda: SolutionService.like_note(note_id, probe_ip),
+        'SolutionService.unlike_note': lambda: SolutionService.unlike_note(note_id, probe_ip),
+        'SolutionService.get_user_likes': lambda: (
+            SolutionService.get_user_likes(ip),
+            SolutionService.get_user_likes(ip, [note_id, note_id - 1]),
+        ),
+        'SolutionService.is_note_liked_by_user': lambda: SolutionService.is_note_liked_by_user(note_id, ip),
+        'SolutionService.get_trending_notes': lambda: SolutionService.get_trending_notes(20),
+        'SolutionService.get_hot_scores': lambda: SolutionService.get_hot_scores(),
+        'SolutionService.merge_hot_scores': lambda: SolutionService.merge_hot_scores(
+            {note_id: (float('-inf'), float('-inf')), -1: (0.0, float('-inf'))}),
+        'SolutionService.rebuild_hot_scores': lambda: SolutionService.rebuild_hot_scores(),
+
+        'WallStickerService.get_all_stickers': lambda: WallStickerService.get_all_stickers(),
+        'WallStickerService.get_stickers_page': lambda: WallStickerService.get_stickers_page(
+            6, page_cursor(WallStickerService.get_stickers_page(6))),
+        'WallStickerService.get_stickers_version': lambda: WallStickerService.get_stickers_version(),
+        'WallStickerService.get_sampling_keys': lambda: WallStickerService.get_sampling_keys(),
+        'WallStickerService.get_spatial_keys': lambda: WallStickerService.get_spatial_keys(),
+        'WallStickerService.get_stickers_in_viewport': lambda: (
+            WallStickerService.get_stickers_in_viewport(0, 0, 100, 100, 20),
+            WallStickerService.get_stickers_in_viewport(10, 10, 30, 30),
+        ),
+        'WallStickerService.get_random_stickers': lambda: (
+            WallStickerService.get_random_stickers(6),
+            WallStickerService.get_random_stickers(6, 'anxiety', 'skin'),
+        ),
+        'WallStickerService.get_stickers_by_ids': lambda: WallStickerService.get_stickers_by_ids([sticker_id, sticker_id - 1]),
+        'WallStickerService.get_sticker_by_id': lambda: WallStickerService.get_sticker_by_id(sticker_id),
+        'WallStickerService.existing_sticker_ids': lambda: WallStickerService.existing_sticker_ids([sticker_id, -1]),
+        'WallStickerService.update_sticker_position': lambda: (
+            WallStickerService.update_sticker_position(sticker_id, 10.0, 20.0),
+            WallStickerService.update_sticker_position(sticker_id, 10.0, 20.0, 1.5),
+        ),
+        'WallStickerService.update_sticker_positions': lambda: WallStickerService.update_sticker_positions(
+            [(sticker_id, 11.0, 21.0, None), (-1, 0.0, 0.0, None)]),
+        'WallStickerService.write_sticker_positions': lambda: WallStickerService.write_sticker_positions(
+            [(sticker_id, 12.0, 22.0, 0.5)]),
+        'WallStickerService.get_stickers_by_filter': lambda: (
+            WallStickerService.get_stickers_by_filter(('skin',), (4,)),
+            WallStickerService.get_stickers_by_filter(('support',)),
+            WallStickerService.get_stickers_by_filter(None, (5,)),
+            WallStickerService.get_stickers_by_filter(('eyes', 'skin', 'support'), (4, 5), limit=20),
+            WallStickerService.get_stickers_by_filter(None, None, ('anxiety',), 20, page_cursor(
+                WallStickerService.get_stickers_by_filter(None, None, ('anxiety',), 20))),
+        ),
+        'WallStickerService.get_sticker_facets': lambda: WallStickerService.get_sticker_facets(('skin',), (4, 5)),
+        'WallStickerService.get_wall_stats': lambda: WallStickerService.get_wall_stats(),
+        'WallStickerService.get_stats_cells': lambda: WallStickerService.get_stats_cells(),
+        'StickerReactionService.add_reaction': lambda: StickerReactionService.add_reaction(sticker_id, 'same', probe_ip),
+        'StickerReactionService.remove_reaction': lambda: StickerReactionService.remove_reaction(sticker_id, 'same', probe_ip),
+        'StickerReactionService.write_reactions': lambda: StickerReactionService.write_reactions([
+            (sticker_id, 'great', probe_ip, True), (sticker_id, 'great', probe_ip, False)]),
+        'StickerReactionService.get_sticker_reactions': lambda: StickerReactionService.get_sticker_reactions(sticker_id),
+        'StickerReactionService.get_reactions_for_stickers': lambda: StickerReactionService.get_reactions_for_stickers(
+            [sticker_id, sticker_id - 1, -1]),
+        'StickerReactionService.reconcile_reaction_counts': lambda: (
+            StickerReactionService.reconcile_reaction_counts(sticker_id),
+            StickerReactionService.reconcile_reaction_counts(),
+        ),
+        'StickerReactionService.get_user_reactions': lambda: (
+            StickerReactionService.get_user_reactions(ip),
+            StickerReactionService.get_user_reactions(ip, [sticker_id, sticker_id - 1]),
+        ),
+    }
+
+    def create_and_delete():
+        new_id = WallStickerService.create_sticker("explain-check sticker", 'anxiety', 'skin', 'Skin', 3)
+        batch_ids = WallStickerService.create_stickers([
+            ("explain-check batch sticker", 'support', '', '', 2, 30.0, 40.0, 0.0),
+        ]) or []
+        for id in [new_id] + batch_ids:
+            if id:
+                WallStickerService.delete_sticker(id)
+
+    plan['WallStickerService.create_sticker'] = create_and_delete
+    plan['WallStickerService.create_stickers'] = create_and_delete
+    plan['WallStickerService.delete_sticker'] = create_and_delete
+
+    executed = set()
+    for name, call in plan.items():
+        if call in executed:
+            continue
+        call()
+        executed.add(call)
+    return set(plan)
+
+
+def _public_methods():
+    names = set()
+    for service in SERVICES:
+        for name, member in inspect.getmembers(service):
+            if not name.startswith('_') and callable(member):
+                names.add(f"{service.__name__}.{name}")
+    return names
+
+
+def _full_scans(plan_rows, sql):
+    has_limit = ' LIMIT ' in sql.upper()
+    for row in plan_rows:
+        if row.get('table') not in TABLES:
+            continue
+        if row.get('type') == 'ALL' or (row.get('type') == 'index' and not has_limit):
+            yield row
+
+
+def run_check(verbose=True):
+    """执行检查，返回问题列表（为空表示通过）"""
+    recorder = StatementRecorder()
+    cache_enabled, buffer_enabled = response_cache.enabled, position_buffer.enabled
+    reactions_buffered = reaction_buffer.enabled
+    response_cache.enabled = False
+    position_buffer.enabled = reaction_buffer.enabled = False
+    ctx = _sample_context()
+    snapshot = _snapshot(ctx)
+    db.add_statement_listener(recorder)
+    try:
+        exercised = _exercise(ctx)
+    finally:
+        db.remove_statement_listener(recorder)
+        ctx['created_notes'] = [id for id in ctx['created_notes'] if id]
+        _restore(ctx, snapshot)
+        response_cache.enabled, position_buffer.enabled = cache_enabled, buffer_enabled
+        reaction_buffer.enabled = reactions_buffered
+
+    problems = [f"{name}: not exercised by explain-check" for name in sorted(_public_methods() - exercised)]
+
+    with db.transaction() as cursor:
+        for sql, caller in recorder.statements.items():
+            cursor.execute(f"EXPLAIN {sql}")
+            plan_rows = cursor.fetchall()
+            scans = list(_full_scans(plan_rows, sql))
+            if verbose:
+                for row in plan_rows:
+                    print(f"{caller:<50} {str(row.get('table')):<20} {str(row.get('type')):<8} "
+                          f"{str(row.get('key')):<32} rows={row.get('rows')}")
+            if scans and caller not in FULL_SCAN_ALLOWED:
+                tables = ", ".join(sorted({row['table'] for row in scans}))
+                problems.append(f"{caller}: full scan on {tables}: {' '.join(sql.split())[:200]}")
+    return problems
+
+
+def main(database=None, seed_data=False, seed_rows=5000):
+    if db.dialect != 'mysql':
+        print(f"explain-check reads MySQL EXPLAIN output and does not support the {db.dialect} backend")
+        return 2
+    if database != DB_CONFIG['database']:
+        print(f"explain-check writes to the configured database ({DB_CONFIG['database']}); "
+              f"pass --database {DB_CONFIG['database']} to confirm it is a test database")
+        return 2
+
+    if seed_data:
+        from benchmarks.seed import seed
+        seed(notes=seed_rows, stickers=seed_rows, reactions=seed_rows * 4, likes=seed_rows * 4)
+
+    try:
+        problems = run_check()
+    except pymysql.MySQLError as e:
+        print(f"explain-check failed: {e}")
+        return 2
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if not problems:
+        print("OK: no full table scans outside the allowed list")
+    return 1 if problems else 0
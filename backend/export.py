@@ -0,0 +1,101 @@
+import csv
+import io
+from datetime import datetime
+
+from database import db, db_executor, run_in_db_executor
+from responses import encode_json
+
+# 可导出的数据：(表名, 导出字段, 增量导出所依据的时间字段)
+# 反应导出不包含用户IP
+EXPORTS = {
+    'notes': ('solution_notes', (
+        'id', 'content', 'author_name', 'author_type', 'like_count', 'helped_count', 'created_at', 'updated_at',
+    ), 'updated_at'),
+    'stickers': ('wall_stickers', (
+        'id', 'text', 'type', 'category', 'body_part', 'intensity', 'position_x', 'position_y', 'rotation',
+        'same_count', 'great_count', 'created_at', 'updated_at',
+    ), 'updated_at'),
+    'reactions': ('sticker_reactions', (
+        'id', 'sticker_id', 'reaction_type', 'created_at',
+    ), 'created_at'),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_query(kind, since=None):
+    """导出语句：全量按主键顺序；指定 since 时取时间字段 >= since 的行，按 (时间字段, id) 顺序"""
+    table, columns, since_column = EXPORTS[kind]
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if since is None:
+        return query + " ORDER BY id", None
+    return query + f" WHERE {since_column} >= %s ORDER BY {since_column}, id", (since,)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _render_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    # 表头与第一批数据一起产出，保证第一次产出前已执行查询
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_csv_value(row[column]) for column in columns] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _render_ndjson(batches):
+    for rows in batches:
+        yield ''.join([encode_json(row) + '\n' for row in rows]).encode('utf-8')
+
+
+def export_chunks(kind, format='ndjson', since=None, batch_size=1000):
+    """逐批产出导出内容（bytes），每批对应服务端游标读取的 batch_size 行
+
+    增量导出时 since 包含边界值，客户端以上次导出的最大时间字段作为下次的 since，并按 id 去重
+    """
+    query, params = export_query(kind, since)
+    batches = db.stream_query(query, params, batch_size)
+    if format == 'csv':
+        chunks = _render_csv(EXPORTS[kind][1], batches)
+    else:
+        chunks = _render_ndjson(batches)
+    try:
+        yield from chunks
+    finally:
+        chunks.close()
+        batches.close()
+
+
+async def open_export(kind, format='ndjson', since=None):
+    """执行导出查询并读取第一批，返回逐批产出内容的异步迭代器
+
+    查询出错时在开始响应前抛出异常；之后每批在数据库线程池中读取，不阻塞事件循环
+    """
+    chunks = export_chunks(kind, format, since)
+    first = await run_in_db_executor(next, chunks, None)
+    return _stream(first, chunks)
+
+
+async def _stream(first, chunks):
+    try:
+        chunk = first
+        while chunk is not None:
+            yield chunk
+            chunk = await run_in_db_executor(next, chunks, None)
+    finally:
+        # 客户端断开时在线程池中关闭导出连接，不等待剩余结果
+        db_executor.submit(chunks.close)
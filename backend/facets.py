@@ -0,0 +1,121 @@
+from lazy_index import LazyIndex
+
+# 前端的分类按钮中 "support" 表示鼓励类便签（type = 'support'），其余为焦虑类便签的 category
+SUPPORT = 'support'
+
+
+def category_key(type, category):
+    """便签在分类分面中的取值：鼓励类便签归为 'support'，其他为 category"""
+    return SUPPORT if type == SUPPORT else category
+
+
+def _totals(count=0, same=0, great=0):
+    return {'count': count, 'same': same, 'great': great}
+
+
+def _accumulate(totals, values):
+    totals['count'] += values[0]
+    totals['same'] += values[1]
+    totals['great'] += values[2]
+
+
+class WallStats(LazyIndex):
+    """消息墙统计：按 (type, category, intensity) 分格维护便签数和 same/great 反应总数
+
+    格子数只取决于取值组合（几十到几百个），汇总和分面计数都只遍历格子，与便签数无关。
+    loader 返回 [(type, category, intensity, 便签数, same 总数, great 总数)]，
+    由创建/删除便签、添加/移除反应同步更新。
+    """
+
+    def __init__(self, loader, refresh_interval=300.0):
+        super().__init__(loader, refresh_interval)
+        # (type, category, intensity) -> [便签数, same 总数, great 总数]
+        self._cells = {}
+
+    def add(self, type, category, intensity, count=1, same=0, great=0):
+        """新增便签（参数为负数时为删除）"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            key = (type, category, intensity)
+            cell = self._cells.get(key)
+            if cell is None:
+                cell = self._cells[key] = [0, 0, 0]
+            cell[0] += count
+            cell[1] += same
+            cell[2] += great
+            if cell[0] <= 0:
+                del self._cells[key]
+
+    def remove(self, type, category, intensity, same=0, great=0):
+        """删除便签，same/great 为便签被删除时的反应数（反应随便签一起删除）"""
+        self.add(type, category, intensity, -1, -same, -great)
+
+    def add_reaction(self, type, category, intensity, reaction_type, delta=1):
+        """便签的反应数变化，delta 为 1 或 -1"""
+        with self._lock:
+            cell = self._cells.get((type, category, intensity))
+            if cell is not None:
+                cell[1 if reaction_type == 'same' else 2] += delta
+
+    def summary(self):
+        """便签总数、反应总数，以及按 type / category / intensity 和三者组合的分布"""
+        self.ensure_loaded()
+        with self._lock:
+            cells = sorted(self._cells.items(), key=lambda item: (item[0][0], item[0][1], item[0][2]))
+            cells = [(key, tuple(values)) for key, values in cells]
+        total = _totals()
+        by_type, by_category, by_intensity = {}, {}, {}
+        for (type, category, intensity), values in cells:
+            _accumulate(total, values)
+            for rollup, value in ((by_type, type), (by_category, category_key(type, category)),
+                                  (by_intensity, intensity)):
+                _accumulate(rollup.setdefault(value, _totals()), values)
+        return {
+            'total': total['count'],
+            'reactions': {'same': total['same'], 'great': total['great']},
+            'by_type': by_type,
+            'by_category': by_category,
+            'by_intensity': by_intensity,
+            'cells': [
+                dict(type=type, category=category, intensity=intensity, **_totals(*values))
+                for (type, category, intensity), values in cells
+            ],
+        }
+
+    def facets(self, types=None, categories=None, intensities=None):
+        """多选过滤的匹配数和分面计数，None 表示该维度不过滤
+
+        每个维度的分面计数只应用其他维度的过滤条件（多选分面：同一维度内为"或"，勾选更多值时看到的是加上该值后的数量）
+        """
+        self.ensure_loaded()
+        total = _totals()
+        counts = {'type': {}, 'category': {}, 'intensity': {}}
+        with self._lock:
+            for (type, category, intensity), values in self._cells.items():
+                key = category_key(type, category)
+                type_match = types is None or type in types
+                category_match = categories is None or key in categories
+                intensity_match = intensities is None or intensity in intensities
+                if category_match and intensity_match:
+                    counts['type'][type] = counts['type'].get(type, 0) + values[0]
+                if type_match and intensity_match:
+                    counts['category'][key] = counts['category'].get(key, 0) + values[0]
+                if type_match and category_match:
+                    counts['intensity'][intensity] = counts['intensity'].get(intensity, 0) + values[0]
+                if type_match and category_match and intensity_match:
+                    _accumulate(total, values)
+        return {
+            'total': total['count'],
+            'reactions': {'same': total['same'], 'great': total['great']},
+            'facets': {name: dict(sorted(values.items())) for name, values in counts.items()},
+        }
+
+    def _load(self, rows):
+        cells = {}
+        for type, category, intensity, count, same, great in rows:
+            cells[(type, category, intensity)] = [int(count), int(same or 0), int(great or 0)]
+        return cells
+
+    def _apply(self, cells):
+        self._cells = cells
@@ -0,0 +1,56 @@
+"""按需加载并定期刷新的进程内索引
+
+随机抽样、位置网格、热度排行、消息墙统计和全文检索都在内存中维护从数据库加载的数据：
+首次使用时通过 loader 全量加载，之后由本进程的写操作同步更新，并每隔 refresh_interval 秒重新加载一次，
+以纳入其他进程写入的数据并修正与加载并发的更新造成的偏差。
+"""
+import threading
+import time
+
+
+class LazyIndex:
+    """按需加载的内存索引基类
+
+    子类实现 _load(rows)：在锁外由 loader 返回的数据构建新的索引内容；
+    _apply(data)：持有 _lock 时用 _load 的结果替换索引内容。
+    同步更新的方法在 _lock 中修改数据，未加载（_loaded_at 为 None）时可以直接忽略更新，加载时会读到最新数据。
+    """
+
+    def __init__(self, loader, refresh_interval):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded_at = None
+        self._load_seconds = None
+
+    def reload(self):
+        """从数据源重新加载，加载失败（loader 返回 None）时保留原数据"""
+        start = time.perf_counter()
+        rows = self.loader()
+        if rows is None:
+            return
+        data = self._load(rows)
+        with self._lock:
+            self._apply(data)
+            self._loaded_at = time.monotonic()
+            self._load_seconds = time.perf_counter() - start
+
+    def ensure_loaded(self):
+        """未加载或已过期时重新加载"""
+        if self._is_fresh():
+            return
+        # 只让一个线程执行加载，其余线程等待加载结果
+        with self._reload_lock:
+            if not self._is_fresh():
+                self.reload()
+
+    def _is_fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at <= self.refresh_interval
+
+    def _load(self, rows):
+        raise NotImplementedError
+
+    def _apply(self, data):
+        raise NotImplementedError
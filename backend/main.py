@@ -1,9 +1,23 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from services import SolutionService, WallStickerService, StickerReactionService
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from services import (
+    AsyncSolutionService, AsyncWallStickerService, AsyncStickerReactionService,
+    response_cache, position_buffer, reaction_buffer, wall_events, search_index, sticker_grid, note_ranking,
+    wall_stats
+)
 from models import SolutionNote, WallSticker
+from database import db, db_executor, run_in_db_executor, executor_stats, wait_totals
+from pagination import decode_cursor
+from conditional import make_etag, validator_headers, is_not_modified
+from responses import FastJSONResponse
+from export import EXPORTS, FORMATS, open_export
+from metrics import registry, QueryMetrics, RequestMetricsMiddleware, pool_collector
+from admission import AdmissionController, AdmissionMiddleware, client_ip, parse_networks
+from config import METRICS_CONFIG, ADMISSION_CONFIG, TRUSTED_PROXIES
+from datetime import datetime
 import json
+import math
 
 app = FastAPI(
     title="Mirror Notes API",
@@ -11,6 +25,34 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 不做准入控制的路径：长连接推送由订阅者上限约束，运行状态接口在过载时也需要可用
+ADMISSION_EXEMPT_PATHS = frozenset({
+    '/', '/metrics', '/api/wall/stream', '/api/db/pool', '/api/cache/stats', '/api/admission/stats',
+    '/api/wall/positions/buffer', '/api/wall/reactions/buffer', '/api/search/stats', '/api/notes/trending/stats',
+    '/api/wall/grid/stats', '/api/wall/stream/stats',
+})
+
+def route_class(method, path):
+    """准入控制的路由类别：read（含只读的 POST /api/wall/reactions）、react（点赞/反应）、move（移动便签）、
+    write（创建笔记/便签、删除便签）、export；None 表示不做准入控制"""
+    if path in ADMISSION_EXEMPT_PATHS or method == 'OPTIONS':
+        return None
+    if method in ('GET', 'HEAD'):
+        return 'export' if path.startswith('/api/export/') else 'read'
+    if path == '/api/wall/reactions':
+        return 'read'
+    if path.endswith('/like') or path.endswith('/reactions'):
+        return 'react'
+    if path.endswith('/position') or path == '/api/wall/stickers/positions':
+        return 'move'
+    return 'write'
+
+admission = AdmissionController(wait_probe=wait_totals, **ADMISSION_CONFIG)
+trusted_proxies = parse_networks(TRUSTED_PROXIES)
+
+# 准入控制在 CORS 之内，被拒绝的响应同样带 CORS 头，前端能读到 429/503 和 Retry-After
+app.add_middleware(AdmissionMiddleware, controller=admission, classify=route_class, trusted_proxies=trusted_proxies)
+
 # CORS配置
 app.add_middleware(
     CORSMiddleware,
@@ -18,23 +60,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# 语句耗时/行数/错误、连接池等待和按路由的请求耗时，在 /metrics 输出
+if METRICS_CONFIG['enabled']:
+    db.add_statement_listener(QueryMetrics(registry, METRICS_CONFIG['slow_query_seconds']))
+    registry.add_collector(pool_collector(db))
+    registry.add_collector(admission.collect)
+    app.add_middleware(RequestMetricsMiddleware)
+
 # 获取客户端IP地址的辅助函数
 def get_client_ip(request: Request) -> str:
-    """获取客户端真实IP地址"""
-    # 检查X-Forwarded-For头（代理服务器）
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    
-    # 检查X-Real-IP头
-    real_ip = request.headers.get("X-Real-IP")
-    if real_ip:
-        return real_ip
-    
-    # 使用客户端IP
-    return request.client.host if request.client else "127.0.0.1"
+    """获取客户端真实IP地址：只信任来自 TRUSTED_PROXIES 的转发请求头（与准入控制的限流键一致）"""
+    return client_ip(request.scope, trusted_proxies)
+
+def mutation_response(result):
+    """把服务层写操作的结果转为响应，带上最新计数（如有）"""
+    response = {
+        "success": result["success"],
+        "message": result["message"]
+    }
+    if "data" in result:
+        response["data"] = result["data"]
+    return response
+
+def parse_cursor(after):
+    """解析分页游标参数，格式错误时返回400"""
+    if not after:
+        return None
+    try:
+        return decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.on_event("startup")
+async def startup():
+    """打开数据库连接（SQLite 后端同时执行迁移），重放反应日志，启动便签位置/反应写回和热度合并线程，在后台构建检索索引、位置索引、热度排行和消息墙统计"""
+    await run_in_db_executor(db.connect)
+    await run_in_db_executor(reaction_buffer.start)
+    position_buffer.start()
+    note_ranking.start()
+    db_executor.submit(search_index.ensure_loaded)
+    db_executor.submit(sticker_grid.ensure_loaded)
+    db_executor.submit(note_ranking.ensure_loaded)
+    db_executor.submit(wall_stats.ensure_loaded)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """结束实时推送连接，写入缓冲中的位置、反应和未合并的热度变化，关闭数据库线程池和连接池"""
+    wall_events.close()
+    position_buffer.stop()
+    reaction_buffer.stop()
+    note_ranking.stop()
+    db_executor.shutdown(wait=True)
+    db.disconnect()
 
 @app.get("/")
 async def root():
@@ -46,23 +126,67 @@ async def root():
     }
 
 @app.get("/api/notes")
-async def get_all_notes():
-    """获取所有解决方案笔记"""
+async def get_all_notes(request: Request, limit: int = Query(50, ge=1, le=100), after: str = None):
+    """按创建时间倒序分页获取解决方案笔记，支持 If-None-Match / If-Modified-Since 条件请求"""
+    cursor = parse_cursor(after)
     try:
-        notes = SolutionService.get_all_notes()
-        return {
+        headers = {}
+        version = await AsyncSolutionService.get_notes_version()
+        if version:
+            etag = make_etag(version, request)
+            headers = validator_headers(etag, version['last_modified'])
+            if is_not_modified(request, etag, version['last_modified']):
+                return Response(status_code=304, headers=headers)
+        
+        notes, next_cursor = await AsyncSolutionService.get_notes_page(limit, cursor)
+        return FastJSONResponse({
             "success": True,
-            "data": [note.to_dict() for note in notes],
-            "count": len(notes)
-        }
+            "data": notes,
+            "count": len(notes),
+            "next_cursor": next_cursor
+        }, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch notes: {str(e)}")
 
+@app.get("/api/notes/bootstrap")
+async def get_notes_bootstrap(request: Request, limit: int = Query(50, ge=1, le=100), after: str = None):
+    """笔记页首屏数据：一页笔记及当前用户对这些笔记的点赞状态（共两次查询）"""
+    cursor = parse_cursor(after)
+    try:
+        client_ip = get_client_ip(request)
+        notes, next_cursor = await AsyncSolutionService.get_notes_page(limit, cursor)
+        liked_notes = await AsyncSolutionService.get_user_likes(client_ip, [note.id for note in notes])
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": {
+                "notes": notes,
+                "liked_notes": liked_notes
+            },
+            "count": len(notes),
+            "next_cursor": next_cursor
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch notes bootstrap: {str(e)}")
+
+@app.get("/api/notes/trending")
+async def get_trending_notes(limit: int = Query(20, ge=1, le=100)):
+    """按热度（按时间衰减的点赞数）从高到低获取笔记"""
+    try:
+        notes = await AsyncSolutionService.get_trending_notes(limit)
+        return FastJSONResponse({
+            "success": True,
+            "data": notes,
+            "count": len(notes)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch trending notes: {str(e)}")
+
 @app.get("/api/notes/{note_id}")
 async def get_note_by_id(note_id: int):
     """根据ID获取特定笔记"""
     try:
-        note = SolutionService.get_note_by_id(note_id)
+        note = await AsyncSolutionService.get_note_by_id(note_id)
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
         
@@ -99,7 +223,7 @@ async def create_note(request: Request):
             author_name = "Anonymous"
             author_type = "anonymous"
         
-        note_id = SolutionService.create_note(content, author_name, author_type)
+        note_id = await AsyncSolutionService.create_note(content, author_name, author_type)
         
         if note_id:
             return {
@@ -120,19 +244,9 @@ async def like_note(note_id: int, request: Request):
     """点赞笔记"""
     try:
         client_ip = get_client_ip(request)
-        result = SolutionService.like_note(note_id, client_ip)
+        result = await AsyncSolutionService.like_note(note_id, client_ip)
+        return mutation_response(result)
         
-        if result["success"]:
-            return {
-                "success": True,
-                "message": result["message"]
-            }
-        else:
-            return {
-                "success": False,
-                "message": result["message"]
-            }
-            
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to like note: {str(e)}")
 
@@ -141,19 +255,9 @@ async def unlike_note(note_id: int, request: Request):
     """取消点赞"""
     try:
         client_ip = get_client_ip(request)
-        result = SolutionService.unlike_note(note_id, client_ip)
+        result = await AsyncSolutionService.unlike_note(note_id, client_ip)
+        return mutation_response(result)
         
-        if result["success"]:
-            return {
-                "success": True,
-                "message": result["message"]
-            }
-        else:
-            return {
-                "success": False,
-                "message": result["message"]
-            }
-            
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to unlike note: {str(e)}")
 
@@ -162,7 +266,7 @@ async def check_note_liked(note_id: int, request: Request):
     """检查用户是否已点赞某个笔记"""
     try:
         client_ip = get_client_ip(request)
-        is_liked = SolutionService.is_note_liked_by_user(note_id, client_ip)
+        is_liked = await AsyncSolutionService.is_note_liked_by_user(note_id, client_ip)
         
         return {
             "success": True,
@@ -177,7 +281,7 @@ async def get_user_likes(request: Request):
     """获取用户点赞的笔记ID列表"""
     try:
         client_ip = get_client_ip(request)
-        liked_notes = SolutionService.get_user_likes(client_ip)
+        liked_notes = await AsyncSolutionService.get_user_likes(client_ip)
         
         return {
             "success": True,
@@ -187,45 +291,309 @@ async def get_user_likes(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user likes: {str(e)}")
 
-# ==================== Message Wall Stickers API ====================
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的指标"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-@app.get("/api/wall/stickers")
-async def get_all_stickers(limit: int = 6):
-    """获取便签，默认限制6个"""
+@app.get("/api/db/pool")
+async def get_pool_stats():
+    """获取数据库连接池指标，executor 为数据库线程池的排队指标"""
+    return {
+        "success": True,
+        "data": dict(db.pool_stats(), executor=executor_stats())
+    }
+
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """获取准入控制指标：按路由类别和原因的拒绝次数、处理中的请求数、最近的数据库平均等待和过载状态"""
+    return {
+        "success": True,
+        "data": admission.stats()
+    }
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """获取读接口缓存的命中/未命中/淘汰计数"""
+    return {
+        "success": True,
+        "data": response_cache.stats()
+    }
+
+@app.get("/api/wall/positions/buffer")
+async def get_position_buffer_stats():
+    """获取便签位置写回缓冲的合并/落库计数"""
+    return {
+        "success": True,
+        "data": position_buffer.stats()
+    }
+
+@app.get("/api/wall/reactions/buffer")
+async def get_reaction_buffer_stats():
+    """获取便签反应写回缓冲的去重/落库/重放计数"""
+    return {
+        "success": True,
+        "data": reaction_buffer.stats()
+    }
+
+@app.get("/api/search/stats")
+async def get_search_stats():
+    """获取检索索引的文档数、词数和构建耗时"""
+    return {
+        "success": True,
+        "data": search_index.stats()
+    }
+
+@app.get("/api/notes/trending/stats")
+async def get_trending_stats():
+    """获取热度排行索引的笔记数、待合并变化数和合并计数"""
+    return {
+        "success": True,
+        "data": note_ranking.stats()
+    }
+
+@app.get("/api/wall/grid/stats")
+async def get_grid_stats():
+    """获取便签位置网格索引的便签数、格子数和最密格子的便签数"""
+    return {
+        "success": True,
+        "data": sticker_grid.stats()
+    }
+
+@app.get("/api/wall/stream/stats")
+async def get_stream_stats():
+    """获取实时推送的订阅者数和事件分发计数"""
+    return {
+        "success": True,
+        "data": wall_events.stats()
+    }
+
+# ==================== Export API ====================
+
+@app.get("/api/export/{kind}")
+async def export_data(kind: str, format: str = "ndjson", since: str = None):
+    """流式导出笔记/便签/反应（NDJSON 或 CSV），since 为 ISO 时间，只导出此后修改（反应为创建）的记录"""
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{kind}'")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    since_time = None
+    if since:
+        try:
+            since_time = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="since must be an ISO 8601 datetime")
+    
     try:
-        stickers = WallStickerService.get_all_stickers()
-        # 限制返回数量
-        limited_stickers = stickers[:limit]
-        print(f"Found {len(stickers)} stickers, returning {len(limited_stickers)}")
+        chunks = await open_export(kind, format, since_time)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to export {kind}: {str(e)}")
+    
+    return StreamingResponse(
+        chunks,
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'}
+    )
+
+# ==================== Search API ====================
+
+@app.get("/api/search")
+async def search(q: str, type: str = None, limit: int = Query(20, ge=1, le=100)):
+    """检索笔记内容和便签文字/身体部位，按相关度及点赞/反应数排序；type 可为 note 或 sticker"""
+    if type not in (None, "note", "sticker"):
+        raise HTTPException(status_code=400, detail="type must be 'note' or 'sticker'")
+    if len(q) > 200:
+        raise HTTPException(status_code=400, detail="Query too long (max 200 characters)")
+    try:
+        hits = await run_in_db_executor(search_index.search, q, type, limit)
+        note_ids = [id for kind, id, _ in hits if kind == "note"]
+        sticker_ids = [id for kind, id, _ in hits if kind == "sticker"]
+        notes = await AsyncSolutionService.get_notes_by_ids(note_ids)
+        stickers = await AsyncWallStickerService.get_stickers_by_ids(sticker_ids)
+        
+        items = {("note", note.id): note.to_dict() for note in notes}
+        items.update((("sticker", sticker.id), sticker.to_dict()) for sticker in stickers)
+        results = [
+            {"type": kind, "score": round(score, 4), "data": items[(kind, id)]}
+            for kind, id, score in hits if (kind, id) in items
+        ]
         return {
             "success": True,
-            "data": [sticker.to_dict() for sticker in limited_stickers],
-            "count": len(limited_stickers)
+            "data": results,
+            "count": len(results)
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search: {str(e)}")
+
+# ==================== Message Wall Stickers API ====================
+
+@app.get("/api/wall/stream")
+async def stream_wall_events():
+    """以 Server-Sent Events 推送便签创建、移动、删除和反应事件
+
+    收到 resync 事件或连接断开后，客户端应重新拉取便签列表
+    """
+    subscriber = wall_events.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many stream subscribers")
+    
+    return StreamingResponse(
+        wall_events.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/wall/stickers")
+async def get_all_stickers(request: Request, limit: int = Query(6, ge=1, le=100), after: str = None):
+    """按创建时间倒序分页获取便签，默认每页6个，支持 If-None-Match 条件请求"""
+    cursor = parse_cursor(after)
+    try:
+        # 反应的删除不会体现在 updated_at 上，便签列表只使用 ETag 校验
+        headers = {}
+        version = await AsyncWallStickerService.get_stickers_version()
+        if version:
+            etag = make_etag(version, request)
+            headers = validator_headers(etag)
+            if is_not_modified(request, etag):
+                return Response(status_code=304, headers=headers)
+        
+        stickers, next_cursor = await AsyncWallStickerService.get_stickers_page(limit, cursor)
+        return FastJSONResponse({
+            "success": True,
+            "data": stickers,
+            "count": len(stickers),
+            "next_cursor": next_cursor
+        }, headers=headers)
     except Exception as e:
         print(f"Error fetching stickers: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch stickers: {str(e)}")
 
 @app.get("/api/wall/stickers/random")
-async def get_random_stickers(limit: int = 6):
-    """随机获取指定数量的便签"""
+async def get_random_stickers(limit: int = Query(6, ge=1, le=100), type: str = None, category: str = None):
+    """随机获取指定数量的便签，可按 type/category 过滤"""
     try:
-        stickers = WallStickerService.get_random_stickers(limit)
-        print(f"Returning {len(stickers)} random stickers")
-        return {
+        stickers = await AsyncWallStickerService.get_random_stickers(limit, type, category)
+        return FastJSONResponse({
             "success": True,
-            "data": [sticker.to_dict() for sticker in stickers],
+            "data": stickers,
             "count": len(stickers)
-        }
+        })
     except Exception as e:
         print(f"Error fetching random stickers: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch random stickers: {str(e)}")
 
+@app.get("/api/wall/stickers/viewport")
+async def get_viewport_stickers(x0: float, y0: float, x1: float, y1: float,
+                                limit: int = Query(200, ge=1, le=1000)):
+    """获取坐标（百分比）落在可视区域内的便签；区域内便签超过 limit 时按密度抽样，total 为区域内便签总数"""
+    if x0 > x1 or y0 > y1:
+        raise HTTPException(status_code=400, detail="Viewport must satisfy x0 <= x1 and y0 <= y1")
+    try:
+        stickers, total = await AsyncWallStickerService.get_stickers_in_viewport(x0, y0, x1, y1, limit)
+        return FastJSONResponse({
+            "success": True,
+            "data": stickers,
+            "count": len(stickers),
+            "total": total,
+            "sampled": total > len(stickers)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch viewport stickers: {str(e)}")
+
+def parse_facet_values(value, name, allowed=None, cast=str):
+    """解析逗号分隔的多选过滤值，空或 'all' 表示不过滤（返回 None），非法取值返回400"""
+    if value is None:
+        return None
+    values = [item.strip() for item in value.split(",") if item.strip()]
+    if not values or "all" in values:
+        return None
+    try:
+        values = [cast(item) for item in values]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} value")
+    if allowed is not None and any(item not in allowed for item in values):
+        raise HTTPException(status_code=400, detail=f"{name} must be one of: {', '.join(map(str, allowed))}")
+    return tuple(sorted(set(values)))
+
+@app.get("/api/wall/stickers/filter")
+async def get_stickers_by_filter(category: str = "all", intensity: str = "all", type: str = "all",
+                                 limit: int = Query(100, ge=1, le=500), after: str = None):
+    """多选过滤便签：category / intensity / type 为逗号分隔的取值（分类 support 表示鼓励类便签），
+    按创建时间倒序分页，同时返回匹配总数和各维度的分面计数
+    """
+    categories = parse_facet_values(category, "category")
+    intensities = parse_facet_values(intensity, "intensity", allowed=(1, 2, 3, 4, 5), cast=int)
+    types = parse_facet_values(type, "type", allowed=("anxiety", "support"))
+    cursor = parse_cursor(after)
+    try:
+        stickers, next_cursor = await AsyncWallStickerService.get_stickers_by_filter(
+            categories, intensities, types, limit, cursor
+        )
+        facets = await AsyncWallStickerService.get_sticker_facets(categories, intensities, types)
+        return FastJSONResponse({
+            "success": True,
+            "data": stickers,
+            "count": len(stickers),
+            "next_cursor": next_cursor,
+            "total": facets["total"],
+            "reactions": facets["reactions"],
+            "facets": facets["facets"]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch filtered stickers: {str(e)}")
+
+@app.get("/api/wall/stats")
+async def get_wall_stats():
+    """消息墙统计：便签总数、反应总数及按 type / category / intensity 的分布"""
+    try:
+        return {
+            "success": True,
+            "data": await AsyncWallStickerService.get_wall_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get wall stats: {str(e)}")
+
+@app.get("/api/wall/bootstrap")
+async def get_wall_bootstrap(request: Request, limit: int = Query(6, ge=1, le=100), after: str = None,
+                             random: bool = False, type: str = None, category: str = None):
+    """消息墙首屏数据：一页便签（random=true 时随机抽取）、反应计数及当前用户对这些便签的反应
+
+    便签与计数来自同一次查询，用户反应只查询返回的便签，共两次查询
+    """
+    cursor = parse_cursor(after)
+    try:
+        user_ip = get_client_ip(request)
+        if random:
+            stickers = await AsyncWallStickerService.get_random_stickers(limit, type, category)
+            next_cursor = None
+        else:
+            stickers, next_cursor = await AsyncWallStickerService.get_stickers_page(limit, cursor)
+        
+        user_reactions = await AsyncStickerReactionService.get_user_reactions(
+            user_ip, [sticker.id for sticker in stickers]
+        )
+        
+        return FastJSONResponse({
+            "success": True,
+            "data": {
+                "stickers": stickers,
+                "reactions": {
+                    sticker.id: {"same": sticker.same_count, "great": sticker.great_count}
+                    for sticker in stickers
+                },
+                "user_reactions": user_reactions
+            },
+            "count": len(stickers),
+            "next_cursor": next_cursor
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch wall bootstrap: {str(e)}")
+
 @app.get("/api/wall/stickers/{sticker_id}")
 async def get_sticker_by_id(sticker_id: int):
     """根据ID获取特定便签"""
     try:
-        sticker = WallStickerService.get_sticker_by_id(sticker_id)
+        sticker = await AsyncWallStickerService.get_sticker_by_id(sticker_id)
         if not sticker:
             raise HTTPException(status_code=404, detail="Sticker not found")
         
@@ -238,35 +606,80 @@ async def get_sticker_by_id(sticker_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch sticker: {str(e)}")
 
+# 批量接口单次请求的最大条数
+MAX_BATCH_STICKERS = 100
+MAX_BATCH_POSITIONS = 500
+
+def check_number(value, name, label=""):
+    """数值字段须为有限的数字（不接受布尔值、字符串、NaN 和无穷大），否则返回400"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise HTTPException(status_code=400, detail=f"{label}{name} must be a number")
+    return value
+
+# 便签坐标和旋转角度的默认值，与 wall_stickers 的列默认值一致
+STICKER_COORDINATE_DEFAULTS = (("position_x", 50.0), ("position_y", 50.0), ("rotation", 0.0))
+
+def parse_sticker_payload(body, label="", allow_null=True):
+    """校验并规范化便签字段，返回 create_sticker 所需的参数元组
+
+    坐标字段缺省时取列默认值；allow_null 为 False 时显式的 null 也返回400（批量接口）
+    """
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail=f"{label}Sticker must be an object")
+    
+    text = (body.get("text") or "").strip()
+    type = body.get("type", "anxiety")
+    category = (body.get("category") or "").strip()
+    body_part = (body.get("body_part") or "").strip()
+    intensity = body.get("intensity", 3)
+    # 坐标在写入前确定，写入后的位置索引、统计和推送不会因坐标无效而失败
+    position_x, position_y, rotation = (
+        check_number(default if allow_null and body.get(name) is None else body.get(name, default), name, label)
+        for name, default in STICKER_COORDINATE_DEFAULTS
+    )
+    
+    if not text:
+        raise HTTPException(status_code=400, detail=f"{label}Text is required")
+    
+    if len(text) > 500:
+        raise HTTPException(status_code=400, detail=f"{label}Text too long (max 500 characters)")
+    
+    if type not in ["anxiety", "support"]:
+        type = "anxiety"
+    
+    if intensity not in [1, 2, 3, 4, 5]:
+        intensity = 3
+    
+    return (text, type, category, body_part, intensity, position_x, position_y, rotation)
+
+def parse_position_payload(body, label=""):
+    """校验位置更新字段，返回 (sticker_id, position_x, position_y, rotation)"""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail=f"{label}Position must be an object")
+    
+    sticker_id = body.get("id")
+    position_x = body.get("position_x")
+    position_y = body.get("position_y")
+    rotation = body.get("rotation")
+    
+    if not isinstance(sticker_id, int) or isinstance(sticker_id, bool):
+        raise HTTPException(status_code=400, detail=f"{label}id must be an integer")
+    
+    check_number(position_x, "position_x", label)
+    check_number(position_y, "position_y", label)
+    if rotation is not None:
+        check_number(rotation, "rotation", label)
+    
+    return (sticker_id, position_x, position_y, rotation)
+
 @app.post("/api/wall/stickers")
 async def create_sticker(request: Request):
     """创建新便签"""
     try:
         body = await request.json()
-        text = body.get("text", "").strip()
-        type = body.get("type", "anxiety")
-        category = body.get("category", "").strip()
-        body_part = body.get("body_part", "").strip()
-        intensity = body.get("intensity", 3)
-        position_x = body.get("position_x", 50.0)
-        position_y = body.get("position_y", 50.0)
-        rotation = body.get("rotation", 0.0)
-        
-        if not text:
-            raise HTTPException(status_code=400, detail="Text is required")
-        
-        if len(text) > 500:
-            raise HTTPException(status_code=400, detail="Text too long (max 500 characters)")
+        sticker = parse_sticker_payload(body)
         
-        if type not in ["anxiety", "support"]:
-            type = "anxiety"
-        
-        if intensity not in [1, 2, 3, 4, 5]:
-            intensity = 3
-        
-        sticker_id = WallStickerService.create_sticker(
-            text, type, category, body_part, intensity, position_x, position_y, rotation
-        )
+        sticker_id = await AsyncWallStickerService.create_sticker(*sticker)
         
         if sticker_id:
             return {
@@ -282,6 +695,72 @@ async def create_sticker(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create sticker: {str(e)}")
 
+@app.post("/api/wall/stickers/batch")
+async def create_stickers_batch(request: Request):
+    """批量创建便签，全部校验通过后在同一事务中写入"""
+    try:
+        body = await request.json()
+        items = body.get("stickers") if isinstance(body, dict) else None
+        
+        if not isinstance(items, list) or not items:
+            raise HTTPException(status_code=400, detail="stickers must be a non-empty list")
+        
+        if len(items) > MAX_BATCH_STICKERS:
+            raise HTTPException(status_code=400, detail=f"Too many stickers (max {MAX_BATCH_STICKERS})")
+        
+        stickers = [
+            parse_sticker_payload(item, f"stickers[{index}]: ", allow_null=False) for index, item in enumerate(items)
+        ]
+        
+        sticker_ids = await AsyncWallStickerService.create_stickers(stickers)
+        
+        if sticker_ids is None:
+            raise HTTPException(status_code=500, detail="Failed to create stickers")
+        
+        return {
+            "success": True,
+            "message": "Stickers created successfully",
+            "data": {"ids": sticker_ids},
+            "count": len(sticker_ids)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create stickers: {str(e)}")
+
+@app.put("/api/wall/stickers/positions")
+async def update_sticker_positions(request: Request):
+    """批量更新便签位置，全部校验通过后在同一事务中写入"""
+    try:
+        body = await request.json()
+        items = body.get("positions") if isinstance(body, dict) else None
+        
+        if not isinstance(items, list) or not items:
+            raise HTTPException(status_code=400, detail="positions must be a non-empty list")
+        
+        if len(items) > MAX_BATCH_POSITIONS:
+            raise HTTPException(status_code=400, detail=f"Too many positions (max {MAX_BATCH_POSITIONS})")
+        
+        positions = [parse_position_payload(item, f"positions[{index}]: ") for index, item in enumerate(items)]
+        
+        result = await AsyncWallStickerService.update_sticker_positions(positions)
+        
+        if result is None:
+            raise HTTPException(status_code=500, detail="Failed to update positions")
+        
+        updated, not_found = result
+        return {
+            "success": True,
+            "message": "Positions updated successfully",
+            "data": {"updated": updated, "not_found": not_found}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update positions: {str(e)}")
+
 @app.put("/api/wall/stickers/{sticker_id}/position")
 async def update_sticker_position(sticker_id: int, request: Request):
     """更新便签位置"""
@@ -294,7 +773,12 @@ async def update_sticker_position(sticker_id: int, request: Request):
         if position_x is None or position_y is None:
             raise HTTPException(status_code=400, detail="position_x and position_y are required")
         
-        success = WallStickerService.update_sticker_position(sticker_id, position_x, position_y, rotation)
+        check_number(position_x, "position_x")
+        check_number(position_y, "position_y")
+        if rotation is not None:
+            check_number(rotation, "rotation")
+        
+        success = await AsyncWallStickerService.update_sticker_position(sticker_id, position_x, position_y, rotation)
         
         if success:
             return {
@@ -313,7 +797,7 @@ async def update_sticker_position(sticker_id: int, request: Request):
 async def delete_sticker(sticker_id: int):
     """删除便签"""
     try:
-        success = WallStickerService.delete_sticker(sticker_id)
+        success = await AsyncWallStickerService.delete_sticker(sticker_id)
         
         if success:
             return {
@@ -328,19 +812,6 @@ async def delete_sticker(sticker_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete sticker: {str(e)}")
 
-@app.get("/api/wall/stickers/filter")
-async def get_stickers_by_filter(category: str = "all", intensity: str = "all"):
-    """根据过滤条件获取便签"""
-    try:
-        stickers = WallStickerService.get_stickers_by_filter(category, intensity)
-        return {
-            "success": True,
-            "data": [sticker.to_dict() for sticker in stickers],
-            "count": len(stickers)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch filtered stickers: {str(e)}")
-
 # ==================== Sticker Connections (前端UI处理，无后端接口) ====================
 # 连线操作仅在前端处理，不需要后端API
 
@@ -357,12 +828,8 @@ async def add_sticker_reaction(sticker_id: int, request: Request):
         if not reaction_type or reaction_type not in ["same", "great"]:
             raise HTTPException(status_code=400, detail="Invalid reaction_type. Must be 'same' or 'great'")
         
-        result = StickerReactionService.add_reaction(sticker_id, reaction_type, user_ip)
-        
-        return {
-            "success": result["success"],
-            "message": result["message"]
-        }
+        result = await AsyncStickerReactionService.add_reaction(sticker_id, reaction_type, user_ip)
+        return mutation_response(result)
         
     except HTTPException:
         raise
@@ -380,19 +847,9 @@ async def remove_sticker_reaction(sticker_id: int, request: Request):
         if not reaction_type or reaction_type not in ["same", "great"]:
             raise HTTPException(status_code=400, detail="Invalid reaction_type. Must be 'same' or 'great'")
         
-        success = StickerReactionService.remove_reaction(sticker_id, reaction_type, user_ip)
+        result = await AsyncStickerReactionService.remove_reaction(sticker_id, reaction_type, user_ip)
+        return mutation_response(result)
         
-        if success:
-            return {
-                "success": True,
-                "message": "Reaction removed successfully"
-            }
-        else:
-            return {
-                "success": False,
-                "message": "Reaction not found"
-            }
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -402,7 +859,7 @@ async def remove_sticker_reaction(sticker_id: int, request: Request):
 async def get_sticker_reactions(sticker_id: int):
     """获取便签反应统计"""
     try:
-        reactions = StickerReactionService.get_sticker_reactions(sticker_id)
+        reactions = await AsyncStickerReactionService.get_sticker_reactions(sticker_id)
         return {
             "success": True,
             "data": reactions
@@ -410,12 +867,62 @@ async def get_sticker_reactions(sticker_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get reactions: {str(e)}")
 
+# 批量查询反应计数单次请求的最大便签数
+MAX_REACTION_IDS = 500
+
+def parse_sticker_ids(ids):
+    """校验便签ID列表（整数，去重保序），超出上限或格式错误时返回400"""
+    if not isinstance(ids, list) or not ids:
+        raise HTTPException(status_code=400, detail="ids must be a non-empty list of integers")
+    if any(not isinstance(id, int) or isinstance(id, bool) for id in ids):
+        raise HTTPException(status_code=400, detail="ids must be a non-empty list of integers")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_REACTION_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {MAX_REACTION_IDS})")
+    return ids
+
+async def reaction_counts_response(ids):
+    reactions = await AsyncStickerReactionService.get_reactions_for_stickers(ids)
+    if reactions is None:
+        raise HTTPException(status_code=500, detail="Failed to get reactions")
+    return {
+        "success": True,
+        "data": reactions,
+        "count": len(reactions)
+    }
+
+@app.get("/api/wall/reactions")
+async def get_reactions_batch(ids: str):
+    """批量获取便签反应统计，ids 为逗号分隔的便签ID，不存在的便签不在结果中"""
+    try:
+        try:
+            sticker_ids = [int(id) for id in ids.split(",") if id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+        return await reaction_counts_response(parse_sticker_ids(sticker_ids))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get reactions: {str(e)}")
+
+@app.post("/api/wall/reactions")
+async def post_reactions_batch(request: Request):
+    """批量获取便签反应统计（{"ids": [...]}，用于较长的ID列表）"""
+    try:
+        body = await request.json()
+        ids = body.get("ids") if isinstance(body, dict) else None
+        return await reaction_counts_response(parse_sticker_ids(ids))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get reactions: {str(e)}")
+
 @app.get("/api/wall/user/reactions")
 async def get_user_reactions(request: Request):
     """获取用户的所有反应"""
     try:
         user_ip = get_client_ip(request)
-        reactions = StickerReactionService.get_user_reactions(user_ip)
+        reactions = await AsyncStickerReactionService.get_user_reactions(user_ip)
         return {
             "success": True,
             "data": reactions
@@ -0,0 +1,82 @@
+"""后端维护命令
+
+用法::
+
+    python manage.py migrate [--status] [--target VERSION]
+    python manage.py explain-check --database NAME [--seed] [--seed-rows N]
+    python manage.py reconcile-counts [--sticker-id ID]
+    python manage.py rebuild-trending
+"""
+import argparse
+import sys
+
+from services import SolutionService, StickerReactionService
+
+
+def migrate(args):
+    """执行数据库迁移或查看迁移状态"""
+    import migrations
+
+    if args.status:
+        for version, name, applied in migrations.status():
+            print(f"{'[x]' if applied else '[ ]'} {version:>4}  {name}")
+        return 0
+
+    executed = migrations.migrate(args.target)
+    if not executed:
+        print("Database schema is up to date")
+    return 0
+
+
+def explain_check(args):
+    """对服务层的每条查询执行 EXPLAIN，出现全表扫描时返回非零状态"""
+    import explain_check
+
+    return explain_check.main(database=args.database, seed_data=args.seed, seed_rows=args.seed_rows)
+
+
+def reconcile_counts(args):
+    """根据 sticker_reactions 重建 wall_stickers 的反应计数"""
+    updated = StickerReactionService.reconcile_reaction_counts(args.sticker_id)
+    print(f"Reconciled reaction counts, {updated} stickers changed")
+    return 0
+
+
+def rebuild_trending(args):
+    """根据点赞记录重新计算笔记热度（修改 TRENDING_HALF_LIFE_HOURS 后执行）"""
+    count = SolutionService.rebuild_hot_scores()
+    if count is None:
+        return 1
+    print(f"Recomputed hot scores for {count} notes")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror Notes maintenance commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="apply pending schema migrations")
+    migrate_parser.add_argument('--status', action='store_true', help="list migrations and whether they are applied")
+    migrate_parser.add_argument('--target', type=int, help="only migrate up to this version")
+    migrate_parser.set_defaults(handler=migrate)
+
+    explain = subparsers.add_parser('explain-check', help="fail if any service query does a full table scan")
+    explain.add_argument('--database', required=True,
+                         help="name of the configured database; confirms it is a test database the check may write to")
+    explain.add_argument('--seed', action='store_true', help="insert synthetic rows first (test databases only)")
+    explain.add_argument('--seed-rows', type=int, default=5000, help="notes/stickers to insert with --seed")
+    explain.set_defaults(handler=explain_check)
+
+    reconcile = subparsers.add_parser('reconcile-counts', help="rebuild same_count/great_count from sticker_reactions")
+    reconcile.add_argument('--sticker-id', type=int, help="only reconcile one sticker")
+    reconcile.set_defaults(handler=reconcile_counts)
+
+    trending = subparsers.add_parser('rebuild-trending', help="recompute solution_notes.hot_score from user_likes")
+    trending.set_defaults(handler=rebuild_trending)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""进程内指标与 Prometheus 文本格式输出
+
+- 语句指标：通过 Database 的语句监听器记录每条语句的耗时、行数和错误，按调用它的服务方法分组
+- 慢查询日志：超过阈值的语句打印方法名、耗时和语句，参数只保留类型
+- 请求指标：ASGI 中间件按路由模板记录请求耗时和状态码
+"""
+import os
+import sys
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+import pymysql
+
+# 语句耗时和请求耗时的桶（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 语句影响/返回行数的桶
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """按标签值分组的计数器"""
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """按标签值分组的直方图，桶上界固定；observe 只做一次二分查找和一次加锁"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.bounds = tuple(buckets)
+        # 标签值 -> [各桶计数（非累计，最后一个为 +Inf）, 总和, 总数]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((key, list(series[0]), series[1], series[2]) for key, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.bounds + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标集合；collectors 为抓取时调用的函数，返回 [(名称, 类型, 说明, [(标签dict, 值)])]"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# 语句的调用方：跳过数据库层和驱动的栈帧，取第一个业务栈帧
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_FILES = {os.path.join(_BACKEND_DIR, name) for name in ('database.py', 'sqlite_database.py', 'metrics.py')}
+_SKIPPED_PREFIXES = (os.path.dirname(pymysql.__file__),)
+_SERVICES_FILE = os.path.join(_BACKEND_DIR, 'services.py')
+
+
+def _code_label(code):
+    """服务层方法标记为 'SolutionService.like_note'，其他模块为 'export:export_chunks'，数据库层返回 None"""
+    filename = code.co_filename
+    if filename in _SKIPPED_FILES or filename.startswith(_SKIPPED_PREFIXES):
+        return None
+    qualname = getattr(code, 'co_qualname', code.co_name)
+    if filename == _SERVICES_FILE:
+        return qualname
+    return f"{os.path.splitext(os.path.basename(filename))[0]}:{qualname}"
+
+
+def _redact(args):
+    """参数只保留类型，如 (str, int)"""
+    if args is None:
+        return '()'
+    if isinstance(args, dict):
+        return '{' + ', '.join(f"{key}: {type(value).__name__}" for key, value in args.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in args) + ')'
+
+
+class QueryMetrics:
+    """语句监听器：记录耗时直方图、行数直方图、错误计数，超过 slow_query_seconds 的语句打印慢查询日志"""
+
+    def __init__(self, registry, slow_query_seconds=0.5):
+        self.slow_query_seconds = slow_query_seconds
+        self.duration = registry.histogram(
+            'db_statement_duration_seconds', "Statement execution time by calling method", ('method',))
+        self.rows = registry.histogram(
+            'db_statement_rows', "Rows affected or returned per statement by calling method", ('method',),
+            buckets=ROW_BUCKETS)
+        self.errors = registry.counter(
+            'db_statement_errors_total', "Failed statements by calling method and error type", ('method', 'error'))
+        self.slow = registry.counter(
+            'db_slow_statements_total', "Statements slower than the slow query threshold", ('method',))
+        # code 对象 -> 标签（None 表示跳过该栈帧）
+        self._labels = {}
+
+    def caller(self):
+        frame = sys._getframe(2)
+        labels = self._labels
+        while frame is not None:
+            code = frame.f_code
+            try:
+                label = labels[code]
+            except KeyError:
+                label = labels[code] = _code_label(code)
+            if label is not None:
+                return label
+            frame = frame.f_back
+        return '<unknown>'
+
+    def __call__(self, cursor, query, args, elapsed, error):
+        method = (self.caller(),)
+        self.duration.observe(method, elapsed)
+        if error is not None:
+            self.errors.inc((method[0], type(error).__name__))
+        else:
+            # SQLite 的读语句在执行时行数未知（rowcount 为 -1），不计入
+            rowcount = cursor.rowcount
+            if rowcount is not None and rowcount >= 0:
+                self.rows.observe(method, rowcount)
+        if elapsed >= self.slow_query_seconds:
+            self.slow.inc(method)
+            print(f"Slow query {elapsed * 1000:.1f}ms in {method[0]}: {' '.join(query.split())[:500]} "
+                  f"params={_redact(args)}")
+
+
+def pool_collector(database):
+    """连接池借出/等待/超时等指标；SQLite 后端的写连接池以 pool="writer" 区分"""
+    def collect():
+        stats = database.pool_stats()
+        pools = [('main', stats)]
+        if isinstance(stats.get('writer'), dict):
+            pools.append(('writer', stats['writer']))
+        families = [
+            ('db_pool_checkouts_total', 'counter', "Connections checked out", 'checkouts'),
+            ('db_pool_waits_total', 'counter', "Checkouts that had to wait for a connection", 'waits'),
+            ('db_pool_wait_seconds_total', 'counter', "Total time spent waiting for a connection", 'wait_time_total'),
+            ('db_pool_wait_seconds_max', 'gauge', "Longest wait for a connection", 'wait_time_max'),
+            ('db_pool_timeouts_total', 'counter', "Checkouts that timed out", 'timeouts'),
+            ('db_pool_size', 'gauge', "Open connections", 'size'),
+            ('db_pool_in_use', 'gauge', "Connections currently checked out", 'in_use'),
+        ]
+        return [
+            (name, kind, help, [({'pool': pool}, pool_stats[key]) for pool, pool_stats in pools])
+            for name, kind, help, key in families
+        ]
+    return collect
+
+
+class RequestMetricsMiddleware:
+    """ASGI 中间件：按 (方法, 路由模板) 记录请求耗时（到响应结束），按状态码类别计数
+
+    路由模板由路由匹配后写入 scope 的 endpoint 查出，未匹配的请求归为 "unmatched"，避免标签数量随路径增长
+    """
+
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.duration = registry.histogram(
+            'http_request_duration_seconds', "Request latency by route", ('method', 'route'))
+        self.requests = registry.counter(
+            'http_requests_total', "Requests by route and status class", ('method', 'route', 'status'))
+        self._routes = None
+
+    def _route(self, scope):
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope['app'].routes if getattr(route, 'endpoint', None) is not None
+            }
+        return self._routes.get(scope.get('endpoint'), 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            labels = (scope['method'], self._route(scope))
+            self.duration.observe(labels, perf_counter() - start)
+            self.requests.inc(labels + (f"{status // 100}xx",))
@@ -0,0 +1,351 @@
+"""数据库结构版本管理
+
+每个迁移是 (版本号, 名称, 步骤列表)，步骤为 SQL 字符串或接收 cursor 的函数。
+已执行的版本记录在 schema_migrations 表中。加列/加索引的步骤会先检查是否已存在，
+因此用 schema.sql 初始化过的数据库也可以直接执行迁移。
+MySQL 与 SQLite 的建表语句不同，用 by_dialect 分别给出；加列/加索引的步骤两种后端通用。
+
+    python manage.py migrate           # 执行所有未执行的迁移
+    python manage.py migrate --status  # 查看迁移状态
+"""
+from database import db
+
+
+def _sqlite_index_name(table, index):
+    # SQLite 的索引名在整个数据库内唯一，加上表名前缀
+    return f"{table}_{index}"
+
+
+def _column_exists(cursor, table, column):
+    if db.dialect == 'sqlite':
+        cursor.execute("SELECT 1 FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+        return cursor.fetchone() is not None
+    cursor.execute("""
+    SELECT 1 FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def _index_exists(cursor, table, index):
+    if db.dialect == 'sqlite':
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, _sqlite_index_name(table, index))
+        )
+        return cursor.fetchone() is not None
+    cursor.execute("""
+    SELECT 1 FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def by_dialect(mysql, sqlite):
+    """按当前存储后端执行不同的语句列表"""
+    def step(cursor):
+        for statement in (sqlite if db.dialect == 'sqlite' else mysql):
+            cursor.execute(statement)
+    step.description = "dialect specific statements"
+    return step
+
+
+def add_column(table, column, definition, sqlite_definition=None):
+    """列不存在时添加列；sqlite_definition 为 SQLite 下的列定义（MySQL 的 COMMENT/AFTER 等不可用）"""
+    def step(cursor):
+        if not _column_exists(cursor, table, column):
+            if db.dialect == 'sqlite':
+                cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {sqlite_definition or definition}")
+            else:
+                cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+    step.description = f"add column {table}.{column}"
+    return step
+
+
+def add_index(table, index, columns, unique=False):
+    """索引不存在时添加索引"""
+    def step(cursor):
+        if not _index_exists(cursor, table, index):
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            column_list = ", ".join(f"`{column}`" for column in columns)
+            if db.dialect == 'sqlite':
+                cursor.execute(f"CREATE {kind} `{_sqlite_index_name(table, index)}` ON `{table}` ({column_list})")
+            else:
+                cursor.execute(f"ALTER TABLE `{table}` ADD {kind} `{index}` ({column_list})")
+    step.description = f"add index {table}.{index}"
+    return step
+
+
+def _recompute_hot_scores(cursor):
+    from services import recompute_hot_scores
+    recompute_hot_scores(cursor)
+
+
+_recompute_hot_scores.description = "recompute solution_notes.hot_score from user_likes"
+
+
+# SQLite 的初始结构，与 MySQL 的 1 号迁移对应：
+# ENUM 用 CHECK 约束代替，DECIMAL 用 REAL（避免 NUMERIC 亲和性把 50.00 存成整数），
+# AUTOINCREMENT 保证删除后不复用ID；ON UPDATE CURRENT_TIMESTAMP 用触发器代替，
+# 只在内容/位置列被修改且语句未显式设置 updated_at 时更新（计数变化时保持不变）
+SQLITE_INITIAL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS `solution_notes` (
+        `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `content` TEXT NOT NULL,
+        `author_name` VARCHAR(50) DEFAULT 'Anonymous',
+        `author_type` TEXT DEFAULT 'anonymous' CHECK (`author_type` IN ('anonymous', 'signature')),
+        `like_count` INTEGER DEFAULT 0,
+        `helped_count` INTEGER DEFAULT 0,
+        `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS `solution_notes_idx_author_type` ON `solution_notes` (`author_type`)",
+    "CREATE INDEX IF NOT EXISTS `solution_notes_idx_created_at` ON `solution_notes` (`created_at`)",
+    """
+    CREATE TRIGGER IF NOT EXISTS `solution_notes_updated_at`
+    AFTER UPDATE OF `content`, `author_name`, `author_type`, `like_count`, `helped_count` ON `solution_notes`
+    WHEN NEW.`updated_at` IS OLD.`updated_at`
+    BEGIN
+        UPDATE `solution_notes` SET `updated_at` = CURRENT_TIMESTAMP WHERE `id` = NEW.`id`;
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `user_likes` (
+        `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `user_ip` VARCHAR(45) NOT NULL,
+        `note_id` INTEGER NOT NULL REFERENCES `solution_notes` (`id`) ON DELETE CASCADE,
+        `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (`user_ip`, `note_id`)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS `user_likes_idx_note_id` ON `user_likes` (`note_id`)",
+    "CREATE INDEX IF NOT EXISTS `user_likes_idx_user_ip` ON `user_likes` (`user_ip`)",
+    """
+    CREATE TABLE IF NOT EXISTS `wall_stickers` (
+        `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `text` TEXT NOT NULL,
+        `type` TEXT DEFAULT 'anxiety' CHECK (`type` IN ('anxiety', 'support')),
+        `category` VARCHAR(50) DEFAULT '',
+        `body_part` VARCHAR(100) DEFAULT '',
+        `intensity` INTEGER DEFAULT 3,
+        `position_x` REAL DEFAULT 50.0,
+        `position_y` REAL DEFAULT 50.0,
+        `rotation` REAL DEFAULT 0.0,
+        `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS `wall_stickers_idx_type` ON `wall_stickers` (`type`)",
+    "CREATE INDEX IF NOT EXISTS `wall_stickers_idx_category` ON `wall_stickers` (`category`)",
+    "CREATE INDEX IF NOT EXISTS `wall_stickers_idx_intensity` ON `wall_stickers` (`intensity`)",
+    """
+    CREATE TRIGGER IF NOT EXISTS `wall_stickers_updated_at`
+    AFTER UPDATE OF `text`, `type`, `category`, `body_part`, `intensity`, `position_x`, `position_y`, `rotation`
+    ON `wall_stickers`
+    WHEN NEW.`updated_at` IS OLD.`updated_at`
+    BEGIN
+        UPDATE `wall_stickers` SET `updated_at` = CURRENT_TIMESTAMP WHERE `id` = NEW.`id`;
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `sticker_reactions` (
+        `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `sticker_id` INTEGER NOT NULL REFERENCES `wall_stickers` (`id`) ON DELETE CASCADE,
+        `reaction_type` TEXT NOT NULL CHECK (`reaction_type` IN ('same', 'great')),
+        `user_ip` VARCHAR(45) NOT NULL,
+        `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (`sticker_id`, `reaction_type`, `user_ip`)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS `sticker_reactions_idx_sticker_id` ON `sticker_reactions` (`sticker_id`)",
+    "CREATE INDEX IF NOT EXISTS `sticker_reactions_idx_user_ip` ON `sticker_reactions` (`user_ip`)",
+]
+
+
+MIGRATIONS = [
+    (1, "initial schema", [by_dialect(mysql=[
+        """
+        CREATE TABLE IF NOT EXISTS `solution_notes` (
+            `id` INT AUTO_INCREMENT PRIMARY KEY,
+            `content` TEXT NOT NULL COMMENT '笔记内容',
+            `author_name` VARCHAR(50) DEFAULT 'Anonymous' COMMENT '作者名称',
+            `author_type` ENUM('anonymous', 'signature') DEFAULT 'anonymous' COMMENT '作者类型',
+            `like_count` INT DEFAULT 0 COMMENT '点赞数',
+            `helped_count` INT DEFAULT 0 COMMENT '帮助人数',
+            `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+            `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+            INDEX `idx_author_type` (`author_type`),
+            INDEX `idx_created_at` (`created_at`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='解决方案笔记表'
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS `user_likes` (
+            `id` INT AUTO_INCREMENT PRIMARY KEY,
+            `user_ip` VARCHAR(45) NOT NULL COMMENT '用户IP地址',
+            `note_id` INT NOT NULL COMMENT '笔记ID',
+            `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '点赞时间',
+            UNIQUE KEY `unique_user_note` (`user_ip`, `note_id`),
+            FOREIGN KEY (`note_id`) REFERENCES `solution_notes`(`id`) ON DELETE CASCADE,
+            INDEX `idx_note_id` (`note_id`),
+            INDEX `idx_user_ip` (`user_ip`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户点赞表'
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS `wall_stickers` (
+            `id` INT AUTO_INCREMENT PRIMARY KEY,
+            `text` TEXT NOT NULL COMMENT '便签内容',
+            `type` ENUM('anxiety', 'support') DEFAULT 'anxiety' COMMENT '便签类型',
+            `category` VARCHAR(50) DEFAULT '' COMMENT '分类',
+            `body_part` VARCHAR(100) DEFAULT '' COMMENT '身体部位',
+            `intensity` TINYINT DEFAULT 3 COMMENT '焦虑程度(1-5)',
+            `position_x` DECIMAL(5,2) DEFAULT 50.00 COMMENT 'X坐标百分比',
+            `position_y` DECIMAL(5,2) DEFAULT 50.00 COMMENT 'Y坐标百分比',
+            `rotation` DECIMAL(5,2) DEFAULT 0.00 COMMENT '旋转角度',
+            `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+            `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+            INDEX `idx_type` (`type`),
+            INDEX `idx_category` (`category`),
+            INDEX `idx_intensity` (`intensity`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='消息墙便签表'
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS `sticker_reactions` (
+            `id` INT AUTO_INCREMENT PRIMARY KEY,
+            `sticker_id` INT NOT NULL COMMENT '便签ID',
+            `reaction_type` ENUM('same', 'great') NOT NULL COMMENT '反应类型',
+            `user_ip` VARCHAR(45) NOT NULL COMMENT '用户IP',
+            `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '反应时间',
+            UNIQUE KEY `unique_user_reaction` (`sticker_id`, `reaction_type`, `user_ip`),
+            FOREIGN KEY (`sticker_id`) REFERENCES `wall_stickers`(`id`) ON DELETE CASCADE,
+            INDEX `idx_sticker_id` (`sticker_id`),
+            INDEX `idx_user_ip` (`user_ip`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='便签反应表'
+        """,
+    ], sqlite=SQLITE_INITIAL_SCHEMA)]),
+    (2, "sticker reaction counters", [
+        add_column('wall_stickers', 'same_count',
+                   "INT NOT NULL DEFAULT 0 COMMENT '“我也是”反应数（由 sticker_reactions 冗余维护）' AFTER `rotation`",
+                   sqlite_definition="INTEGER NOT NULL DEFAULT 0"),
+        add_column('wall_stickers', 'great_count',
+                   "INT NOT NULL DEFAULT 0 COMMENT '“很棒”反应数（由 sticker_reactions 冗余维护）' AFTER `same_count`",
+                   sqlite_definition="INTEGER NOT NULL DEFAULT 0"),
+        """
+        UPDATE wall_stickers SET
+            same_count = (
+                SELECT COUNT(*) FROM sticker_reactions sr
+                WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'same'
+            ),
+            great_count = (
+                SELECT COUNT(*) FROM sticker_reactions sr
+                WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'great'
+            ),
+            updated_at = updated_at
+        """,
+    ]),
+    (3, "keyset pagination and collection version indexes", [
+        add_index('wall_stickers', 'idx_created_at', ['created_at']),
+        add_index('solution_notes', 'idx_updated_at', ['updated_at']),
+        add_index('wall_stickers', 'idx_updated_at', ['updated_at']),
+    ]),
+    (4, "filter indexes for wall sticker queries", [
+        # 过滤 + 按创建时间排序：等值列在前，排序列在后，避免 filesort
+        add_index('wall_stickers', 'idx_category_intensity_created', ['category', 'intensity', 'created_at']),
+        add_index('wall_stickers', 'idx_intensity_created', ['intensity', 'created_at']),
+        add_index('wall_stickers', 'idx_type_created', ['type', 'created_at']),
+        # 用户反应查询：按 user_ip 取 (sticker_id, reaction_type)，覆盖索引无需回表
+        add_index('sticker_reactions', 'idx_user_sticker_type', ['user_ip', 'sticker_id', 'reaction_type']),
+    ]),
+    (5, "incremental export index for reactions", [
+        # 增量导出按 created_at >= since 读取反应，按 (created_at, id) 顺序返回
+        add_index('sticker_reactions', 'idx_created_at', ['created_at']),
+    ]),
+    (6, "trending hot score", [
+        add_column('solution_notes', 'hot_score',
+                   "DOUBLE NOT NULL DEFAULT 0 COMMENT '热度（按时间衰减的点赞数的对数形式，见 trending.py）' "
+                   "AFTER `helped_count`",
+                   sqlite_definition="REAL NOT NULL DEFAULT 0"),
+        add_index('solution_notes', 'idx_hot_score', ['hot_score']),
+        _recompute_hot_scores,
+    ]),
+    (7, "collection version counters", [
+        # 列表接口的 ETag 由写操作递增的版本号生成，不再对整表 COUNT(*)
+        by_dialect(mysql=[
+            """
+            CREATE TABLE IF NOT EXISTS `collection_versions` (
+                `name` VARCHAR(32) PRIMARY KEY COMMENT '集合名称（notes / stickers）',
+                `version` BIGINT NOT NULL DEFAULT 0 COMMENT '版本号'
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='集合版本表'
+            """,
+        ], sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS `collection_versions` (
+                `name` VARCHAR(32) PRIMARY KEY,
+                `version` INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+        ]),
+        "INSERT IGNORE INTO collection_versions (name, version) VALUES ('notes', 0), ('stickers', 0)",
+    ]),
+]
+
+
+def _ensure_migrations_table(cursor):
+    if db.dialect == 'sqlite':
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS `schema_migrations` (
+            `version` INTEGER PRIMARY KEY,
+            `name` VARCHAR(200) NOT NULL,
+            `applied_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        return
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS `schema_migrations` (
+        `version` INT PRIMARY KEY,
+        `name` VARCHAR(200) NOT NULL,
+        `applied_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据库迁移记录表'
+    """)
+
+
+def applied_versions():
+    """已执行的迁移版本集合"""
+    with db.transaction() as cursor:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row['version'] for row in cursor.fetchall()}
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def migrate(target=None):
+    """按版本顺序执行未执行的迁移，返回执行的版本列表"""
+    executed = []
+    for version, name, steps in pending_migrations():
+        if target is not None and version > target:
+            break
+        # MySQL 的 DDL 会隐式提交，每个步骤都需要可重复执行（SQLite 的 DDL 在自动提交模式下执行，同样逐条生效）
+        with db.transaction() as cursor:
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+        executed.append(version)
+        print(f"Applied migration {version}: {name}")
+    return executed
+
+
+def status():
+    """返回 [(版本号, 名称, 是否已执行)]"""
+    applied = applied_versions()
+    return [(version, name, version in applied) for version, name, _ in MIGRATIONS]
@@ -1,6 +1,56 @@
+import json
+import math
 from datetime import datetime
+from decimal import Decimal
+from json.encoder import encode_basestring
+
+# 列表接口的序列化路径：每个模型的 to_json 按预先写好的模板直接生成 JSON 文本，
+# 不经过 to_dict 和 FastAPI 的 jsonable_encoder，输出与后者完全一致
+
+def _json_number(value):
+    """整数/浮点数/Decimal 编码，Decimal 的处理与 jsonable_encoder 相同
+
+    NaN 和 ±Infinity 不是合法的 JSON，与 JSONResponse（allow_nan=False）一样抛出 ValueError
+    """
+    value_type = type(value)
+    if value_type is int:
+        return repr(value)
+    if value is None:
+        return 'null'
+    if isinstance(value, Decimal):
+        if value.is_finite() and value.as_tuple().exponent >= 0:
+            return repr(int(value))
+        value, value_type = float(value), float
+    if value_type is float:
+        if not math.isfinite(value):
+            raise ValueError(f"Out of range float values are not JSON compliant: {value!r}")
+        return repr(value)
+    # bool 等其他类型交给标准编码器
+    return json.dumps(value, allow_nan=False)
+
+def _json_str(value):
+    return 'null' if value is None else encode_basestring(value)
+
+def _json_datetime(value):
+    return '"' + value.isoformat() + '"' if value else 'null'
+
+_STICKER_TEMPLATE = (
+    '{"id":%s,"text":%s,"type":%s,"category":%s,"body_part":%s,"intensity":%s,'
+    '"position_x":%s,"position_y":%s,"position":%s,"rotation":%s,'
+    '"same_count":%s,"great_count":%s,"created_at":%s,"updated_at":%s}'
+)
+
+_NOTE_TEMPLATE = (
+    '{"id":%s,"content":%s,"author_name":%s,"author_type":%s,'
+    '"like_count":%s,"helped_count":%s,"created_at":%s}'
+)
 
 class WallSticker:
+    __slots__ = (
+        'id', 'text', 'type', 'category', 'body_part', 'intensity', 'position_x', 'position_y',
+        'rotation', 'created_at', 'updated_at', 'same_count', 'great_count'
+    )
+    
     def __init__(self, id=None, text=None, type='anxiety', category='', body_part='', 
                  intensity=3, position_x=50.0, position_y=50.0, rotation=0.0, 
                  created_at=None, updated_at=None, same_count=0, great_count=0):
@@ -36,6 +86,17 @@ class WallSticker:
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def to_json(self):
+        """与 to_dict() 经 JSONResponse 序列化后相同的 JSON 文本"""
+        return _STICKER_TEMPLATE % (
+            _json_number(self.id), _json_str(self.text), _json_str(self.type), _json_str(self.category),
+            _json_str(self.body_part), _json_number(self.intensity),
+            _json_number(self.position_x), _json_number(self.position_y),
+            encode_basestring(f"{self.position_x}%, {self.position_y}%"), _json_number(self.rotation),
+            _json_number(self.same_count), _json_number(self.great_count),
+            _json_datetime(self.created_at), _json_datetime(self.updated_at)
+        )
+    
     @classmethod
     def from_dict(cls, data):
         return cls(
@@ -57,6 +118,8 @@ class WallSticker:
 # StickerConnection 模型已删除 - 连线操作仅在前端UI处理
 
 class StickerReaction:
+    __slots__ = ('id', 'sticker_id', 'reaction_type', 'user_ip', 'created_at')
+    
     def __init__(self, id=None, sticker_id=None, reaction_type=None, user_ip=None, created_at=None):
         self.id = id
         self.sticker_id = sticker_id
@@ -84,6 +147,8 @@ class StickerReaction:
         )
 
 class SolutionNote:
+    __slots__ = ('id', 'content', 'author_name', 'author_type', 'like_count', 'helped_count', 'created_at')
+    
     def __init__(self, id=None, content=None, author_name=None, author_type='anonymous', 
                  like_count=0, helped_count=0, created_at=None):
         self.id = id
@@ -105,6 +170,14 @@ class SolutionNote:
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
+    def to_json(self):
+        """与 to_dict() 经 JSONResponse 序列化后相同的 JSON 文本"""
+        return _NOTE_TEMPLATE % (
+            _json_number(self.id), _json_str(self.content), _json_str(self.author_name),
+            _json_str(self.author_type), _json_number(self.like_count), _json_number(self.helped_count),
+            _json_datetime(self.created_at)
+        )
+    
     @classmethod
     def from_dict(cls, data):
         return cls(
@@ -118,6 +191,8 @@ class SolutionNote:
         )
 
 class UserLike:
+    __slots__ = ('user_ip', 'note_id', 'created_at')
+    
     def __init__(self, user_ip=None, note_id=None, created_at=None):
         self.user_ip = user_ip
         self.note_id = note_id
@@ -0,0 +1,27 @@
+import base64
+from datetime import datetime
+
+# 键集分页游标：以 (created_at, id) 作为排序键，编码为 URL 安全的字符串
+
+def encode_cursor(created_at, id):
+    """把排序键编码为游标字符串"""
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析游标字符串，返回 (created_at, id)；格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_at, id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def next_cursor(items, limit):
+    """根据多取的一条判断是否还有下一页，返回 (当前页, 下一页游标)"""
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,118 @@
+import random
+
+from lazy_index import LazyIndex
+
+
+class IdBucket:
+    """支持 O(1) 增删和 O(k) 随机抽样的ID集合"""
+
+    __slots__ = ('ids', 'positions')
+
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id):
+        if id in self.positions:
+            return
+        self.positions[id] = len(self.ids)
+        self.ids.append(id)
+
+    def remove(self, id):
+        index = self.positions.pop(id, None)
+        if index is None:
+            return
+        # 用末尾元素填补空位，保持列表紧凑
+        last = self.ids.pop()
+        if index < len(self.ids):
+            self.ids[index] = last
+            self.positions[last] = index
+
+    def sample(self, k, rng=random):
+        if k >= len(self.ids):
+            ids = list(self.ids)
+            rng.shuffle(ids)
+            return ids
+        return rng.sample(self.ids, k)
+
+
+class StickerSampler(LazyIndex):
+    """便签随机抽样索引
+
+    在内存中按 全部 / type / category / (type, category) 维护便签ID，
+    抽样不再扫描数据表。loader 返回 [(id, type, category)]，由创建/删除便签同步更新。
+    """
+
+    def __init__(self, loader, refresh_interval=300.0):
+        super().__init__(loader, refresh_interval)
+        self._buckets = {}
+        self._meta = {}
+
+    def add(self, id, type, category):
+        """新增便签"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._add(id, type, category)
+
+    def remove(self, id):
+        """删除便签"""
+        with self._lock:
+            meta = self._meta.pop(id, None)
+            if meta is None:
+                return
+            for key in self._keys(*meta):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.remove(id)
+
+    def sample(self, k, type=None, category=None):
+        """随机抽取至多 k 个便签ID，可按 type/category 过滤"""
+        self.ensure_loaded()
+        with self._lock:
+            bucket = self._buckets.get((type, category))
+            if not bucket:
+                return []
+            return bucket.sample(k)
+
+    def contains(self, id):
+        """索引中是否有该便签"""
+        self.ensure_loaded()
+        with self._lock:
+            return id in self._meta
+
+    def count(self, type=None, category=None):
+        """符合条件的便签数量"""
+        self.ensure_loaded()
+        with self._lock:
+            bucket = self._buckets.get((type, category))
+            return len(bucket) if bucket else 0
+
+    def _load(self, rows):
+        buckets, meta = {}, {}
+        for id, type, category in rows:
+            meta[id] = (type, category)
+            for key in self._keys(type, category):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = IdBucket()
+                bucket.add(id)
+        return buckets, meta
+
+    def _apply(self, data):
+        self._buckets, self._meta = data
+
+    def _add(self, id, type, category):
+        self._meta[id] = (type, category)
+        for key in self._keys(type, category):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = IdBucket()
+            bucket.add(id)
+
+    @staticmethod
+    def _keys(type, category):
+        return ((None, None), (type, None), (None, category), (type, category))
@@ -11,10 +11,13 @@ CREATE TABLE IF NOT EXISTS `solution_notes` (
     `author_type` ENUM('anonymous', 'signature') DEFAULT 'anonymous' COMMENT '作者类型',
     `like_count` INT DEFAULT 0 COMMENT '点赞数',
     `helped_count` INT DEFAULT 0 COMMENT '帮助人数',
+    `hot_score` DOUBLE NOT NULL DEFAULT 0 COMMENT '热度（按时间衰减的点赞数的对数形式，见 trending.py）',
     `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     INDEX `idx_author_type` (`author_type`),
-    INDEX `idx_created_at` (`created_at`)
+    INDEX `idx_created_at` (`created_at`),
+    INDEX `idx_updated_at` (`updated_at`),
+    INDEX `idx_hot_score` (`hot_score`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='解决方案笔记表';
 
 -- 用户点赞表
@@ -40,11 +43,18 @@ CREATE TABLE IF NOT EXISTS `wall_stickers` (
     `position_x` DECIMAL(5,2) DEFAULT 50.00 COMMENT 'X坐标百分比',
     `position_y` DECIMAL(5,2) DEFAULT 50.00 COMMENT 'Y坐标百分比',
     `rotation` DECIMAL(5,2) DEFAULT 0.00 COMMENT '旋转角度',
+    `same_count` INT NOT NULL DEFAULT 0 COMMENT '“我也是”反应数（由 sticker_reactions 冗余维护）',
+    `great_count` INT NOT NULL DEFAULT 0 COMMENT '“很棒”反应数（由 sticker_reactions 冗余维护）',
     `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     INDEX `idx_type` (`type`),
     INDEX `idx_category` (`category`),
-    INDEX `idx_intensity` (`intensity`)
+    INDEX `idx_intensity` (`intensity`),
+    INDEX `idx_created_at` (`created_at`),
+    INDEX `idx_updated_at` (`updated_at`),
+    INDEX `idx_category_intensity_created` (`category`, `intensity`, `created_at`),
+    INDEX `idx_intensity_created` (`intensity`, `created_at`),
+    INDEX `idx_type_created` (`type`, `created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='消息墙便签表';
 
 -- 便签连接表已删除 - 连线操作仅在前端UI处理，不需要持久化到数据库
@@ -59,9 +69,19 @@ CREATE TABLE IF NOT EXISTS `sticker_reactions` (
     UNIQUE KEY `unique_user_reaction` (`sticker_id`, `reaction_type`, `user_ip`),
     FOREIGN KEY (`sticker_id`) REFERENCES `wall_stickers`(`id`) ON DELETE CASCADE,
     INDEX `idx_sticker_id` (`sticker_id`),
-    INDEX `idx_user_ip` (`user_ip`)
+    INDEX `idx_user_ip` (`user_ip`),
+    INDEX `idx_user_sticker_type` (`user_ip`, `sticker_id`, `reaction_type`),
+    INDEX `idx_created_at` (`created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='便签反应表';
 
+-- 集合版本表：每次写操作后递增对应集合的版本号，列表接口的 ETag 由它生成
+CREATE TABLE IF NOT EXISTS `collection_versions` (
+    `name` VARCHAR(32) PRIMARY KEY COMMENT '集合名称（notes / stickers）',
+    `version` BIGINT NOT NULL DEFAULT 0 COMMENT '版本号'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='集合版本表';
+
+INSERT IGNORE INTO `collection_versions` (`name`, `version`) VALUES ('notes', 0), ('stickers', 0);
+
 -- 插入一些示例数据
 INSERT INTO `solution_notes` (`content`, `author_name`, `author_type`, `like_count`, `helped_count`) VALUES
 ('I quit filters and watched more vlogs by ordinary people.', 'Sarah M.', 'signature', 123, 123),
@@ -0,0 +1,174 @@
+import heapq
+import math
+from array import array
+import re
+
+from lazy_index import LazyIndex
+
+# 拉丁字母/数字连续串作为一个词；中日韩文字连续串切分为单字和相邻二字组
+_TOKEN_PATTERN = re.compile(
+    r'[0-9a-z]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+'
+)
+_CJK_START = '\u3040'
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+
+# 倒排项压缩为一个无符号32位整数：高28位为文档号，低4位为词频（上限15）
+_TF_BITS = 4
+_TF_MASK = (1 << _TF_BITS) - 1
+
+
+def tokenize(text, query=False):
+    """把文本切分为检索词，中文按单字 + 二字组切分，无需分词词典
+
+    查询时两个字以上的中文串只取二字组，避免常用单字的长倒排表拖慢查询
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if run[0] >= _CJK_START:
+            if not query or len(run) == 1:
+                tokens.extend(run)
+            tokens.extend(run[index:index + 2] for index in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class _Document:
+    __slots__ = ('kind', 'id', 'length', 'popularity')
+
+    def __init__(self, kind, id, length, popularity):
+        self.kind = kind
+        self.id = id
+        self.length = length
+        self.popularity = popularity
+
+
+class _IndexData:
+    """倒排表本体：词 -> array(文档号 << 4 | 词频)，不加锁，由 SearchIndex 负责同步
+
+    删除只移除文档记录，倒排表中的残留项在查询时跳过，全量重建时清理
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}
+        self.doc_numbers = {}
+        self.next_doc_number = 0
+        self.total_length = 0
+        self.stale_documents = 0
+
+    def add(self, kind, id, text, popularity):
+        self.remove(kind, id)
+        counts = {}
+        for token in tokenize(text or ''):
+            counts[token] = counts.get(token, 0) + 1
+        doc_number = self.next_doc_number
+        self.next_doc_number += 1
+        length = sum(counts.values())
+        self.documents[doc_number] = _Document(kind, id, length, popularity)
+        self.doc_numbers[(kind, id)] = doc_number
+        self.total_length += length
+        for token, count in counts.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = array('I')
+            postings.append(doc_number << _TF_BITS | min(count, _TF_MASK))
+
+    def remove(self, kind, id):
+        doc_number = self.doc_numbers.pop((kind, id), None)
+        if doc_number is None:
+            return
+        document = self.documents.pop(doc_number)
+        self.total_length -= document.length
+        self.stale_documents += 1
+
+
+class SearchIndex(LazyIndex):
+    """笔记和便签的内存倒排索引
+
+    按 BM25 计算相关度，再乘以 1 + popularity_weight * log(1 + 热度)，
+    热度为笔记的点赞数或便签的反应总数。loader 返回 [(kind, id, 文本, 热度)]，
+    由创建/删除/点赞/反应同步更新。
+    """
+
+    def __init__(self, loader, refresh_interval=600.0, popularity_weight=0.1):
+        super().__init__(loader, refresh_interval)
+        self.popularity_weight = popularity_weight
+        self._data = _IndexData()
+
+    def add(self, kind, id, text, popularity=0):
+        """新增或替换文档"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._data.add(kind, id, text, popularity)
+
+    def remove(self, kind, id):
+        """删除文档"""
+        with self._lock:
+            self._data.remove(kind, id)
+
+    def set_popularity(self, kind, id, popularity):
+        """更新文档热度（点赞数/反应数）"""
+        with self._lock:
+            doc_number = self._data.doc_numbers.get((kind, id))
+            if doc_number is not None:
+                self._data.documents[doc_number].popularity = popularity
+
+    def search(self, query, kind=None, limit=20):
+        """返回按得分降序的 [(kind, id, 得分)]，kind 为 None 时同时检索笔记和便签"""
+        self.ensure_loaded()
+        tokens = set(tokenize(query, query=True))
+        if not tokens:
+            return []
+        with self._lock:
+            data = self._data
+            total = len(data.documents)
+            if not total:
+                return []
+            average_length = data.total_length / total or 1
+            scores = {}
+            documents = data.documents
+            for token in tokens:
+                postings = data.postings.get(token)
+                if not postings:
+                    continue
+                # 文档频率包含已删除文档的残留项，重建前略有偏差
+                idf = math.log(1 + (max(total - len(postings), 0) + 0.5) / (len(postings) + 0.5))
+                for posting in postings:
+                    doc_number = posting >> _TF_BITS
+                    document = documents.get(doc_number)
+                    if document is None or (kind is not None and document.kind != kind):
+                        continue
+                    count = posting & _TF_MASK
+                    norm = _K1 * (1 - _B + _B * document.length / average_length)
+                    scores[doc_number] = scores.get(doc_number, 0.0) + idf * count * (_K1 + 1) / (count + norm)
+
+            results = []
+            for doc_number, score in scores.items():
+                document = data.documents[doc_number]
+                score *= 1 + self.popularity_weight * math.log1p(document.popularity)
+                results.append((score, document.kind, document.id))
+        return [(kind, id, score) for score, kind, id in heapq.nlargest(limit, results)]
+
+    def _load(self, documents):
+        data = _IndexData()
+        for kind, id, text, popularity in documents:
+            data.add(kind, id, text, popularity)
+        return data
+
+    def _apply(self, data):
+        self._data = data
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self._loaded_at is not None,
+                'documents': len(self._data.documents),
+                'terms': len(self._data.postings),
+                'stale_documents': self._data.stale_documents,
+                'build_seconds': self._load_seconds,
+            }
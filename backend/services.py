@@ -1,6 +1,109 @@
-from database import db
+from database import db, run_in_db_executor, as_datetime
 from models import SolutionNote, UserLike, WallSticker, StickerReaction
+from pagination import next_cursor
+from sampling import StickerSampler
+from spatial import StickerGrid
+from cache import TTLCache
+from write_behind import PositionWriteBuffer, ReactionWriteBuffer
+from events import EventHub
+from search import SearchIndex
+from trending import TrendingRanker, log2_add, merge_score
+from facets import WallStats, SUPPORT
+from config import (
+    SAMPLER_REFRESH_INTERVAL, CACHE_CONFIG, WRITE_BEHIND_CONFIG, STREAM_CONFIG, SEARCH_REFRESH_INTERVAL,
+    SPATIAL_GRID_CONFIG, TRENDING_CONFIG, WALL_STATS_REFRESH_INTERVAL, REACTION_WRITE_BEHIND_CONFIG
+)
 from datetime import datetime
+import time
+import uuid
+
+# 键集分页条件：按 (created_at, id) 倒序取游标之后的记录
+KEYSET_AFTER_CONDITION = "(created_at < %s OR (created_at = %s AND id < %s))"
+
+# 读接口缓存：列表类结果带 'notes'/'stickers' 标签，单条结果带 'note:ID'/'sticker:ID' 标签
+response_cache = TTLCache(**CACHE_CONFIG)
+
+# 消息墙实时事件：created / moved / deleted / reaction
+wall_events = EventHub(**STREAM_CONFIG)
+
+def _page_has_items(page):
+    return bool(page[0])
+
+def bump_version(name):
+    """集合写操作提交后递增 collection_versions 中的版本号
+
+    列表接口的 ETag 由版本号生成，所有进程看到的值相同；在提交之后递增，
+    读到新版本号时数据一定已经可见（读到旧版本号时只会多返回一次 200，不会错误地返回 304）
+    """
+    db.execute_update("UPDATE collection_versions SET version = version + 1 WHERE name = %s", (name,))
+
+def invalidate_notes(note_id=None):
+    """笔记写操作后使相关缓存失效并递增笔记集合的版本号"""
+    tags = ['notes']
+    if note_id is not None:
+        tags.append(f'note:{note_id}')
+    response_cache.invalidate(*tags)
+    bump_version('notes')
+
+def invalidate_stickers(*sticker_ids):
+    """便签写操作后使相关缓存失效并递增便签集合的版本号"""
+    response_cache.invalidate('stickers', *(f'sticker:{sticker_id}' for sticker_id in sticker_ids))
+    bump_version('stickers')
+
+# 本进程最近一次读到的集合版本号；读到更大的版本号说明其他进程有写入，
+# 丢弃本进程缓存的列表结果，避免用新的 ETag 返回旧的缓存内容
+_seen_versions = {}
+
+def read_version(name, last_modified_query=None):
+    """读取集合版本号（主键查询），last_modified_query 为按索引取 MAX(updated_at) 的子查询；失败返回 None"""
+    columns = "version"
+    if last_modified_query:
+        columns += f", ({last_modified_query}) AS last_modified"
+    result = db.execute_query(f"SELECT {columns} FROM collection_versions WHERE name = %s", (name,))
+    if not result:
+        return None
+    version = dict(result[0])
+    if _seen_versions.get(name) != version['version']:
+        _seen_versions[name] = version['version']
+        response_cache.invalidate(name)
+    if last_modified_query:
+        version['last_modified'] = as_datetime(version['last_modified'])
+    return version
+
+# 写回缓冲有待写数据时，列表结果包含本进程内存中的修改，ETag 中加入进程标识和缓冲的修订号
+PROCESS_TOKEN = uuid.uuid4().hex[:12]
+
+def _db_clock(cursor):
+    """返回把数据库返回的时间（会话时区，不带时区信息）换算为时间戳的函数"""
+    cursor.execute("SELECT CURRENT_TIMESTAMP AS db_now")
+    db_now = as_datetime(cursor.fetchone()['db_now'])
+    now = time.time()
+    return lambda value: now - (db_now - as_datetime(value)).total_seconds()
+
+def recompute_hot_scores(cursor, batch_size=1000):
+    """按创建时间和每个点赞的时间重新计算所有笔记的热度，返回笔记数
+
+    在调用方的事务中执行（迁移和 rebuild-trending 命令），需要读取整张 user_likes 表
+    """
+    to_timestamp = _db_clock(cursor)
+    cursor.execute("SELECT id, created_at FROM solution_notes")
+    scores = {row['id']: note_ranking.weight(to_timestamp(row['created_at'])) for row in cursor.fetchall()}
+    cursor.execute("SELECT note_id, created_at FROM user_likes")
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            if row['note_id'] in scores:
+                weight = note_ranking.weight(to_timestamp(row['created_at']))
+                scores[row['note_id']] = log2_add(scores[row['note_id']], weight)
+    items = list(scores.items())
+    for start in range(0, len(items), batch_size):
+        cursor.executemany(
+            "UPDATE solution_notes SET hot_score = %s, updated_at = updated_at WHERE id = %s",
+            [(hot_score, id) for id, hot_score in items[start:start + batch_size]]
+        )
+    return len(items)
 
 class SolutionService:
     @staticmethod
@@ -17,6 +120,32 @@ class SolutionService:
         return []
     
     @staticmethod
+    @response_cache.cached('notes_page', tags=lambda *args, **kwargs: ('notes',), cache_if=_page_has_items)
+    def get_notes_page(limit=20, after=None):
+        """按创建时间倒序分页获取笔记，after 为上一页游标解析出的 (created_at, id)，返回 (笔记列表, 下一页游标)"""
+        query = """
+        SELECT id, content, author_name, author_type, like_count, helped_count, created_at
+        FROM solution_notes 
+        """
+        params = []
+        if after:
+            query += f" WHERE {KEYSET_AFTER_CONDITION}"
+            params.extend([after[0], after[0], after[1]])
+        # 多取一条用于判断是否还有下一页
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, params)
+        notes = [SolutionNote.from_dict(row) for row in result] if result else []
+        return next_cursor(notes, limit)
+    
+    @staticmethod
+    def get_notes_version():
+        """笔记集合的版本（写操作递增的版本号、最后修改时间），用于条件 GET；查询失败返回 None"""
+        return read_version('notes', "SELECT MAX(updated_at) FROM solution_notes")
+    
+    @staticmethod
+    @response_cache.cached('note', tags=lambda note_id: (f'note:{note_id}',))
     def get_note_by_id(note_id):
         """根据ID获取笔记"""
         query = """
@@ -29,73 +158,189 @@ class SolutionService:
             return SolutionNote.from_dict(result[0])
         return None
     
+    @staticmethod
+    def get_notes_by_ids(ids):
+        """按ID批量获取笔记，结果保持 ids 的顺序"""
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        query = f"""
+        SELECT id, content, author_name, author_type, like_count, helped_count, created_at
+        FROM solution_notes
+        WHERE id IN ({placeholders})
+        """
+        result = db.execute_query(query, list(ids))
+        if not result:
+            return []
+        by_id = {row['id']: SolutionNote.from_dict(row) for row in result}
+        return [by_id[id] for id in ids if id in by_id]
+    
+    @staticmethod
+    def get_trending_notes(limit=20):
+        """按热度（按时间衰减的点赞数）从高到低获取笔记，排名来自内存索引"""
+        ids = [id for id, _ in note_ranking.top(limit)]
+        return SolutionService.get_notes_by_ids(ids)
+    
+    @staticmethod
+    def get_hot_scores():
+        """加载热度排行索引所需的 (id, hot_score)，查询失败返回 None"""
+        result = db.execute_query("SELECT id, hot_score FROM solution_notes")
+        if result is None:
+            return None
+        return [(row['id'], row['hot_score']) for row in result]
+    
+    @staticmethod
+    def merge_hot_scores(changes):
+        """把热度变化 {id: (新增权重和, 撤销权重和)} 合并到 hot_score，返回 {id: 合并后的热度}，失败返回 None
+
+        读取和写回在同一事务中，行被锁定（SQLite 的写事务本身互斥），多个进程的变化不会相互覆盖；
+        不存在的笔记不在结果中
+        """
+        ids = sorted(changes)
+        lock = " FOR UPDATE" if db.dialect == 'mysql' else ""
+        merged = {}
+        try:
+            with db.transaction() as cursor:
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    cursor.execute(
+                        f"SELECT id, hot_score FROM solution_notes WHERE id IN ({', '.join(['%s'] * len(batch))}){lock}",
+                        batch
+                    )
+                    for row in cursor.fetchall():
+                        merged[row['id']] = merge_score(row['hot_score'], *changes[row['id']])
+                if merged:
+                    # 热度变化不算内容修改，保持 updated_at（条件 GET 和增量导出依据它）
+                    cursor.executemany(
+                        "UPDATE solution_notes SET hot_score = %s, updated_at = updated_at WHERE id = %s",
+                        [(hot_score, id) for id, hot_score in merged.items()]
+                    )
+        except Exception as e:
+            print(f"Merge hot scores error: {e}")
+            return None
+        return merged
+    
+    @staticmethod
+    def rebuild_hot_scores():
+        """根据点赞记录重新计算所有笔记的热度（修改半衰期后使用），返回笔记数，失败返回 None"""
+        # 先写入未合并的变化，重新计算的结果已包含这些点赞
+        note_ranking.flush()
+        try:
+            with db.transaction() as cursor:
+                count = recompute_hot_scores(cursor)
+        except Exception as e:
+            print(f"Rebuild hot scores error: {e}")
+            return None
+        note_ranking.reload()
+        return count
+    
     @staticmethod
     def create_note(content, author_name="Anonymous", author_type="anonymous"):
-        """创建新的解决方案笔记"""
+        """创建新的解决方案笔记，创建本身计为一次热度事件"""
+        hot_score = note_ranking.weight()
         query = """
-        INSERT INTO solution_notes (content, author_name, author_type, like_count, helped_count)
-        VALUES (%s, %s, %s, 0, 0)
+        INSERT INTO solution_notes (content, author_name, author_type, like_count, helped_count, hot_score)
+        VALUES (%s, %s, %s, 0, 0, %s)
         """
-        affected_rows = db.execute_update(query, (content, author_name, author_type))
-        if affected_rows > 0:
-            # 获取新创建的笔记ID
-            get_id_query = "SELECT LAST_INSERT_ID() as id"
-            result = db.execute_query(get_id_query)
-            if result:
-                return result[0]['id']
-        return None
+        note_id = db.execute_insert(query, (content, author_name, author_type, hot_score))
+        if note_id:
+            invalidate_notes()
+            after_commit(search_index.add, 'note', note_id, content)
+            after_commit(note_ranking.add, note_id, hot_score)
+        return note_id
     
     @staticmethod
     def like_note(note_id, user_ip):
-        """点赞笔记"""
-        # 检查是否已经点赞
-        check_query = "SELECT id FROM user_likes WHERE user_ip = %s AND note_id = %s"
-        existing_like = db.execute_query(check_query, (user_ip, note_id))
-        
-        if existing_like:
-            return {"success": False, "message": "Already liked"}
+        """点赞笔记：依赖 (user_ip, note_id) 唯一键去重，点赞记录和计数在同一事务中更新，返回最新计数"""
+        try:
+            with db.transaction() as cursor:
+                # 重复点赞被唯一键忽略；笔记不存在时 SELECT 没有结果，不插入
+                inserted = cursor.execute(
+                    "INSERT IGNORE INTO user_likes (user_ip, note_id) SELECT %s, id FROM solution_notes WHERE id = %s",
+                    (user_ip, note_id)
+                )
+                if inserted:
+                    cursor.execute("""
+                    UPDATE solution_notes 
+                    SET like_count = like_count + 1, helped_count = helped_count + 1 
+                    WHERE id = %s
+                    """, (note_id,))
+                cursor.execute(
+                    "SELECT like_count, helped_count FROM solution_notes WHERE id = %s",
+                    (note_id,)
+                )
+                counts = cursor.fetchone()
+        except Exception as e:
+            print(f"Like note error: {e}")
+            return {"success": False, "message": "Failed to like"}
         
-        # 添加点赞记录
-        like_query = "INSERT INTO user_likes (user_ip, note_id) VALUES (%s, %s)"
-        like_result = db.execute_update(like_query, (user_ip, note_id))
+        if counts is None:
+            return {"success": False, "message": "Note not found"}
         
-        if like_result > 0:
-            # 更新笔记的点赞数和帮助数
-            update_query = """
-            UPDATE solution_notes 
-            SET like_count = like_count + 1, helped_count = helped_count + 1 
-            WHERE id = %s
-            """
-            db.execute_update(update_query, (note_id,))
-            return {"success": True, "message": "Liked successfully"}
+        data = {"liked": True, "like_count": counts['like_count'], "helped_count": counts['helped_count']}
+        if not inserted:
+            return {"success": False, "message": "Already liked", "data": data}
         
-        return {"success": False, "message": "Failed to like"}
+        invalidate_notes(note_id)
+        after_commit(search_index.set_popularity, 'note', note_id, data['like_count'])
+        after_commit(note_ranking.record, note_id)
+        return {"success": True, "message": "Liked successfully", "data": data}
     
     @staticmethod
     def unlike_note(note_id, user_ip):
-        """取消点赞"""
-        # 删除点赞记录
-        delete_query = "DELETE FROM user_likes WHERE user_ip = %s AND note_id = %s"
-        delete_result = db.execute_update(delete_query, (user_ip, note_id))
+        """取消点赞：删除点赞记录和更新计数在同一事务中完成，返回最新计数"""
+        try:
+            with db.transaction() as cursor:
+                # 撤销的热度按点赞发生的时间计算
+                cursor.execute(
+                    "SELECT created_at, CURRENT_TIMESTAMP AS db_now FROM user_likes WHERE user_ip = %s AND note_id = %s",
+                    (user_ip, note_id)
+                )
+                like = cursor.fetchone()
+                deleted = cursor.execute(
+                    "DELETE FROM user_likes WHERE user_ip = %s AND note_id = %s",
+                    (user_ip, note_id)
+                )
+                if deleted:
+                    cursor.execute("""
+                    UPDATE solution_notes 
+                    SET like_count = CASE WHEN like_count > 0 THEN like_count - 1 ELSE 0 END, 
+                        helped_count = CASE WHEN helped_count > 0 THEN helped_count - 1 ELSE 0 END 
+                    WHERE id = %s
+                    """, (note_id,))
+                cursor.execute(
+                    "SELECT like_count, helped_count FROM solution_notes WHERE id = %s",
+                    (note_id,)
+                )
+                counts = cursor.fetchone()
+        except Exception as e:
+            print(f"Unlike note error: {e}")
+            return {"success": False, "message": "Failed to unlike"}
         
-        if delete_result > 0:
-            # 更新笔记的点赞数和帮助数
-            update_query = """
-            UPDATE solution_notes 
-            SET like_count = GREATEST(like_count - 1, 0), 
-                helped_count = GREATEST(helped_count - 1, 0) 
-            WHERE id = %s
-            """
-            db.execute_update(update_query, (note_id,))
-            return {"success": True, "message": "Unliked successfully"}
+        if counts is None:
+            return {"success": False, "message": "Note not found"}
+        
+        data = {"liked": False, "like_count": counts['like_count'], "helped_count": counts['helped_count']}
+        if not deleted:
+            return {"success": False, "message": "No like found to remove", "data": data}
         
-        return {"success": False, "message": "No like found to remove"}
+        invalidate_notes(note_id)
+        after_commit(search_index.set_popularity, 'note', note_id, data['like_count'])
+        liked_at = time.time() - (as_datetime(like['db_now']) - as_datetime(like['created_at'])).total_seconds()
+        after_commit(note_ranking.record, note_id, liked_at, True)
+        return {"success": True, "message": "Unliked successfully", "data": data}
     
     @staticmethod
-    def get_user_likes(user_ip):
-        """获取用户点赞的笔记ID列表"""
+    def get_user_likes(user_ip, note_ids=None):
+        """获取用户点赞的笔记ID列表，note_ids 不为 None 时只查询这些笔记"""
         query = "SELECT note_id FROM user_likes WHERE user_ip = %s"
-        result = db.execute_query(query, (user_ip,))
+        params = [user_ip]
+        if note_ids is not None:
+            if not note_ids:
+                return []
+            query += f" AND note_id IN ({', '.join(['%s'] * len(note_ids))})"
+            params.extend(note_ids)
+        result = db.execute_query(query, params)
         if result:
             return [row['note_id'] for row in result]
         return []
@@ -107,21 +352,88 @@ class SolutionService:
         result = db.execute_query(query, (user_ip, note_id))
         return len(result) > 0 if result else False
 
+# 笔记热度排行：点赞变化按间隔合并到 hot_score
+note_ranking = TrendingRanker(SolutionService.get_hot_scores, SolutionService.merge_hot_scores, **TRENDING_CONFIG)
+
+# 便签位置写回缓冲，读方法通过 position_buffer.overlaid 叠加未落库的位置
+position_buffer = PositionWriteBuffer(
+    lambda positions: WallStickerService.write_sticker_positions(positions), **WRITE_BEHIND_CONFIG
+)
+
+# 便签反应写回缓冲，读方法通过 reaction_buffer.overlaid 等叠加未落库的反应
+reaction_buffer = ReactionWriteBuffer(
+    lambda changes: StickerReactionService.write_reactions(changes), **REACTION_WRITE_BEHIND_CONFIG
+)
+
+# 便签查询字段，反应数由 same_count/great_count 冗余列维护
+STICKER_COLUMNS = """
+    id, text, type, category, body_part, intensity,
+    position_x, position_y, rotation, created_at, updated_at,
+    same_count, great_count
+"""
+
+# 反应类型对应的计数列（白名单，拼接到 SQL 中）
+REACTION_COUNT_COLUMNS = {'same': 'same_count', 'great': 'great_count'}
+
+# 根据 sticker_reactions 表重建反应计数（不含 WHERE 条件）
+RECOUNT_REACTIONS_QUERY = """
+UPDATE wall_stickers SET
+    same_count = (
+        SELECT COUNT(*) FROM sticker_reactions sr
+        WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'same'
+    ),
+    great_count = (
+        SELECT COUNT(*) FROM sticker_reactions sr
+        WHERE sr.sticker_id = wall_stickers.id AND sr.reaction_type = 'great'
+    ),
+    updated_at = updated_at
+"""
+
+def after_commit(hook, *args):
+    """写入提交后更新内存索引、统计或广播事件
+
+    失败只输出错误，不把已提交的写入变成失败，也不影响其余的更新；内存索引在下次全量加载时修正
+    """
+    try:
+        hook(*args)
+    except Exception as e:
+        print(f"After-commit {hook.__qualname__} error: {e}")
+
+def publish_sticker_created(sticker_id, sticker):
+    """广播新便签并加入检索索引、位置索引和消息墙统计，sticker 为 create_sticker 的参数元组"""
+    text, type, category, body_part, intensity, position_x, position_y, rotation = sticker
+    after_commit(search_index.add, 'sticker', sticker_id, f"{text} {body_part}")
+    after_commit(sticker_grid.add, sticker_id, position_x, position_y)
+    after_commit(wall_stats.add, type, category, intensity)
+    after_commit(wall_events.publish, 'created', {
+        'id': sticker_id, 'text': text, 'type': type, 'category': category, 'body_part': body_part,
+        'intensity': intensity, 'position_x': position_x, 'position_y': position_y, 'rotation': rotation,
+        'same_count': 0, 'great_count': 0,
+    })
+
+def publish_sticker_moved(sticker_id, position_x, position_y, rotation=None):
+    """广播便签位置变化并更新位置索引，rotation 为 None 表示旋转角度不变"""
+    after_commit(sticker_grid.move, sticker_id, position_x, position_y)
+    after_commit(wall_events.publish, 'moved', {
+        'id': sticker_id, 'position_x': position_x, 'position_y': position_y, 'rotation': rotation,
+    })
+
+def publish_reaction(sticker_id, reaction_type, action, counts):
+    """广播反应变化及最新计数（不包含用户IP），并更新检索热度"""
+    after_commit(search_index.set_popularity, 'sticker', sticker_id, counts['same'] + counts['great'])
+    after_commit(wall_events.publish, 'reaction', {
+        'sticker_id': sticker_id, 'reaction_type': reaction_type, 'action': action,
+        'same_count': counts['same'], 'great_count': counts['great'],
+    })
+
 class WallStickerService:
     @staticmethod
     def get_all_stickers():
         """获取所有便签，包含反应统计"""
-        query = """
-        SELECT 
-            ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-            ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'same' THEN 1 ELSE 0 END), 0) as same_count,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'great' THEN 1 ELSE 0 END), 0) as great_count
-        FROM wall_stickers ws
-        LEFT JOIN sticker_reactions sr ON ws.id = sr.sticker_id
-        GROUP BY ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-                 ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at
-        ORDER BY ws.created_at DESC
+        query = f"""
+        SELECT {STICKER_COLUMNS}
+        FROM wall_stickers
+        ORDER BY created_at DESC
         """
         result = db.execute_query(query)
         if result:
@@ -129,40 +441,121 @@ class WallStickerService:
         return []
     
     @staticmethod
-    def get_random_stickers(limit=6):
-        """随机获取指定数量的便签，包含反应统计"""
-        query = """
-        SELECT 
-            ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-            ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'same' THEN 1 ELSE 0 END), 0) as same_count,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'great' THEN 1 ELSE 0 END), 0) as great_count
-        FROM wall_stickers ws
-        LEFT JOIN sticker_reactions sr ON ws.id = sr.sticker_id
-        GROUP BY ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-                 ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at
-        ORDER BY RAND()
-        LIMIT %s
+    @reaction_buffer.overlaid
+    @position_buffer.overlaid
+    @response_cache.cached('stickers_page', tags=lambda *args, **kwargs: ('stickers',), cache_if=_page_has_items)
+    def get_stickers_page(limit=6, after=None):
+        """按创建时间倒序分页获取便签，after 为上一页游标解析出的 (created_at, id)，返回 (便签列表, 下一页游标)"""
+        query = f"""
+        SELECT {STICKER_COLUMNS}
+        FROM wall_stickers
         """
-        result = db.execute_query(query, (limit,))
-        if result:
-            return [WallSticker.from_dict(row) for row in result]
-        return []
+        params = []
+        if after:
+            query += f" WHERE {KEYSET_AFTER_CONDITION}"
+            params.extend([after[0], after[0], after[1]])
+        # 多取一条用于判断是否还有下一页
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, params)
+        stickers = [WallSticker.from_dict(row) for row in result] if result else []
+        return next_cursor(stickers, limit)
     
     @staticmethod
+    def get_stickers_version():
+        """便签集合的版本（写操作递增的版本号，有待写位置/反应时加上本进程的缓冲修订号），用于条件 GET；查询失败返回 None"""
+        version = read_version('stickers')
+        if version is None:
+            return None
+        pending = (position_buffer.pending_revision(), reaction_buffer.pending_revision())
+        if pending != (None, None):
+            version.update(process=PROCESS_TOKEN, pending_positions=pending[0], pending_reactions=pending[1])
+        return version
+    
+    @staticmethod
+    def get_random_stickers(limit=6, type=None, category=None):
+        """随机获取指定数量的便签，包含反应统计，可按 type/category 过滤"""
+        ids = sticker_sampler.sample(limit, type, category)
+        stickers = WallStickerService.get_stickers_by_ids(ids)
+        
+        # 索引中可能残留其他进程已删除的便签，剔除后补抽一次
+        if len(stickers) < len(ids):
+            found = {sticker.id for sticker in stickers}
+            for missing_id in set(ids) - found:
+                sticker_sampler.remove(missing_id)
+            extra_ids = [id for id in sticker_sampler.sample(limit, type, category) if id not in found]
+            stickers += WallStickerService.get_stickers_by_ids(extra_ids[:limit - len(stickers)])
+        
+        return stickers
+    
+    @staticmethod
+    def get_stickers_in_viewport(x0, y0, x1, y1, limit=200):
+        """获取坐标落在矩形 (x0, y0)-(x1, y1) 内的便签，返回 (便签列表, 区域内便签总数)
+
+        由内存网格索引查出ID，总数超过 limit 时按区域密度抽样
+        """
+        ids, total = sticker_grid.query(x0, y0, x1, y1, limit)
+        stickers = WallStickerService.get_stickers_by_ids(ids)
+        
+        # 索引中可能残留其他进程已删除的便签
+        if len(stickers) < len(ids):
+            found = {sticker.id for sticker in stickers}
+            for missing_id in set(ids) - found:
+                sticker_grid.remove(missing_id)
+        return stickers, total
+    
+    @staticmethod
+    @reaction_buffer.overlaid
+    @position_buffer.overlaid
+    def get_stickers_by_ids(ids):
+        """按ID批量获取便签，结果保持 ids 的顺序"""
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        query = f"""
+        SELECT {STICKER_COLUMNS}
+        FROM wall_stickers
+        WHERE id IN ({placeholders})
+        """
+        result = db.execute_query(query, list(ids))
+        if not result:
+            return []
+        by_id = {row['id']: WallSticker.from_dict(row) for row in result}
+        return [by_id[id] for id in ids if id in by_id]
+    
+    @staticmethod
+    def get_spatial_keys():
+        """加载位置索引所需的 (id, position_x, position_y)，叠加未落库的位置；查询失败返回 None"""
+        result = db.execute_query("SELECT id, position_x, position_y FROM wall_stickers")
+        if result is None:
+            return None
+        keys = [(row['id'], row['position_x'], row['position_y']) for row in result]
+        if position_buffer.enabled:
+            for index, (id, position_x, position_y) in enumerate(keys):
+                pending = position_buffer.pending(id)
+                if pending is not None:
+                    keys[index] = (id, pending[0], pending[1])
+        return keys
+    
+    @staticmethod
+    def get_sampling_keys():
+        """加载随机抽样索引所需的 (id, type, category)，查询失败返回 None"""
+        result = db.execute_query("SELECT id, type, category FROM wall_stickers")
+        if result is None:
+            return None
+        return [(row['id'], row['type'], row['category']) for row in result]
+    
+    @staticmethod
+    @reaction_buffer.overlaid
+    @position_buffer.overlaid
+    @response_cache.cached('sticker', tags=lambda sticker_id: (f'sticker:{sticker_id}',))
     def get_sticker_by_id(sticker_id):
         """根据ID获取便签，包含反应统计"""
-        query = """
-        SELECT 
-            ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-            ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'same' THEN 1 ELSE 0 END), 0) as same_count,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'great' THEN 1 ELSE 0 END), 0) as great_count
-        FROM wall_stickers ws
-        LEFT JOIN sticker_reactions sr ON ws.id = sr.sticker_id
-        WHERE ws.id = %s
-        GROUP BY ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-                 ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at
+        query = f"""
+        SELECT {STICKER_COLUMNS}
+        FROM wall_stickers
+        WHERE id = %s
         """
         result = db.execute_query(query, (sticker_id,))
         if result:
@@ -176,17 +569,123 @@ class WallStickerService:
         INSERT INTO wall_stickers (text, type, category, body_part, intensity, position_x, position_y, rotation)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
-        affected_rows = db.execute_update(query, (text, type, category, body_part, intensity, position_x, position_y, rotation))
-        if affected_rows > 0:
-            get_id_query = "SELECT LAST_INSERT_ID() as id"
-            result = db.execute_query(get_id_query)
-            if result:
-                return result[0]['id']
-        return None
+        sticker_id = db.execute_insert(query, (text, type, category, body_part, intensity, position_x, position_y, rotation))
+        if sticker_id:
+            after_commit(sticker_sampler.add, sticker_id, type, category)
+            invalidate_stickers()
+            publish_sticker_created(sticker_id, (text, type, category, body_part, intensity, position_x, position_y, rotation))
+        return sticker_id
+    
+    @staticmethod
+    def create_stickers(stickers):
+        """批量创建便签，在同一事务中逐行写入并记录每行的自增ID
+
+        stickers 为 (text, type, category, body_part, intensity, position_x, position_y, rotation) 元组列表，
+        返回新便签ID列表；失败返回 None
+        """
+        if not stickers:
+            return []
+        query = """
+        INSERT INTO wall_stickers (text, type, category, body_part, intensity, position_x, position_y, rotation)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        try:
+            with db.transaction() as cursor:
+                # 多行 INSERT 的自增ID不一定连续（auto_increment_increment > 1、innodb_autoinc_lock_mode = 2），
+                # 不能从第一行的ID推算，逐行插入取各自的 lastrowid；仍在一个事务中，只提交一次
+                ids = []
+                for sticker in stickers:
+                    cursor.execute(query, sticker)
+                    ids.append(cursor.lastrowid)
+        except Exception as e:
+            print(f"Batch create stickers error: {e}")
+            return None
+        
+        for sticker_id, sticker in zip(ids, stickers):
+            after_commit(sticker_sampler.add, sticker_id, sticker[1], sticker[2])
+        invalidate_stickers()
+        for sticker_id, sticker in zip(ids, stickers):
+            publish_sticker_created(sticker_id, sticker)
+        return ids
+    
+    @staticmethod
+    def existing_sticker_ids(ids):
+        """返回 ids 中实际存在的便签ID集合，优先查内存索引，未命中的再查数据库"""
+        existing = {id for id in ids if sticker_sampler.contains(id)}
+        unknown = [id for id in set(ids) if id not in existing]
+        if unknown:
+            placeholders = ", ".join(["%s"] * len(unknown))
+            result = db.execute_query(f"SELECT id FROM wall_stickers WHERE id IN ({placeholders})", unknown)
+            existing.update(row['id'] for row in result or [])
+        return existing
+    
+    @staticmethod
+    def update_sticker_positions(positions):
+        """批量更新便签位置
+
+        positions 为 (sticker_id, position_x, position_y, rotation) 元组列表，rotation 为 None 时保持不变，
+        返回 (已更新ID列表, 不存在的ID列表)；失败返回 None。启用写回缓冲时只写入内存。
+        """
+        if position_buffer.enabled:
+            existing = WallStickerService.existing_sticker_ids([position[0] for position in positions])
+            for sticker_id, position_x, position_y, rotation in positions:
+                if sticker_id in existing:
+                    position_buffer.put(sticker_id, position_x, position_y, rotation)
+            ids = [position[0] for position in positions]
+            result = [id for id in ids if id in existing], [id for id in ids if id not in existing]
+        else:
+            result = WallStickerService.write_sticker_positions(positions)
+        
+        if result is not None:
+            updated = set(result[0])
+            for sticker_id, position_x, position_y, rotation in positions:
+                if sticker_id in updated:
+                    publish_sticker_moved(sticker_id, position_x, position_y, rotation)
+        return result
+    
+    @staticmethod
+    def write_sticker_positions(positions):
+        """在同一事务中用 executemany 写入便签位置，返回 (已更新ID列表, 不存在的ID列表)；失败返回 None"""
+        if not positions:
+            return [], []
+        ids = [position[0] for position in positions]
+        placeholders = ", ".join(["%s"] * len(ids))
+        query = """
+        UPDATE wall_stickers 
+        SET position_x = %s, position_y = %s, rotation = COALESCE(%s, rotation), updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+        """
+        try:
+            with db.transaction() as cursor:
+                cursor.execute(f"SELECT id FROM wall_stickers WHERE id IN ({placeholders})", ids)
+                existing = {row['id'] for row in cursor.fetchall()}
+                rows = [
+                    (position_x, position_y, rotation, sticker_id)
+                    for sticker_id, position_x, position_y, rotation in positions
+                    if sticker_id in existing
+                ]
+                if rows:
+                    cursor.executemany(query, rows)
+        except Exception as e:
+            print(f"Batch update positions error: {e}")
+            return None
+        
+        updated = [id for id in ids if id in existing]
+        not_found = [id for id in ids if id not in existing]
+        if updated:
+            invalidate_stickers(*set(updated))
+        return updated, not_found
     
     @staticmethod
     def update_sticker_position(sticker_id, position_x, position_y, rotation=None):
-        """更新便签位置"""
+        """更新便签位置，启用写回缓冲时只写入内存"""
+        if position_buffer.enabled:
+            if sticker_id not in WallStickerService.existing_sticker_ids([sticker_id]):
+                return False
+            position_buffer.put(sticker_id, position_x, position_y, rotation)
+            publish_sticker_moved(sticker_id, position_x, position_y, rotation)
+            return True
+        
         if rotation is not None:
             query = """
             UPDATE wall_stickers 
@@ -202,113 +701,369 @@ class WallStickerService:
             """
             affected_rows = db.execute_update(query, (position_x, position_y, sticker_id))
         
+        if affected_rows > 0:
+            invalidate_stickers(sticker_id)
+            publish_sticker_moved(sticker_id, position_x, position_y, rotation)
         return affected_rows > 0
     
     @staticmethod
     def delete_sticker(sticker_id):
-        """删除便签"""
-        query = "DELETE FROM wall_stickers WHERE id = %s"
-        affected_rows = db.execute_update(query, (sticker_id,))
+        """删除便签，便签的分类和反应数从消息墙统计中减去"""
+        try:
+            with db.transaction() as cursor:
+                cursor.execute(
+                    "SELECT type, category, intensity, same_count, great_count FROM wall_stickers WHERE id = %s",
+                    (sticker_id,)
+                )
+                sticker = cursor.fetchone()
+                affected_rows = cursor.execute("DELETE FROM wall_stickers WHERE id = %s", (sticker_id,))
+        except Exception as e:
+            print(f"Delete sticker error: {e}")
+            return False
+        if affected_rows > 0:
+            # 未落库的反应已计入消息墙统计，随便签一起减去
+            pending = reaction_buffer.discard_sticker(sticker_id)
+            after_commit(wall_stats.remove, sticker['type'], sticker['category'], sticker['intensity'],
+                         sticker['same_count'] + pending.get('same', 0),
+                         sticker['great_count'] + pending.get('great', 0))
+            after_commit(sticker_sampler.remove, sticker_id)
+            after_commit(sticker_grid.remove, sticker_id)
+            position_buffer.discard(sticker_id)
+            invalidate_stickers(sticker_id)
+            after_commit(search_index.remove, 'sticker', sticker_id)
+            after_commit(wall_events.publish, 'deleted', {'id': sticker_id})
         return affected_rows > 0
     
     @staticmethod
-    def get_stickers_by_filter(category='all', intensity='all'):
-        """根据过滤条件获取便签，包含反应统计"""
-        base_query = """
-        SELECT 
-            ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-            ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'same' THEN 1 ELSE 0 END), 0) as same_count,
-            COALESCE(SUM(CASE WHEN sr.reaction_type = 'great' THEN 1 ELSE 0 END), 0) as great_count
-        FROM wall_stickers ws
-        LEFT JOIN sticker_reactions sr ON ws.id = sr.sticker_id
+    @reaction_buffer.overlaid
+    @position_buffer.overlaid
+    @response_cache.cached('stickers_filter', tags=lambda *args, **kwargs: ('stickers',), cache_if=_page_has_items)
+    def get_stickers_by_filter(categories=None, intensities=None, types=None, limit=100, after=None):
+        """按分类、焦虑程度、类型多选过滤便签，按创建时间倒序分页，返回 (便签列表, 下一页游标)
+
+        各参数为取值元组，None 表示不过滤；同一维度内为"或"，不同维度之间为"与"。
+        分类 'support' 表示鼓励类便签（type = 'support'），其他分类只匹配焦虑类便签
+        """
+        query = f"""
+        SELECT {STICKER_COLUMNS}
+        FROM wall_stickers
         WHERE 1=1
         """
         params = []
         
-        if category != 'all':
-            if category == 'support':
-                base_query += " AND ws.type = 'support'"
-            else:
-                base_query += " AND ws.category = %s"
-                params.append(category)
+        if categories is not None:
+            conditions = []
+            named = [category for category in categories if category != SUPPORT]
+            if named:
+                conditions.append(f"(type <> '{SUPPORT}' AND category IN ({', '.join(['%s'] * len(named))}))")
+                params.extend(named)
+            if SUPPORT in categories:
+                conditions.append(f"type = '{SUPPORT}'")
+            query += f" AND ({' OR '.join(conditions)})"
         
-        if intensity != 'all':
-            base_query += " AND ws.intensity = %s"
-            params.append(int(intensity))
+        if intensities is not None:
+            query += f" AND intensity IN ({', '.join(['%s'] * len(intensities))})"
+            params.extend(intensities)
         
-        base_query += """
-        GROUP BY ws.id, ws.text, ws.type, ws.category, ws.body_part, ws.intensity, 
-                 ws.position_x, ws.position_y, ws.rotation, ws.created_at, ws.updated_at
-        ORDER BY ws.created_at DESC
-        """
+        if types is not None:
+            query += f" AND type IN ({', '.join(['%s'] * len(types))})"
+            params.extend(types)
         
-        result = db.execute_query(base_query, params)
-        if result:
-            return [WallSticker.from_dict(row) for row in result]
-        return []
+        if after:
+            query += f" AND {KEYSET_AFTER_CONDITION}"
+            params.extend([after[0], after[0], after[1]])
+        # 多取一条用于判断是否还有下一页
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        result = db.execute_query(query, params)
+        stickers = [WallSticker.from_dict(row) for row in result] if result else []
+        return next_cursor(stickers, limit)
+    
+    @staticmethod
+    def get_sticker_facets(categories=None, intensities=None, types=None):
+        """多选过滤的匹配便签数、反应总数和各维度的分面计数（来自内存统计），参数含义同 get_stickers_by_filter"""
+        return wall_stats.facets(types, categories, intensities)
+    
+    @staticmethod
+    def get_wall_stats():
+        """便签总数、反应总数及按 type/category/intensity 的分布（来自内存统计）"""
+        return wall_stats.summary()
+    
+    @staticmethod
+    def get_stats_cells():
+        """加载消息墙统计所需的 [(type, category, intensity, 便签数, same 总数, great 总数)]，查询失败返回 None"""
+        result = db.execute_query("""
+        SELECT type, category, intensity, COUNT(*) AS stickers,
+               SUM(same_count) AS same_total, SUM(great_count) AS great_total
+        FROM wall_stickers
+        GROUP BY type, category, intensity
+        """)
+        if result is None:
+            return None
+        return [
+            (row['type'], row['category'], row['intensity'], row['stickers'], row['same_total'], row['great_total'])
+            for row in result
+        ]
+
+# 随机抽样索引，抽样时不再 ORDER BY RAND() 扫描全表
+sticker_sampler = StickerSampler(WallStickerService.get_sampling_keys, SAMPLER_REFRESH_INTERVAL)
+
+# 便签位置网格索引，可视区域查询不再按坐标范围扫表
+sticker_grid = StickerGrid(WallStickerService.get_spatial_keys, **SPATIAL_GRID_CONFIG)
+
+# 消息墙统计和分面计数，不再为计数读取全部便签
+wall_stats = WallStats(WallStickerService.get_stats_cells, WALL_STATS_REFRESH_INTERVAL)
+
+def load_search_documents():
+    """检索索引的数据源：[(kind, id, 文本, 热度)]
+
+    get_all_* 查询失败时返回空列表，两者都为空时返回 None 保留原索引，避免一次查询失败清空索引
+    """
+    notes = SolutionService.get_all_notes()
+    stickers = WallStickerService.get_all_stickers()
+    if not notes and not stickers:
+        return None
+    documents = [('note', note.id, note.content, note.like_count) for note in notes]
+    documents.extend(
+        ('sticker', sticker.id, f"{sticker.text} {sticker.body_part}", sticker.same_count + sticker.great_count)
+        for sticker in stickers
+    )
+    return documents
+
+# 笔记内容和便签文字/身体部位的全文检索索引，替代 LIKE '%...%' 扫表
+search_index = SearchIndex(load_search_documents, SEARCH_REFRESH_INTERVAL)
 
 # StickerConnectionService 已删除 - 连线操作仅在前端UI处理
 
 class StickerReactionService:
     @staticmethod
     def add_reaction(sticker_id, reaction_type, user_ip):
-        """添加便签反应"""
-        # 检查是否已经反应过
-        check_query = """
-        SELECT id FROM sticker_reactions 
-        WHERE sticker_id = %s AND reaction_type = %s AND user_ip = %s
-        """
-        existing = db.execute_query(check_query, (sticker_id, reaction_type, user_ip))
-        
-        if existing:
-            return {"success": False, "message": "Already reacted"}
+        """添加便签反应：依赖 (sticker_id, reaction_type, user_ip) 唯一键去重，反应和计数在同一事务中更新，返回最新计数"""
+        if reaction_buffer.enabled:
+            return StickerReactionService._buffer_reaction(sticker_id, reaction_type, user_ip, True)
+        count_column = REACTION_COUNT_COLUMNS[reaction_type]
+        try:
+            with db.transaction() as cursor:
+                # 重复反应被唯一键忽略；便签不存在时 SELECT 没有结果，不插入
+                inserted = cursor.execute(
+                    "INSERT IGNORE INTO sticker_reactions (sticker_id, reaction_type, user_ip) "
+                    "SELECT id, %s, %s FROM wall_stickers WHERE id = %s",
+                    (reaction_type, user_ip, sticker_id)
+                )
+                if inserted:
+                    # updated_at 只反映便签内容/位置的修改，计数变化时保持不变
+                    cursor.execute(f"""
+                    UPDATE wall_stickers 
+                    SET {count_column} = {count_column} + 1, updated_at = updated_at
+                    WHERE id = %s
+                    """, (sticker_id,))
+                counts, facet = StickerReactionService._fetch_counts(cursor, sticker_id)
+        except Exception as e:
+            print(f"Add reaction error: {e}")
+            return {"success": False, "message": "Failed to add reaction"}
         
-        # 添加反应
-        query = "INSERT INTO sticker_reactions (sticker_id, reaction_type, user_ip) VALUES (%s, %s, %s)"
-        affected_rows = db.execute_update(query, (sticker_id, reaction_type, user_ip))
+        if counts is None:
+            return {"success": False, "message": "Sticker not found"}
+        if not inserted:
+            return {"success": False, "message": "Already reacted", "data": counts}
         
-        if affected_rows > 0:
-            return {"success": True, "message": "Reaction added successfully"}
-        return {"success": False, "message": "Failed to add reaction"}
+        invalidate_stickers(sticker_id)
+        after_commit(wall_stats.add_reaction, *facet, reaction_type, 1)
+        publish_reaction(sticker_id, reaction_type, 'added', counts)
+        return {"success": True, "message": "Reaction added successfully", "data": counts}
     
     @staticmethod
     def remove_reaction(sticker_id, reaction_type, user_ip):
-        """移除便签反应"""
-        query = """
-        DELETE FROM sticker_reactions 
-        WHERE sticker_id = %s AND reaction_type = %s AND user_ip = %s
+        """移除便签反应，反应和计数在同一事务中更新，返回最新计数"""
+        if reaction_buffer.enabled:
+            return StickerReactionService._buffer_reaction(sticker_id, reaction_type, user_ip, False)
+        count_column = REACTION_COUNT_COLUMNS[reaction_type]
+        try:
+            with db.transaction() as cursor:
+                deleted = cursor.execute("""
+                DELETE FROM sticker_reactions 
+                WHERE sticker_id = %s AND reaction_type = %s AND user_ip = %s
+                """, (sticker_id, reaction_type, user_ip))
+                if deleted:
+                    cursor.execute(f"""
+                    UPDATE wall_stickers 
+                    SET {count_column} = CASE WHEN {count_column} > 0 THEN {count_column} - 1 ELSE 0 END,
+                        updated_at = updated_at
+                    WHERE id = %s
+                    """, (sticker_id,))
+                counts, facet = StickerReactionService._fetch_counts(cursor, sticker_id)
+        except Exception as e:
+            print(f"Remove reaction error: {e}")
+            return {"success": False, "message": "Failed to remove reaction"}
+        
+        if not deleted:
+            return {"success": False, "message": "Reaction not found", "data": counts}
+        
+        invalidate_stickers(sticker_id)
+        after_commit(wall_stats.add_reaction, *facet, reaction_type, -1)
+        publish_reaction(sticker_id, reaction_type, 'removed', counts)
+        return {"success": True, "message": "Reaction removed successfully", "data": counts}
+    
+    @staticmethod
+    def _buffer_reaction(sticker_id, reaction_type, user_ip, reacted):
+        """写回模式下添加（reacted=True）或移除反应：只读取便签和该反应的当前状态，变化记入 reaction_buffer，返回值同直接写入"""
+        action = 'added' if reacted else 'removed'
+        # 读取后、写入缓冲前若该反应被落库，读到的状态已过期，重新读取
+        for _ in range(3):
+            token = reaction_buffer.flush_token()
+            result = db.execute_query("""
+            SELECT same_count, great_count, type, category, intensity,
+                   (SELECT COUNT(*) FROM sticker_reactions
+                    WHERE sticker_id = %s AND reaction_type = %s AND user_ip = %s) AS reacted
+            FROM wall_stickers WHERE id = %s
+            """, (sticker_id, reaction_type, user_ip, sticker_id))
+            if result is None:
+                return {"success": False, "message": f"Failed to {'add' if reacted else 'remove'} reaction"}
+            if not result:
+                if reacted:
+                    return {"success": False, "message": "Sticker not found"}
+                return {"success": False, "message": "Reaction not found", "data": None}
+            
+            row = result[0]
+            applied = reaction_buffer.put(sticker_id, reaction_type, user_ip, reacted, bool(row['reacted']), token)
+            if applied is not None:
+                break
+        else:
+            return {"success": False, "message": f"Failed to {'add' if reacted else 'remove'} reaction"}
+        
+        counts = reaction_buffer.apply_counts(sticker_id, {'same': row['same_count'], 'great': row['great_count']})
+        if not applied:
+            message = "Already reacted" if reacted else "Reaction not found"
+            return {"success": False, "message": message, "data": counts}
+        
+        after_commit(wall_stats.add_reaction, row['type'], row['category'], row['intensity'], reaction_type,
+                     1 if reacted else -1)
+        publish_reaction(sticker_id, reaction_type, action, counts)
+        return {"success": True, "message": f"Reaction {action} successfully", "data": counts}
+    
+    @staticmethod
+    def write_reactions(changes):
+        """批量写入 [(sticker_id, reaction_type, user_ip, 是否有反应)] 并重建相关便签的计数，返回涉及的便签ID，失败返回 None
+
+        已删除的便签跳过；写入依赖唯一键和 DELETE 的幂等性，重复写入同一变化不影响结果
         """
-        affected_rows = db.execute_update(query, (sticker_id, reaction_type, user_ip))
-        return affected_rows > 0
+        sticker_ids = sorted({change[0] for change in changes})
+        placeholders = ", ".join(["%s"] * len(sticker_ids))
+        try:
+            with db.transaction() as cursor:
+                cursor.execute(f"SELECT id FROM wall_stickers WHERE id IN ({placeholders})", sticker_ids)
+                existing = {row['id'] for row in cursor.fetchall()}
+                added = [(sticker_id, reaction_type, user_ip)
+                         for sticker_id, reaction_type, user_ip, reacted in changes if reacted and sticker_id in existing]
+                removed = [(sticker_id, reaction_type, user_ip)
+                           for sticker_id, reaction_type, user_ip, reacted in changes if not reacted and sticker_id in existing]
+                if added:
+                    cursor.executemany(
+                        "INSERT IGNORE INTO sticker_reactions (sticker_id, reaction_type, user_ip) VALUES (%s, %s, %s)",
+                        added
+                    )
+                if removed:
+                    cursor.executemany(
+                        "DELETE FROM sticker_reactions WHERE sticker_id = %s AND reaction_type = %s AND user_ip = %s",
+                        removed
+                    )
+                existing = sorted(existing)
+                if existing:
+                    cursor.execute(
+                        RECOUNT_REACTIONS_QUERY + f" WHERE id IN ({', '.join(['%s'] * len(existing))})", existing
+                    )
+        except Exception as e:
+            print(f"Write reactions error: {e}")
+            return None
+        if existing:
+            invalidate_stickers(*existing)
+        return existing
+    
+    @staticmethod
+    def _fetch_counts(cursor, sticker_id):
+        """在当前事务中读取便签的反应计数和 (type, category, intensity)，便签不存在返回 (None, None)"""
+        cursor.execute(
+            "SELECT same_count, great_count, type, category, intensity FROM wall_stickers WHERE id = %s",
+            (sticker_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None, None
+        return {'same': row['same_count'], 'great': row['great_count']}, (row['type'], row['category'], row['intensity'])
     
     @staticmethod
     def get_sticker_reactions(sticker_id):
-        """获取便签的反应统计"""
-        query = """
-        SELECT reaction_type, COUNT(*) as count
-        FROM sticker_reactions 
-        WHERE sticker_id = %s
-        GROUP BY reaction_type
-        """
+        """获取便签的反应统计（叠加未落库的反应）"""
+        return reaction_buffer.apply_counts(sticker_id, StickerReactionService._get_sticker_reactions(sticker_id))
+    
+    @staticmethod
+    @response_cache.cached('sticker_reactions', tags=lambda sticker_id: (f'sticker:{sticker_id}',))
+    def _get_sticker_reactions(sticker_id):
+        query = "SELECT same_count, great_count FROM wall_stickers WHERE id = %s"
         result = db.execute_query(query, (sticker_id,))
         
         reactions = {'same': 0, 'great': 0}
         if result:
-            for row in result:
-                reactions[row['reaction_type']] = row['count']
+            reactions['same'] = result[0]['same_count']
+            reactions['great'] = result[0]['great_count']
         
         return reactions
     
     @staticmethod
-    def get_user_reactions(user_ip):
-        """获取用户的所有反应"""
+    def get_reactions_for_stickers(sticker_ids):
+        """批量获取便签的反应统计，返回 {sticker_id: {'same', 'great'}}
+
+        与 get_sticker_reactions 共享缓存项，未命中的便签用一次 IN 查询读取；
+        不存在的便签不在结果中，查询失败返回 None
+        """
+        return reaction_buffer.apply_counts_many(response_cache.get_many(
+            'sticker_reactions', sticker_ids, StickerReactionService._load_reaction_counts,
+            tags=lambda sticker_id: (f'sticker:{sticker_id}',)
+        ))
+    
+    @staticmethod
+    def _load_reaction_counts(sticker_ids):
+        placeholders = ", ".join(["%s"] * len(sticker_ids))
+        query = f"SELECT id, same_count, great_count FROM wall_stickers WHERE id IN ({placeholders})"
+        result = db.execute_query(query, list(sticker_ids))
+        if result is None:
+            return None
+        return {row['id']: {'same': row['same_count'], 'great': row['great_count']} for row in result}
+    
+    @staticmethod
+    def reconcile_reaction_counts(sticker_id=None):
+        """根据 sticker_reactions 表重建便签的反应计数，返回修正的便签数"""
+        query = RECOUNT_REACTIONS_QUERY
+        params = None
+        if sticker_id is not None:
+            query += " WHERE id = %s"
+            params = (sticker_id,)
+        updated = db.execute_update(query, params)
+        if sticker_id is None:
+            response_cache.clear()
+            bump_version('stickers')
+        else:
+            invalidate_stickers(sticker_id)
+        if updated:
+            wall_stats.reload()
+        return updated
+    
+    @staticmethod
+    def get_user_reactions(user_ip, sticker_ids=None):
+        """获取用户的所有反应（叠加未落库的反应），sticker_ids 不为 None 时只查询这些便签"""
         query = """
         SELECT sticker_id, reaction_type
         FROM sticker_reactions 
         WHERE user_ip = %s
         """
-        result = db.execute_query(query, (user_ip,))
+        params = [user_ip]
+        if sticker_ids is not None:
+            if not sticker_ids:
+                return {}
+            query += f" AND sticker_id IN ({', '.join(['%s'] * len(sticker_ids))})"
+            params.extend(sticker_ids)
+        result = db.execute_query(query, params)
         
         user_reactions = {}
         if result:
@@ -318,4 +1073,26 @@ class StickerReactionService:
                     user_reactions[sticker_id] = []
                 user_reactions[sticker_id].append(row['reaction_type'])
         
-        return user_reactions
+        return reaction_buffer.apply_user_reactions(user_ip, user_reactions, sticker_ids)
+
+class AsyncService:
+    """服务类的异步代理：方法在数据库线程池中执行，返回可 await 的结果"""
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, name):
+        method = getattr(self._service, name)
+
+        async def wrapper(*args, **kwargs):
+            return await run_in_db_executor(method, *args, **kwargs)
+
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        # 缓存包装函数，避免每次访问重新创建
+        setattr(self, name, wrapper)
+        return wrapper
+
+AsyncSolutionService = AsyncService(SolutionService)
+AsyncWallStickerService = AsyncService(WallStickerService)
+AsyncStickerReactionService = AsyncService(StickerReactionService)
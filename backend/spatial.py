@@ -0,0 +1,197 @@
+from array import array
+
+from lazy_index import LazyIndex
+
+# id -> 格子编号数组中表示"不在索引中"的值
+_ABSENT = 0xFFFFFFFF
+
+
+def _outside(x, y):
+    """坐标超出 0-100，便签被归入边缘格子，实际不在格子范围内"""
+    return not (0.0 <= x <= 100.0 and 0.0 <= y <= 100.0)
+
+
+class _Cell:
+    """一个格子内的便签：按加入顺序排列的ID和坐标，末尾为最近加入/移入的便签
+
+    outside 为坐标超出 0-100 的便签数，不为 0 时即使格子完全在矩形内也要逐个比较坐标
+    """
+
+    __slots__ = ('ids', 'xs', 'ys', 'outside')
+
+    def __init__(self):
+        self.ids = array('I')
+        self.xs = array('d')
+        self.ys = array('d')
+        self.outside = 0
+
+    def append(self, id, x, y):
+        self.ids.append(id)
+        self.xs.append(x)
+        self.ys.append(y)
+        if _outside(x, y):
+            self.outside += 1
+
+    def remove(self, id):
+        index = self.ids.index(id)
+        if _outside(self.xs[index], self.ys[index]):
+            self.outside -= 1
+        del self.ids[index]
+        del self.xs[index]
+        del self.ys[index]
+
+    def matching(self, x0, y0, x1, y1):
+        """格子内坐标落在矩形中的便签下标，按加入顺序"""
+        xs, ys = self.xs, self.ys
+        return [index for index in range(len(xs)) if x0 <= xs[index] <= x1 and y0 <= ys[index] <= y1]
+
+
+class StickerGrid(LazyIndex):
+    """便签位置的均匀网格索引，用于按可视区域查询
+
+    坐标为百分比（0-100，超出范围的便签归入边缘格子），墙面划分为 cells x cells 个格子。每个格子用数组保存ID和坐标，
+    便签所在格子记在按ID下标的数组中，每个便签约占 20 字节。查询时完全落在矩形内的格子直接取全部，
+    与边界相交的格子逐个比较坐标。
+
+    loader 返回 [(id, position_x, position_y)]，由创建/移动/删除便签同步更新。
+    """
+
+    def __init__(self, loader, cells=64, refresh_interval=300.0):
+        super().__init__(loader, refresh_interval)
+        self.cells = cells
+        self._grid = [_Cell() for _ in range(cells * cells)]
+        self._cell_of = array('I')
+        self._size = 0
+
+    def add(self, id, x, y):
+        """新增便签或更新便签位置"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._remove(id)
+            self._add(id, x, y)
+
+    move = add
+
+    def remove(self, id):
+        """删除便签"""
+        with self._lock:
+            self._remove(id)
+
+    def query(self, x0, y0, x1, y1, limit=None):
+        """返回 (矩形内的便签ID列表, 矩形内便签总数)
+
+        总数超过 limit 时按格子内的便签数按比例抽取，每个格子取最近加入/移入的便签，
+        密集区域不会挤占稀疏区域的名额，结果保持稳定（重复查询返回相同的便签）
+        """
+        self.ensure_loaded()
+        if x0 > x1 or y0 > y1:
+            return [], 0
+        cells = self.cells
+        scale = cells / 100.0
+        column0, column1 = self._index(x0 * scale), self._index(x1 * scale)
+        row0, row1 = self._index(y0 * scale), self._index(y1 * scale)
+
+        with self._lock:
+            # 每个格子：(格子, 矩形内的下标列表，None 表示格子完全在矩形内, 数量)
+            parts = []
+            total = 0
+            for row in range(row0, row1 + 1):
+                inner_row = row0 < row < row1 or self._covers(row, y0, y1, scale)
+                for column in range(column0, column1 + 1):
+                    cell = self._grid[row * cells + column]
+                    if not cell.ids:
+                        continue
+                    if (inner_row and not cell.outside
+                            and (column0 < column < column1 or self._covers(column, x0, x1, scale))):
+                        indexes, count = None, len(cell.ids)
+                    else:
+                        indexes = cell.matching(x0, y0, x1, y1)
+                        count = len(indexes)
+                    if count:
+                        parts.append((cell, indexes, count))
+                        total += count
+
+            if limit is None or total <= limit:
+                ids = []
+                for cell, indexes, _ in parts:
+                    ids.extend(cell.ids if indexes is None else [cell.ids[index] for index in indexes])
+                return ids, total
+
+            # 按累计比例分配名额，名额之和恰好为 limit
+            ids = []
+            seen = taken = 0
+            for cell, indexes, count in parts:
+                seen += count
+                quota = seen * limit // total - taken
+                if quota <= 0:
+                    continue
+                taken += quota
+                if indexes is None:
+                    ids.extend(cell.ids[-quota:])
+                else:
+                    ids.extend(cell.ids[index] for index in indexes[-quota:])
+            return ids, total
+
+    def _load(self, rows):
+        cells = self.cells
+        scale = cells / 100.0
+        grid = [_Cell() for _ in range(cells * cells)]
+        cell_of = array('I')
+        size = 0
+        for id, x, y in rows:
+            try:
+                x, y = float(x), float(y)
+            except (TypeError, ValueError):
+                # 坐标为空或不是数字的旧数据不在任何可视区域中
+                continue
+            cell = self._index(y * scale) * cells + self._index(x * scale)
+            if id >= len(cell_of):
+                cell_of.extend([_ABSENT] * (id + 1 - len(cell_of)))
+            elif cell_of[id] != _ABSENT:
+                continue
+            cell_of[id] = cell
+            grid[cell].append(id, x, y)
+            size += 1
+        return grid, cell_of, size
+
+    def _apply(self, data):
+        self._grid, self._cell_of, self._size = data
+
+    def stats(self):
+        with self._lock:
+            counts = [len(cell.ids) for cell in self._grid]
+            return {
+                'stickers': self._size,
+                'cells': len(counts),
+                'max_per_cell': max(counts) if counts else 0,
+                'empty_cells': counts.count(0),
+                'load_seconds': self._load_seconds,
+                'loaded': self._loaded_at is not None,
+            }
+
+    def _index(self, value):
+        return min(self.cells - 1, max(0, int(value)))
+
+    def _covers(self, index, low, high, scale):
+        """第 index 个格子（行或列）是否完全落在 [low, high] 内"""
+        return low <= index / scale and (index + 1) / scale <= high
+
+    def _add(self, id, x, y):
+        x, y = float(x), float(y)
+        scale = self.cells / 100.0
+        cell = self._index(y * scale) * self.cells + self._index(x * scale)
+        cell_of = self._cell_of
+        if id >= len(cell_of):
+            cell_of.extend([_ABSENT] * (id + 1 - len(cell_of)))
+        cell_of[id] = cell
+        self._grid[cell].append(id, x, y)
+        self._size += 1
+
+    def _remove(self, id):
+        cell_of = self._cell_of
+        if id >= len(cell_of) or cell_of[id] == _ABSENT:
+            return
+        self._grid[cell_of[id]].remove(id)
+        cell_of[id] = _ABSENT
+        self._size -= 1
@@ -0,0 +1,205 @@
+import functools
+import re
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+import pymysql
+
+from database import ConnectionPool, Database, _ObservedCursorMixin
+from config import DB_POOL_CONFIG
+
+# 时间以 'YYYY-MM-DD HH:MM:SS' 文本存储（与 CURRENT_TIMESTAMP 一致，UTC），声明为 TIMESTAMP 的列读出为 datetime
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(query):
+    """把服务层的 MySQL 风格语句转为 SQLite 语句：%s 占位符改为 ?，INSERT IGNORE 改为 INSERT OR IGNORE"""
+    query = _PLACEHOLDER.sub(lambda match: '?' if match.group(1) == 's' else '%', query)
+    return query.replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+
+class _SQLiteCursor:
+    """pymysql 风格的游标
+
+    execute 返回影响行数；executemany 逐条执行，lastrowid 为第一行的ID（与 pymysql 的多行 INSERT 一致，
+    写连接只有一个，同一事务中插入的ID连续）
+    """
+
+    def __init__(self, connection, dict_rows):
+        self._cursor = connection.cursor()
+        self._dict_rows = dict_rows
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, args=None):
+        cursor = self._cursor
+        cursor.execute(translate(query), () if args is None else args)
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+        return max(cursor.rowcount, 0)
+
+    def executemany(self, query, args):
+        affected = 0
+        first_id = None
+        for row in args:
+            affected += self.execute(query, row)
+            if first_id is None:
+                first_id = self.lastrowid
+        self.lastrowid = first_id
+        return affected
+
+    def _rows(self, rows):
+        if not self._dict_rows:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._rows([row])[0]
+
+    def fetchmany(self, size):
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ObservedSQLiteCursor(_ObservedCursorMixin, _SQLiteCursor):
+    pass
+
+
+class SQLiteConnection:
+    """sqlite3 连接的包装，提供连接池和 Database 所需的 pymysql 风格接口"""
+
+    def __init__(self, path, readonly=False, busy_timeout=5.0, cache_size_mb=64, mmap_size_mb=256,
+                 synchronous='NORMAL', **_):
+        # 写连接以 BEGIN IMMEDIATE 开始事务，避免读后升级写锁时与其他进程死锁；只读连接为自动提交
+        self._connection = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None if readonly else 'IMMEDIATE',
+            detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+        )
+        pragmas = [
+            f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}",
+            f"PRAGMA cache_size = {-cache_size_mb * 1024}",
+            f"PRAGMA mmap_size = {mmap_size_mb * 1024 * 1024}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+        if readonly:
+            pragmas.append("PRAGMA query_only = ON")
+        else:
+            pragmas += [
+                "PRAGMA journal_mode = WAL",
+                f"PRAGMA synchronous = {synchronous}",
+                "PRAGMA foreign_keys = ON",
+            ]
+        for pragma in pragmas:
+            self._connection.execute(pragma)
+        self.open = True
+
+    def cursor(self, cursor_class=None):
+        dict_rows = cursor_class is not None and issubclass(cursor_class, pymysql.cursors.DictCursorMixin)
+        return ObservedSQLiteCursor(self._connection, dict_rows)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        self._connection.execute("SELECT 1")
+
+    def close(self):
+        self.open = False
+        self._connection.close()
+
+
+class SQLiteDatabase(Database):
+    """嵌入式 SQLite 存储后端
+
+    - WAL 模式：读不阻塞写，写不阻塞读
+    - 一个写连接（大小为 1 的连接池，写操作在池上排队，等待时间计入池指标）加一组只读连接
+    - 服务层的 MySQL 风格语句在执行时转换（见 translate）
+    - 首次连接时自动执行迁移，建表语句见 migrations.py
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, config):
+        self.config = config
+        pool_options = {
+            'wait_timeout': DB_POOL_CONFIG['wait_timeout'],
+            # 本地文件连接不会因空闲失效，不需要回收和 ping
+            'max_idle_time': 0,
+            'ping_interval': float('inf'),
+            'connect': SQLiteConnection,
+        }
+        write_pool = ConnectionPool(dict(config, readonly=False), min_size=1, max_size=1, **pool_options)
+        read_pool = ConnectionPool(dict(config, readonly=True), min_size=1, max_size=max(1, config['readers']),
+                                   **pool_options)
+        super().__init__(read_pool)
+        self.write_pool = write_pool
+
+    def connect(self):
+        """打开写连接和只读连接，按配置执行迁移"""
+        try:
+            with self._open_lock:
+                if self._opened:
+                    return True
+                # 写连接先打开，新建的数据库文件先切换到 WAL 模式
+                self.write_pool.open()
+                self.pool.open()
+                self._opened = True
+            if self.config['auto_migrate']:
+                import migrations
+                migrations.migrate()
+            return True
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            return False
+
+    def disconnect(self):
+        """关闭写连接和只读连接"""
+        with self._open_lock:
+            self.pool.close()
+            self.write_pool.close()
+            self._opened = False
+
+    def stream_query(self, query, params=None, batch_size=1000, net_write_timeout=None):
+        """逐批读取查询结果，使用不属于连接池的独立只读连接（sqlite3 游标按需读取，不整体缓存结果）"""
+        connection = SQLiteConnection(**dict(self.config, readonly=True))
+        try:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def pool_stats(self):
+        """只读连接池指标，写连接的指标在 writer 中"""
+        return dict(self.pool.stats(), writer=self.write_pool.stats())
@@ -0,0 +1,23 @@
+"""测试使用嵌入式 SQLite 后端和临时数据库文件，不需要外部服务
+
+环境变量须在导入 config 之前设置（load_dotenv 不覆盖已有的环境变量）。
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='mirror-notes-test-'), 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def sticker_id():
+    """新建一个便签，测试结束后删除"""
+    from services import WallStickerService
+
+    new_id = WallStickerService.create_sticker("test sticker", 'anxiety', 'skin', 'Skin', 3)
+    yield new_id
+    WallStickerService.delete_sticker(new_id)
@@ -0,0 +1,47 @@
+from admission import AdmissionController, client_ip, parse_networks
+
+PROXIES = parse_networks('127.0.0.1,10.0.0.0/8')
+
+
+def scope(peer, *headers):
+    return {'client': (peer, 40000), 'headers': [(name, value.encode()) for name, value in headers]}
+
+
+def test_untrusted_peer_ignores_forwarding_headers():
+    request = scope('203.0.113.7', (b'x-forwarded-for', '198.51.100.1'), (b'x-real-ip', '198.51.100.2'))
+    assert client_ip(request, PROXIES) == '203.0.113.7'
+    assert client_ip(scope('127.0.0.1', (b'x-forwarded-for', '198.51.100.1'))) == '127.0.0.1'
+
+
+def test_trusted_peer_takes_rightmost_untrusted_hop():
+    request = scope('127.0.0.1', (b'x-forwarded-for', '198.51.100.1, 203.0.113.7'), (b'x-forwarded-for', '10.0.0.5'))
+    assert client_ip(request, PROXIES) == '203.0.113.7'
+    assert client_ip(scope('127.0.0.1', (b'x-forwarded-for', '10.0.0.9, 10.0.0.5')), PROXIES) == '10.0.0.9'
+
+
+def test_rotated_spoofed_header_keeps_the_same_key():
+    keys = {client_ip(scope('127.0.0.1', (b'x-forwarded-for', f'192.0.2.{index}, 203.0.113.7')), PROXIES)
+            for index in range(10)}
+    assert keys == {'203.0.113.7'}
+
+
+def test_real_ip_fallback_only_without_forwarded_for():
+    assert client_ip(scope('10.1.2.3', (b'x-real-ip', '203.0.113.7')), PROXIES) == '203.0.113.7'
+    assert client_ip(scope('10.1.2.3'), PROXIES) == '10.1.2.3'
+
+
+def test_failing_wait_probe_stops_load_shedding():
+    totals = [(0, 0.0), (10, 10.0)]
+
+    def probe():
+        if not totals:
+            raise RuntimeError("probe down")
+        return totals.pop(0)
+
+    controller = AdmissionController({'read': (1e9, 1e9)}, wait_probe=probe, max_concurrency=0, window=1.0)
+    controller._check_pressure(1.0)
+    controller._check_pressure(2.0)
+    assert controller.overloaded
+    controller._check_pressure(3.0)
+    assert not controller.overloaded
+    assert controller.admit('203.0.113.7', 'read', now=3.5) is None
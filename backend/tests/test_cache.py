@@ -0,0 +1,20 @@
+from cache import TTLCache
+
+
+def test_clear_discards_loads_in_progress():
+    cache = TTLCache()
+    calls = []
+
+    @cache.cached('value', tags=lambda key: ('values',))
+    def load(key):
+        calls.append(key)
+        if len(calls) == 1:
+            # 加载期间缓存被清空（如 manage.py reconcile-counts），加载到的旧值不应写回
+            cache.clear()
+            return 'stale'
+        return 'fresh'
+
+    assert load(1) == 'stale'
+    assert load(1) == 'fresh'
+    assert load(1) == 'fresh'
+    assert calls == [1, 1]
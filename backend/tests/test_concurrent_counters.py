@@ -0,0 +1,84 @@
+"""并发点赞/反应后，冗余计数与明细表的 COUNT(*) 一致（对应 benchmarks.concurrent_likes 的进程内版本）"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database import db
+from services import SolutionService, StickerReactionService, reaction_buffer
+
+USERS = 40
+REPEAT = 3
+CONCURRENCY = 16
+
+
+def run_concurrently(calls):
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        return [future.result() for future in [pool.submit(call) for call in calls]]
+
+
+def shuffled(calls, seed):
+    random.Random(seed).shuffle(calls)
+    return calls
+
+
+@pytest.fixture
+def note_id():
+    return SolutionService.create_note("concurrent likes")
+
+
+def test_concurrent_like_unlike_keeps_counts(note_id):
+    ips = [f"203.0.113.{index}" for index in range(USERS)]
+    results = run_concurrently(shuffled(
+        [lambda ip=ip: SolutionService.like_note(note_id, ip) for ip in ips for _ in range(REPEAT)], seed=1))
+    assert sum(result['success'] for result in results) == USERS
+
+    # 一半用户取消点赞，同时另一半重复点赞
+    calls = [lambda ip=ip: SolutionService.unlike_note(note_id, ip) for ip in ips[::2] for _ in range(REPEAT)]
+    calls += [lambda ip=ip: SolutionService.like_note(note_id, ip) for ip in ips[1::2]]
+    results = run_concurrently(shuffled(calls, seed=2))
+    assert sum(result['success'] for result in results) == USERS // 2
+
+    row = db.execute_query("""
+    SELECT like_count, helped_count,
+           (SELECT COUNT(*) FROM user_likes WHERE note_id = %s) AS likes
+    FROM solution_notes WHERE id = %s
+    """, (note_id, note_id))[0]
+    assert row['likes'] == USERS - USERS // 2
+    assert row['like_count'] == row['helped_count'] == row['likes']
+
+
+@pytest.mark.parametrize('buffered', [False, True], ids=['direct', 'write-behind'])
+def test_concurrent_reactions_keep_counts(sticker_id, buffered, monkeypatch, request):
+    monkeypatch.setattr(reaction_buffer, 'enabled', buffered)
+    # 写回模式下后台线程持续落库，与请求交错
+    monkeypatch.setattr(reaction_buffer, 'interval', 0.001)
+    reaction_buffer.start()
+    request.addfinalizer(reaction_buffer.stop)
+    ips = [f"203.0.113.{index + 100}" for index in range(USERS)]
+    results = run_concurrently(shuffled(
+        [lambda ip=ip, reaction_type=reaction_type: StickerReactionService.add_reaction(sticker_id, reaction_type, ip)
+         for ip in ips for reaction_type in ('same', 'great') for _ in range(REPEAT)], seed=3))
+    assert sum(result['success'] for result in results) == 2 * USERS
+
+    # 部分用户重复撤销 'great'，同时其他用户重复添加已有的反应
+    removers = ips[::3]
+    calls = [lambda ip=ip: StickerReactionService.remove_reaction(sticker_id, 'great', ip)
+             for ip in removers for _ in range(REPEAT)]
+    calls += [lambda ip=ip: StickerReactionService.add_reaction(sticker_id, 'same', ip) for ip in ips]
+    results = run_concurrently(shuffled(calls, seed=4))
+    assert sum(result['success'] for result in results) == len(removers)
+
+    reaction_buffer.stop()
+    assert reaction_buffer.stats()['pending'] == 0
+
+    row = db.execute_query("""
+    SELECT same_count, great_count,
+           (SELECT COUNT(*) FROM sticker_reactions WHERE sticker_id = %s AND reaction_type = 'same') AS same,
+           (SELECT COUNT(*) FROM sticker_reactions WHERE sticker_id = %s AND reaction_type = 'great') AS great
+    FROM wall_stickers WHERE id = %s
+    """, (sticker_id, sticker_id, sticker_id))[0]
+    assert (row['same'], row['great']) == (USERS, USERS - len(removers))
+    assert row['same_count'] == row['same']
+    assert row['great_count'] == row['great']
+    assert StickerReactionService.get_sticker_reactions(sticker_id) == {'same': row['same'], 'great': row['great']}
@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from models import SolutionNote, WallSticker
+from responses import encode_json
+
+
+def sticker(**fields):
+    values = dict(id=7, text='"quoted" 文本', category='skin', body_part='Skin', intensity=4,
+                  position_x=Decimal('12.50'), position_y=Decimal('40.00'), rotation=Decimal('-1.25'),
+                  created_at=datetime(2026, 1, 2, 3, 4, 5), updated_at=datetime(2026, 1, 2, 3, 4, 6),
+                  same_count=3, great_count=0)
+    values.update(fields)
+    return WallSticker(**values)
+
+
+def test_to_json_matches_jsonable_encoder():
+    note = SolutionNote(id=1, content='line\nbreak', like_count=2, helped_count=2,
+                        created_at=datetime(2026, 1, 1))
+    for model in (sticker(), sticker(position_x=12.5, rotation=0.0), note):
+        assert json.loads(model.to_json()) == jsonable_encoder(model.to_dict())
+    assert encode_json([sticker()]) == '[' + sticker().to_json() + ']'
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf'), Decimal('NaN'), Decimal('-Infinity')])
+def test_to_json_rejects_non_finite_numbers(value):
+    with pytest.raises(ValueError):
+        sticker(rotation=value).to_json()
+
+
+def test_dict_keys_match_json_response():
+    from fastapi.responses import JSONResponse
+
+    content = {True: 1, False: 2, None: 3, 4: {'nested': {5: [6]}}, 1.5: 'x', Decimal('2.50'): 'd',
+               datetime(2026, 1, 1): 'dt', '文本': 'text'}
+    expected = JSONResponse(jsonable_encoder(content)).body
+    assert encode_json(content).encode('utf-8') == expected
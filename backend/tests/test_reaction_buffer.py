@@ -0,0 +1,100 @@
+import threading
+
+from database import db
+from services import StickerReactionService, reaction_buffer
+from write_behind import ReactionWriteBuffer
+
+
+def test_put_detects_flush_between_read_and_put():
+    written = []
+    buffer = ReactionWriteBuffer(lambda changes: written.extend(changes) or [1], enabled=True)
+    assert buffer.put(1, 'same', '10.0.0.1', True, False)
+
+    # 另一个请求读取数据库状态（尚未落库：没有反应），随后落库完成
+    token = buffer.flush_token()
+    assert buffer.flush() == 1
+
+    assert buffer.put(1, 'same', '10.0.0.1', True, False, token) is None
+    # 重新读取到落库后的状态
+    assert buffer.put(1, 'same', '10.0.0.1', True, True, buffer.flush_token()) is False
+    assert buffer.apply_counts(1, {'same': 1, 'great': 0}) == {'same': 1, 'great': 0}
+
+
+def test_put_ignores_flushes_of_other_keys():
+    buffer = ReactionWriteBuffer(lambda changes: [1], enabled=True)
+    buffer.put(1, 'same', '10.0.0.1', True, False)
+    token = buffer.flush_token()
+    buffer.flush()
+    assert buffer.put(1, 'great', '10.0.0.1', True, False, token) is True
+
+
+def test_buffered_reaction_with_flush_between_read_and_put(sticker_id, monkeypatch):
+    monkeypatch.setattr(reaction_buffer, 'enabled', True)
+    ip = '198.51.100.7'
+    assert StickerReactionService.add_reaction(sticker_id, 'same', ip)['success']
+
+    # 重复点击：读取数据库状态之后、写入缓冲之前，后台线程落库了第一次点击
+    execute_query = db.execute_query
+    flushed = []
+
+    def query_then_flush(query, params=None):
+        result = execute_query(query, params)
+        if 'AS reacted' in query and not flushed:
+            flushed.append(reaction_buffer.flush())
+        return result
+
+    monkeypatch.setattr(db, 'execute_query', query_then_flush)
+    result = StickerReactionService.add_reaction(sticker_id, 'same', ip)
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+
+    assert flushed == [1]
+    assert not result['success'] and result['message'] == "Already reacted"
+    assert result['data']['same'] == 1
+    assert StickerReactionService.get_sticker_reactions(sticker_id)['same'] == 1
+    reaction_buffer.flush()
+    row = execute_query("SELECT same_count FROM wall_stickers WHERE id = %s", (sticker_id,))[0]
+    assert row['same_count'] == 1
+
+
+def test_delete_sticker_removes_pending_reactions_from_wall_stats(sticker_id, monkeypatch):
+    from services import WallStickerService, wall_stats
+
+    monkeypatch.setattr(reaction_buffer, 'enabled', True)
+    before = wall_stats.summary()['reactions']
+    # 与 sticker_id 在同一统计格中，删除后格子仍然存在
+    new_id = WallStickerService.create_sticker("pending reactions", 'anxiety', 'skin', 'Skin', 3)
+    for index in range(3):
+        StickerReactionService.add_reaction(new_id, 'great', f'198.51.100.{index + 10}')
+    assert wall_stats.summary()['reactions']['great'] == before['great'] + 3
+
+    assert WallStickerService.delete_sticker(new_id)
+    assert wall_stats.summary()['reactions'] == before
+    assert reaction_buffer.stats()['pending'] == 0
+
+
+def test_journal_compaction_does_not_block_puts(tmp_path):
+    journal = str(tmp_path / 'reactions.journal')
+    buffer = ReactionWriteBuffer(lambda changes: [1], enabled=True, journal_path=journal)
+    buffer.put(1, 'same', '10.0.0.1', True, False)
+    buffer.put(2, 'same', '10.0.0.2', True, False)
+
+    # 压缩日志写临时文件时，另一个线程写入新的反应，不应等待压缩结束
+    write_entries = buffer._write_journal_entries
+    concurrent = []
+
+    def write_with_concurrent_put(handle, entries):
+        if not concurrent:
+            thread = threading.Thread(target=lambda: concurrent.append(buffer.put(3, 'great', '10.0.0.3', True, False)))
+            thread.start()
+            thread.join(timeout=5)
+            assert concurrent == [True]
+        write_entries(handle, entries)
+
+    buffer._write_journal_entries = write_with_concurrent_put
+    assert buffer.flush() == 2
+
+    # 压缩后的日志只包含压缩期间写入、尚未落库的反应
+    replayed = ReactionWriteBuffer(lambda changes: [1], enabled=True, journal_path=journal)
+    replayed._replay_journal()
+    assert replayed.stats()['pending'] == 1
+    assert replayed.apply_user_reactions('10.0.0.3', {}) == {3: ['great']}
@@ -0,0 +1,35 @@
+from spatial import StickerGrid
+
+
+def make_grid(rows, cells=4):
+    grid = StickerGrid(lambda: rows, cells=cells)
+    grid.reload()
+    return grid
+
+
+def test_out_of_range_positions_are_checked_in_edge_cells():
+    grid = make_grid([(1, 99.0, 50.0), (2, 105.0, 50.0), (3, -5.0, -5.0), (4, 50.0, 50.0)])
+    assert sorted(grid.query(0, 0, 100, 100)[0]) == [1, 4]
+    assert sorted(grid.query(-10, -10, 110, 110)[0]) == [1, 2, 3, 4]
+    assert grid.query(101, 0, 110, 100) == ([2], 1)
+    assert grid.query(-10, -10, -1, -1) == ([3], 1)
+
+
+def test_moved_out_of_range_sticker_leaves_query():
+    grid = make_grid([(1, 80.0, 80.0)])
+    assert grid.query(75, 75, 100, 100) == ([1], 1)
+    grid.move(1, 130.0, 80.0)
+    assert grid.query(75, 75, 100, 100) == ([], 0)
+    assert grid.query(75, 75, 150, 100) == ([1], 1)
+
+
+def test_limit_samples_by_cell_density():
+    rows = [(id, 10.0 + id % 10, 10.0) for id in range(1, 31)] + [(100, 90.0, 90.0)]
+    ids, total = make_grid(rows).query(0, 0, 100, 100, limit=4)
+    assert total == 31
+    assert len(ids) == 4 and 100 in ids
+
+
+def test_rows_without_valid_coordinates_are_skipped_on_load():
+    grid = make_grid([(1, None, 50.0), (2, 'zz', 50.0), (3, 40.0, 40.0)])
+    assert grid.query(0, 0, 100, 100) == ([3], 1)
@@ -0,0 +1,73 @@
+"""创建便签：坐标在写入前校验，写入提交后内存索引的更新失败不影响响应、统计和推送"""
+import pytest
+from fastapi.testclient import TestClient
+
+import services
+from main import app
+from services import WallStickerService, sticker_grid, wall_stats
+
+
+@pytest.fixture(scope="module")
+def client():
+    # 应用关闭时会停止数据库线程池，整个模块共用一次启动/关闭
+    with TestClient(app) as client:
+        yield client
+
+
+def create(client, **fields):
+    return client.post("/api/wall/stickers", json={"text": "coordinates", **fields})
+
+
+def test_null_coordinates_use_column_defaults(client):
+    response = create(client, position_x=None, position_y=None, rotation=None)
+    assert response.status_code == 200
+    sticker_id = response.json()["data"]["id"]
+    sticker = WallStickerService.get_sticker_by_id(sticker_id)
+    assert (float(sticker.position_x), float(sticker.position_y), float(sticker.rotation)) == (50.0, 50.0, 0.0)
+    WallStickerService.delete_sticker(sticker_id)
+
+
+@pytest.mark.parametrize("fields", [{"position_x": "abc"}, {"position_y": True}, {"rotation": [1]}])
+def test_invalid_coordinates_are_rejected_before_the_write(client, fields):
+    total = wall_stats.summary()["total"]
+    assert create(client, **fields).status_code == 400
+    assert wall_stats.summary()["total"] == total
+
+
+def test_failing_index_update_keeps_stats_and_events(client, monkeypatch):
+    published = []
+
+    def broken_add(*args):
+        raise RuntimeError("grid unavailable")
+
+    wall_stats.ensure_loaded()
+    total = wall_stats.summary()["total"]
+    monkeypatch.setattr(sticker_grid, "add", broken_add)
+    monkeypatch.setattr(services.wall_events, "publish", lambda event, data: published.append((event, data["id"])))
+
+    response = create(client, position_x=10, position_y=20)
+    assert response.status_code == 200
+    sticker_id = response.json()["data"]["id"]
+    assert wall_stats.summary()["total"] == total + 1
+    assert published == [("created", sticker_id)]
+    WallStickerService.delete_sticker(sticker_id)
+
+
+@pytest.mark.parametrize("fields", [{"position_x": None}, {"position_x": "zz"}, {"rotation": float("inf")}])
+def test_batch_rejects_null_or_non_numeric_coordinates(client, fields):
+    total = wall_stats.summary()["total"]
+    response = client.post("/api/wall/stickers/batch", json={
+        "stickers": [{"text": "first"}, {"text": "second", **fields}],
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("stickers[1]: ")
+    assert wall_stats.summary()["total"] == total
+
+
+def test_position_update_rejects_non_numeric_coordinates(client, sticker_id):
+    url = f"/api/wall/stickers/{sticker_id}/position"
+    assert client.put(url, json={"position_x": "zz", "position_y": 10}).status_code == 400
+    assert client.put(url, json={"position_x": 10, "position_y": 10, "rotation": "5"}).status_code == 400
+    assert client.put(url, json={"position_x": 10, "position_y": 20.5}).status_code == 200
+    sticker = WallStickerService.get_sticker_by_id(sticker_id)
+    assert (float(sticker.position_x), float(sticker.position_y)) == (10.0, 20.5)
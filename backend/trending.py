@@ -0,0 +1,276 @@
+"""笔记热度排行
+
+热度为按时间衰减的点赞数：每次点赞（以及笔记创建本身）计一分，每过 half_life 秒衰减一半。
+直接保存衰减后的分数需要定期给所有笔记重新计算，这里改为保存与时间无关的对数形式：
+
+    hot = log2(Σ 2 ^ ((事件时间 - EPOCH) / half_life))
+
+新事件的权重随时间增大而不是旧事件的权重减小，任意时刻按 hot 排序与按衰减后的分数排序一致，
+增加或撤销一个事件只需更新一个笔记；当前的衰减分数为 2 ^ (hot - weight(now))。
+"""
+import bisect
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from lazy_index import LazyIndex
+
+# 权重的起点（UTC 时间戳）；hot 为 0 表示没有任何事件
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def event_weight(timestamp, half_life):
+    """发生在 timestamp（秒）的事件的对数权重"""
+    return (timestamp - EPOCH) / half_life
+
+
+def log2_add(a, b):
+    """log2(2^a + 2^b)，-inf 表示空"""
+    high, low = (a, b) if a >= b else (b, a)
+    if high == -math.inf:
+        return high
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+def merge_score(base, added, removed):
+    """log2(2^base + 2^added - 2^removed)，结果不低于 0（撤销的事件多于剩余事件时视为没有事件）"""
+    high = max(base, added, removed)
+    if high == -math.inf:
+        return 0.0
+    total = 2.0 ** (base - high) + 2.0 ** (added - high) - 2.0 ** (removed - high)
+    # 相减后只剩舍入误差
+    if total <= 1e-12:
+        return 0.0
+    return max(0.0, high + math.log2(total))
+
+
+class _SortedKeys:
+    """分段有序列表：(hot, id) 按升序分布在若干长度不超过 2 * LOAD 的子列表中
+
+    插入/删除先在各子列表的最大值中二分查找，再在子列表内二分，移动的元素不超过 2 * LOAD 个；
+    取前 k 个从末尾倒序遍历，为 O(k)
+    """
+
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._lists = [keys[start:start + self.LOAD] for start in range(0, len(keys), self.LOAD)]
+        self._maxes = [sublist[-1] for sublist in self._lists]
+
+    def add(self, key):
+        lists, maxes = self._lists, self._maxes
+        if not lists:
+            lists.append([key])
+            maxes.append(key)
+            return
+        index = bisect.bisect_left(maxes, key)
+        if index == len(maxes):
+            index -= 1
+            lists[index].append(key)
+            maxes[index] = key
+        else:
+            bisect.insort(lists[index], key)
+        sublist = lists[index]
+        if len(sublist) > 2 * self.LOAD:
+            lists.insert(index + 1, sublist[self.LOAD:])
+            del sublist[self.LOAD:]
+            maxes.insert(index, sublist[-1])
+
+    def remove(self, key):
+        lists, maxes = self._lists, self._maxes
+        index = bisect.bisect_left(maxes, key)
+        if index == len(maxes):
+            return
+        sublist = lists[index]
+        position = bisect.bisect_left(sublist, key)
+        if position == len(sublist) or sublist[position] != key:
+            return
+        del sublist[position]
+        if sublist:
+            maxes[index] = sublist[-1]
+        else:
+            del lists[index]
+            del maxes[index]
+
+    def top(self, k):
+        """分数最高的 k 个键，按分数降序"""
+        result = []
+        for sublist in reversed(self._lists):
+            for key in reversed(sublist):
+                if len(result) >= k:
+                    return result
+                result.append(key)
+        return result
+
+
+class TrendingRanker(LazyIndex):
+    """笔记热度排行索引
+
+    loader 返回 [(id, hot_score)]，由创建笔记（add）和点赞/取消点赞（record）同步更新。
+
+    点赞/取消点赞的权重在内存中按笔记累加，后台线程每隔 flush_interval 秒调用 persist 把累加的变化
+    合并到数据库中的分数上（多个进程各自合并，互不覆盖），并以合并结果更新内存中的分数，停止时再写一次。
+    persist 接收 {id: (added, removed)}，返回 {id: 合并后的 hot_score}，失败返回 None。
+    """
+
+    def __init__(self, loader, persist, half_life=86400.0, refresh_interval=600.0, flush_interval=5.0):
+        super().__init__(loader, refresh_interval)
+        self.persist = persist
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._scores = {}
+        self._keys = _SortedKeys()
+        # id -> [新增事件的对数权重和, 撤销事件的对数权重和]，尚未合并到数据库
+        self._pending = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {
+            'events': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'flush_errors': 0,
+        }
+
+    def weight(self, timestamp=None):
+        """事件的对数权重，timestamp 默认为当前时间"""
+        return event_weight(time.time() if timestamp is None else timestamp, self.half_life)
+
+    def add(self, id, hot_score):
+        """新增笔记，hot_score 为已写入数据库的初始分数"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._set(id, hot_score)
+
+    def record(self, id, timestamp=None, removed=False):
+        """记录一次点赞（removed=True 时为撤销发生在 timestamp 的点赞）"""
+        weight = self.weight(timestamp)
+        with self._lock:
+            pending = self._pending.get(id)
+            if pending is None:
+                pending = self._pending[id] = [-math.inf, -math.inf]
+            slot = 1 if removed else 0
+            pending[slot] = log2_add(pending[slot], weight)
+            self._stats['events'] += 1
+            hot_score = self._scores.get(id)
+            if hot_score is not None:
+                if removed:
+                    self._set(id, merge_score(hot_score, -math.inf, weight))
+                else:
+                    self._set(id, log2_add(hot_score, weight))
+
+    def top(self, k):
+        """热度最高的 k 个笔记，返回 [(id, hot_score)]，按热度降序"""
+        self.ensure_loaded()
+        with self._lock:
+            return [(id, hot_score) for hot_score, id in self._keys.top(k)]
+
+    def decayed(self, hot_score, timestamp=None):
+        """hot_score 在 timestamp 时刻的衰减分数（相当于多少个刚发生的点赞）"""
+        return 2.0 ** (hot_score - self.weight(timestamp))
+
+    def flush(self):
+        """把累加的变化合并到数据库，返回写入的笔记数"""
+        with self._flush_lock:
+            with self._lock:
+                snapshot = {id: tuple(pending) for id, pending in self._pending.items()}
+                self._pending = {}
+            if not snapshot:
+                return 0
+
+            try:
+                merged = self.persist(snapshot)
+            except Exception as e:
+                print(f"Trending flush error: {e}")
+                merged = None
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                if merged is None:
+                    # 写入失败，把变化放回等待下次重试
+                    self._stats['flush_errors'] += 1
+                    for id, (added, removed) in snapshot.items():
+                        pending = self._pending.get(id)
+                        if pending is None:
+                            self._pending[id] = [added, removed]
+                        else:
+                            pending[0] = log2_add(pending[0], added)
+                            pending[1] = log2_add(pending[1], removed)
+                    return 0
+                # 数据库中的分数包含其他进程的变化；叠加合并期间新记录的变化
+                if self._loaded_at is not None:
+                    for id in snapshot:
+                        hot_score = merged.get(id)
+                        if hot_score is None:
+                            self._discard(id)
+                            continue
+                        pending = self._pending.get(id)
+                        if pending is not None:
+                            hot_score = merge_score(log2_add(hot_score, pending[0]), -math.inf, pending[1])
+                        self._set(id, hot_score)
+                self._stats['rows_written'] += len(merged)
+            return len(merged)
+
+    def start(self):
+        """启动后台合并线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程并写入剩余变化"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def reload(self):
+        """从数据源重新加载全部分数并叠加未写入的变化，加载失败（loader 返回 None）时保留原索引"""
+        # 与 flush 互斥，避免加载到合并前的分数后覆盖合并结果
+        with self._flush_lock:
+            super().reload()
+
+    def _load(self, rows):
+        return {id: float(hot_score) for id, hot_score in rows}
+
+    def _apply(self, scores):
+        for id, (added, removed) in self._pending.items():
+            if id in scores:
+                scores[id] = merge_score(log2_add(scores[id], added), -math.inf, removed)
+        self._scores = scores
+        self._keys = _SortedKeys((hot_score, id) for id, hot_score in scores.items())
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'notes': len(self._scores),
+                'pending': len(self._pending),
+                'half_life': self.half_life,
+                'flush_interval': self.flush_interval,
+                'load_seconds': self._load_seconds,
+                'loaded': self._loaded_at is not None,
+            })
+        return snapshot
+
+    def _set(self, id, hot_score):
+        previous = self._scores.get(id)
+        if previous is not None:
+            self._keys.remove((previous, id))
+        self._scores[id] = hot_score
+        self._keys.add((hot_score, id))
+
+    def _discard(self, id):
+        previous = self._scores.pop(id, None)
+        if previous is not None:
+            self._keys.remove((previous, id))
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,532 @@
+import collections
+import copy
+import functools
+import json
+import os
+import threading
+
+
+def _map_stickers(result, func):
+    """对单个便签、便签列表或 (便签列表, 游标) 元组中的每个便签应用 func"""
+    if result is None:
+        return result
+    if isinstance(result, tuple):
+        return (_map_stickers(result[0], func),) + result[1:]
+    if isinstance(result, list):
+        return [func(sticker) for sticker in result]
+    return func(result)
+
+
+class PositionWriteBuffer:
+    """便签位置写回缓冲
+
+    拖动便签时同一便签会连续产生多次位置更新，只有最后一次有意义。
+    启用后位置更新只写入内存（按便签ID合并），读接口通过 overlaid 叠加未落库的位置，
+    后台线程每隔 interval 秒把每个便签的最新位置批量写入数据库，停止时再写一次。
+    """
+
+    def __init__(self, flush_func, enabled=False, interval=1.0):
+        self.flush_func = flush_func
+        self.enabled = enabled
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # sticker_id -> (position_x, position_y, rotation)
+        self._pending = {}
+        # 每次写入缓冲都会递增，用于条件 GET 的版本
+        self.revision = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {
+            'updates': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'flush_errors': 0,
+        }
+
+    def put(self, sticker_id, position_x, position_y, rotation=None):
+        """记录位置更新；rotation 为 None 时沿用缓冲中已有的旋转角度"""
+        with self._lock:
+            previous = self._pending.get(sticker_id)
+            if previous is not None:
+                self._stats['coalesced'] += 1
+                if rotation is None:
+                    rotation = previous[2]
+            self._pending[sticker_id] = (position_x, position_y, rotation)
+            self._stats['updates'] += 1
+            self.revision += 1
+
+    def discard(self, sticker_id):
+        """丢弃便签未落库的位置（便签已删除）"""
+        with self._lock:
+            if self._pending.pop(sticker_id, None) is not None:
+                self.revision += 1
+
+    def pending_revision(self):
+        """有待写数据时返回当前修订号，否则返回 None（此时读取结果与数据库一致）"""
+        with self._lock:
+            return self.revision if self._pending else None
+
+    def pending(self, sticker_id):
+        with self._lock:
+            return self._pending.get(sticker_id)
+
+    def apply(self, result):
+        """把未落库的位置叠加到查询结果上
+
+        支持单个便签、便签列表、(便签列表, 游标) 元组；有待写位置的便签会被复制，
+        不修改缓存中共享的对象。
+        """
+        if not self._pending:
+            return result
+        return _map_stickers(result, self._apply_one)
+
+    def overlaid(self, func):
+        """装饰读方法，返回结果叠加未落库的位置"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.apply(func(*args, **kwargs))
+        return wrapper
+
+    def flush(self):
+        """把每个便签的最新位置写入数据库，返回写入条数"""
+        with self._flush_lock:
+            with self._lock:
+                snapshot = dict(self._pending)
+            if not snapshot:
+                return 0
+
+            positions = [(sticker_id,) + position for sticker_id, position in snapshot.items()]
+            try:
+                result = self.flush_func(positions)
+            except Exception as e:
+                print(f"Position flush error: {e}")
+                result = None
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                if result is None:
+                    # 写入失败，保留缓冲等待下次重试
+                    self._stats['flush_errors'] += 1
+                    return 0
+                # 只移除写入期间没有被再次更新的条目
+                for sticker_id, position in snapshot.items():
+                    if self._pending.get(sticker_id) == position:
+                        del self._pending[sticker_id]
+                self._stats['rows_written'] += len(positions)
+            return len(positions)
+
+    def start(self):
+        """启动后台写回线程"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="position-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程并写入剩余位置"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'enabled': self.enabled,
+                'interval': self.interval,
+                'pending': len(self._pending),
+            })
+        return snapshot
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def _apply_one(self, sticker):
+        position = self._pending.get(sticker.id)
+        if position is None:
+            return sticker
+        sticker = copy.copy(sticker)
+        sticker.position_x, sticker.position_y = position[0], position[1]
+        if position[2] is not None:
+            sticker.rotation = position[2]
+        return sticker
+
+
+class ReactionWriteBuffer:
+    """便签反应写回缓冲
+
+    反应点击是量最大的写操作。启用后添加/移除反应只记录在内存中，按 (便签, 反应类型, 用户IP) 去重，
+    同一键只保留最后一次操作的结果；读接口通过 overlaid / apply_counts / apply_user_reactions
+    叠加未落库的变化。后台线程每隔 interval 秒、或未落库的键达到 max_pending 个时调用 flush_func 批量写入，
+    停止时再写一次。flush_func 接收 [(sticker_id, reaction_type, user_ip, 是否有反应)]，失败返回 None。
+
+    journal_path 不为空时每次变化先追加到本地日志文件（sync 为 True 时 fsync 后才返回），启动时重放其中
+    尚未落库的变化，进程崩溃或断电不会丢失已确认的反应；每次落库后日志压缩为剩余的未落库变化。
+    fsync 在锁外执行并合并（一次 fsync 覆盖此前写入的所有变化），并发请求不会逐条排队等待落盘。
+    """
+
+    def __init__(self, flush_func, enabled=False, interval=0.2, max_pending=500, journal_path='', sync=True):
+        self.flush_func = flush_func
+        self.enabled = enabled
+        self.interval = interval
+        self.max_pending = max_pending
+        self.journal_path = journal_path
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # (sticker_id, reaction_type, user_ip) -> [目标状态, 数据库中的状态（重放的日志为 None，表示未知）]
+        self._pending = {}
+        # sticker_id -> {'same': 增量, 'great': 增量}，只统计数据库状态已知的键
+        self._deltas = {}
+        # user_ip -> 该用户未落库的键
+        self._by_ip = {}
+        # 每次写入缓冲都会递增，用于条件 GET 的版本
+        self.revision = 0
+        # 成功落库的次数和最近几次落库写入的键，put 据此判断调用方读到的数据库状态是否已过期
+        self._flushed = 0
+        self._recent_flushes = collections.deque(maxlen=16)
+        self._journal = None
+        self._sync_lock = threading.Lock()
+        # 已写入日志的变化序号和已 fsync 的序号
+        self._written = 0
+        self._synced = 0
+        # 压缩日志期间追加的变化 [(键, 目标状态)]，不在压缩时为 None
+        self._journal_tail = None
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {
+            'updates': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'flush_errors': 0,
+            'replayed': 0,
+        }
+
+    def flush_token(self):
+        """读取数据库状态之前调用，返回值传给 put，用于发现读取与 put 之间完成的落库"""
+        return self._flushed
+
+    def put(self, sticker_id, reaction_type, user_ip, reacted, db_reacted, token=None):
+        """记录一次添加（reacted=True）或移除反应，db_reacted 为数据库中是否已有该反应
+
+        与当前状态（未落库的变化优先于数据库）相同时不记录，返回 False。
+        token 为读取 db_reacted 之前 flush_token() 的返回值：此后该键被落库过时 db_reacted 可能已过期，
+        不记录并返回 None，调用方应重新读取数据库状态后再调用
+        """
+        key = (sticker_id, reaction_type, user_ip)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None and token is not None and self._flushed_since(key, token):
+                return None
+            current = db_reacted if entry is None else entry[0]
+            if current == reacted:
+                return False
+            if entry is None:
+                entry = [reacted, db_reacted]
+                self._pending[key] = entry
+                self._by_ip.setdefault(user_ip, set()).add(key)
+            else:
+                self._contribute(key, entry, -1)
+                entry[0] = reacted
+                self._stats['coalesced'] += 1
+            self._contribute(key, entry, 1)
+            if entry[0] == entry[1]:
+                # 撤销了未落库的变化
+                self._drop(key)
+            sequence = self._append_journal(key, reacted)
+            self._stats['updates'] += 1
+            self.revision += 1
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+        if sequence and self.sync:
+            self._sync_journal(sequence)
+        return True
+
+    def discard_sticker(self, sticker_id):
+        """丢弃便签未落库的反应（便签已删除，其反应随之删除），返回丢弃的计数增量 {'same': n, 'great': n}"""
+        with self._lock:
+            discarded = dict(self._deltas.get(sticker_id, ()))
+            keys = [key for key in self._pending if key[0] == sticker_id]
+            for key in keys:
+                self._contribute(key, self._pending[key], -1)
+                self._drop(key)
+            if keys:
+                self.revision += 1
+        return discarded
+
+    def pending_revision(self):
+        """有待写数据时返回当前修订号，否则返回 None（此时读取结果与数据库一致）"""
+        with self._lock:
+            return self.revision if self._pending else None
+
+    def apply_counts(self, sticker_id, counts):
+        """把未落库的变化叠加到单个便签的 {'same', 'great'} 计数上"""
+        if counts is None or not self._deltas:
+            return counts
+        with self._lock:
+            delta = self._deltas.get(sticker_id)
+            if not delta:
+                return counts
+            return {reaction_type: max(0, count + delta.get(reaction_type, 0)) for reaction_type, count in counts.items()}
+
+    def apply_counts_many(self, counts_by_id):
+        """叠加到 {sticker_id: {'same', 'great'}} 上"""
+        if not counts_by_id or not self._deltas:
+            return counts_by_id
+        return {sticker_id: self.apply_counts(sticker_id, counts) for sticker_id, counts in counts_by_id.items()}
+
+    def apply_user_reactions(self, user_ip, reactions, sticker_ids=None):
+        """把用户未落库的反应叠加到 {sticker_id: [reaction_type]} 上，sticker_ids 不为 None 时只叠加这些便签"""
+        if not self._by_ip:
+            return reactions
+        with self._lock:
+            keys = list(self._by_ip.get(user_ip, ()))
+            changes = [(key, self._pending[key][0]) for key in keys]
+        if not changes:
+            return reactions
+        wanted = None if sticker_ids is None else set(sticker_ids)
+        reactions = {sticker_id: list(types) for sticker_id, types in reactions.items()}
+        for (sticker_id, reaction_type, _), reacted in changes:
+            if wanted is not None and sticker_id not in wanted:
+                continue
+            types = reactions.setdefault(sticker_id, [])
+            if reacted and reaction_type not in types:
+                types.append(reaction_type)
+            elif not reacted and reaction_type in types:
+                types.remove(reaction_type)
+            if not types:
+                del reactions[sticker_id]
+        return reactions
+
+    def overlaid(self, func):
+        """装饰读方法，返回的便签叠加未落库的反应计数（有变化的便签会被复制，不修改缓存中共享的对象）"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if not self._deltas:
+                return result
+            return _map_stickers(result, self._apply_one)
+        return wrapper
+
+    def flush(self):
+        """把未落库的反应写入数据库，返回写入条数"""
+        with self._flush_lock:
+            with self._lock:
+                snapshot = {key: entry[0] for key, entry in self._pending.items()}
+            if not snapshot:
+                return 0
+
+            changes = [key + (reacted,) for key, reacted in snapshot.items()]
+            try:
+                result = self.flush_func(changes)
+            except Exception as e:
+                print(f"Reaction flush error: {e}")
+                result = None
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                if result is None:
+                    # 写入失败，保留缓冲等待下次重试
+                    self._stats['flush_errors'] += 1
+                    return 0
+                self._flushed += 1
+                self._recent_flushes.append((self._flushed, snapshot))
+                # 写入的键在数据库中的状态即为写入的值；写入期间又有变化的键保留
+                for key, reacted in snapshot.items():
+                    entry = self._pending.get(key)
+                    if entry is None:
+                        continue
+                    self._contribute(key, entry, -1)
+                    entry[1] = reacted
+                    if entry[0] == reacted:
+                        self._drop(key)
+                    else:
+                        self._contribute(key, entry, 1)
+                self._stats['rows_written'] += len(changes)
+            self._compact_journal()
+            return len(changes)
+
+    def start(self):
+        """重放日志中未落库的反应并写入，启动后台写回线程"""
+        if not self.enabled or self._thread is not None:
+            return
+        if self.journal_path:
+            self._replay_journal()
+            self.flush()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="reaction-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程并写入剩余反应"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock, self._sync_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'enabled': self.enabled,
+                'interval': self.interval,
+                'max_pending': self.max_pending,
+                'journal': bool(self.journal_path),
+                'pending': len(self._pending),
+            })
+        return snapshot
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _flushed_since(self, key, token):
+        """token 之后完成的落库是否写入过该键；记录不全（落库次数超过保留的记录数）时按已写入处理"""
+        if self._flushed == token:
+            return False
+        if self._flushed - token > len(self._recent_flushes):
+            return True
+        return any(number > token and key in keys for number, keys in self._recent_flushes)
+
+    def _contribute(self, key, entry, sign):
+        """把键的计数增量（目标状态 - 数据库状态）按 sign 计入 _deltas"""
+        if entry[1] is None or entry[0] == entry[1]:
+            return
+        sticker_id, reaction_type, _ = key
+        delta = self._deltas.setdefault(sticker_id, {})
+        delta[reaction_type] = delta.get(reaction_type, 0) + sign * (1 if entry[0] else -1)
+        if not delta[reaction_type]:
+            del delta[reaction_type]
+            if not delta:
+                del self._deltas[sticker_id]
+
+    def _drop(self, key):
+        del self._pending[key]
+        keys = self._by_ip.get(key[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_ip[key[2]]
+
+    def _apply_one(self, sticker):
+        delta = self._deltas.get(sticker.id)
+        if not delta:
+            return sticker
+        sticker = copy.copy(sticker)
+        sticker.same_count = max(0, sticker.same_count + delta.get('same', 0))
+        sticker.great_count = max(0, sticker.great_count + delta.get('great', 0))
+        return sticker
+
+    def _write_journal_line(self, handle, key, reacted):
+        handle.write(json.dumps([key[0], key[1], key[2], 1 if reacted else 0]) + '\n')
+
+    def _append_journal(self, key, reacted):
+        """追加一条变化并写入操作系统，返回变化序号（未启用日志返回 None）；调用方持有 _lock"""
+        if not self.journal_path:
+            return None
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._write_journal_line(self._journal, key, reacted)
+        self._journal.flush()
+        if self._journal_tail is not None:
+            self._journal_tail.append((key, reacted))
+        self._written += 1
+        return self._written
+
+    def _sync_journal(self, sequence):
+        """确保序号不超过 sequence 的变化已落盘：等待中的请求由同一次 fsync 一起确认"""
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return
+            written, journal = self._written, self._journal
+            if journal is not None:
+                os.fsync(journal.fileno())
+            self._synced = written
+
+    def _compact_journal(self, attempts=3):
+        """用剩余的未落库变化重写日志（在持有 _flush_lock 的 flush 中调用）
+
+        在锁内取剩余变化的快照，锁外写临时文件并 fsync，期间追加的变化同时记入 _journal_tail、在锁外补写；
+        补写完没有新变化时在锁内替换日志文件。连续 attempts 次仍有新变化时，最后一批在锁内补写。
+        """
+        if not self.journal_path:
+            return
+        with self._lock:
+            entries = [(key, entry[0]) for key, entry in self._pending.items()]
+            self._journal_tail = []
+        temporary = self.journal_path + '.tmp'
+        handle = open(temporary, 'w', encoding='utf-8')
+        try:
+            self._write_journal_entries(handle, entries)
+            for _ in range(attempts):
+                with self._lock:
+                    tail, self._journal_tail = self._journal_tail, []
+                    if not tail:
+                        self._swap_journal(handle, temporary)
+                        return
+                self._write_journal_entries(handle, tail)
+            with self._lock:
+                self._write_journal_entries(handle, self._journal_tail)
+                self._swap_journal(handle, temporary)
+        except BaseException:
+            with self._lock:
+                self._journal_tail = None
+            handle.close()
+            raise
+
+    def _write_journal_entries(self, handle, entries):
+        for key, reacted in entries:
+            self._write_journal_line(handle, key, reacted)
+        handle.flush()
+        if self.sync:
+            os.fsync(handle.fileno())
+
+    def _swap_journal(self, handle, temporary):
+        """用已落盘的临时文件替换日志；调用方持有 _lock。与 _sync_journal 互斥，避免对已关闭的文件 fsync；
+        新日志包含此前写入的所有变化且已落盘，之前的变化都视为已确认"""
+        with self._sync_lock:
+            if self._journal is not None:
+                self._journal.close()
+            os.replace(temporary, self.journal_path)
+            self._journal = handle
+            self._journal_tail = None
+            self._synced = self._written
+
+    def _replay_journal(self):
+        """读取日志中的变化（后写的覆盖先写的），数据库中的状态未知，写入时依赖 INSERT IGNORE / DELETE 的幂等性"""
+        try:
+            with open(self.journal_path, encoding='utf-8') as handle:
+                lines = handle.readlines()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            for line in lines:
+                try:
+                    sticker_id, reaction_type, user_ip, reacted = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的最后一行
+                    continue
+                key = (sticker_id, reaction_type, user_ip)
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [bool(reacted), None]
+                    self._by_ip.setdefault(user_ip, set()).add(key)
+                else:
+                    entry[0] = bool(reacted)
+                self._stats['replayed'] += 1